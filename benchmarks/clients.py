@@ -0,0 +1,74 @@
+"""
+Minimal stdlib clients for the fake server that mimic the interfaces the apps use,
+so app code can be benchmarked without the Google SDK or an API key.
+"""
+import re
+import json
+import urllib.request
+from types import SimpleNamespace
+
+
+def _post(url, payload, timeout=120):
+    request = urllib.request.Request(
+        url, data=json.dumps(payload).encode(), headers={"Content-Type": "application/json"}, method="POST"
+    )
+    return urllib.request.urlopen(request, timeout=timeout)
+
+
+def _usage(data):
+    usage = data.get("usageMetadata")
+    if not usage:
+        return None
+    return SimpleNamespace(prompt_token_count=usage["promptTokenCount"],
+                           candidates_token_count=usage["candidatesTokenCount"])
+
+
+class FakeGenerativeModel:
+    """Drop-in for `genai.GenerativeModel` backed by the fake server's Gemini endpoints"""
+
+    def __init__(self, model_name, base_url):
+        self.model_name = model_name
+        self.base_url = base_url.rstrip("/")
+
+    def _payload(self, prompt, generation_config=None):
+        payload = {"contents": [{"role": "user", "parts": [{"text": prompt}]}]}
+        if generation_config:
+            # The SDK accepts snake_case keys; the REST API uses camelCase
+            payload["generationConfig"] = {
+                re.sub(r"_(\w)", lambda m: m.group(1).upper(), key): value for key, value in generation_config.items()
+            }
+        return payload
+
+    def generate_content(self, prompt, stream=False, generation_config=None, **kwargs):
+        if stream:
+            return self._stream(prompt, generation_config)
+        url = f"{self.base_url}/v1beta/models/{self.model_name}:generateContent"
+        with _post(url, self._payload(prompt, generation_config)) as response:
+            data = json.load(response)
+        text = "".join(part["text"] for part in data["candidates"][0]["content"]["parts"])
+        return SimpleNamespace(text=text, usage_metadata=_usage(data))
+
+    def _stream(self, prompt, generation_config=None):
+        url = f"{self.base_url}/v1beta/models/{self.model_name}:streamGenerateContent?alt=sse"
+        with _post(url, self._payload(prompt, generation_config)) as response:
+            for raw in response:
+                line = raw.decode().strip()
+                if not line.startswith("data:"):
+                    continue
+                data = json.loads(line[len("data:"):])
+                text = "".join(part["text"] for part in data["candidates"][0]["content"]["parts"])
+                yield SimpleNamespace(text=text, usage_metadata=_usage(data))
+
+
+class FakeConversation:
+    """ConversationChain-like wrapper (`predict(input=...)`) that keeps a growing history"""
+
+    def __init__(self, model):
+        self.model = model
+        self.history = []
+
+    def predict(self, input, callbacks=None):
+        prompt = "\n".join(self.history + [f"Human: {input}", "AI Assistant:"])
+        response = self.model.generate_content(prompt).text
+        self.history += [f"Human: {input}", f"AI Assistant: {response}"]
+        return response
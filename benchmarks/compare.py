@@ -0,0 +1,62 @@
+"""
+Compare two run_benchmarks.py result files and flag regressions.
+
+Metrics ending in `_per_sec` are higher-is-better; `_ms` and `_s` metrics are
+lower-is-better. Exits with status 1 if any metric regressed by more than
+--threshold (default 10%).
+
+    python compare.py baseline.json results.json --threshold 0.15
+"""
+import sys
+import json
+import argparse
+
+
+def direction(metric):
+    if metric.endswith("_per_sec"):
+        return 1
+    if metric.endswith("_ms") or metric.endswith("_s"):
+        return -1
+    return 0
+
+
+def compare(baseline, current, threshold):
+    rows, regressions = [], []
+    for name, metrics in current.get("benchmarks", {}).items():
+        before = baseline.get("benchmarks", {}).get(name, {})
+        for metric, value in metrics.items():
+            sign = direction(metric)
+            old = before.get(metric)
+            if not sign or not isinstance(value, (int, float)) or not isinstance(old, (int, float)) or not old:
+                continue
+            change = (value - old) / old
+            regressed = sign * change < -threshold
+            rows.append((name, metric, old, value, change, regressed))
+            if regressed:
+                regressions.append((name, metric))
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+
+    rows, regressions = compare(baseline, current, args.threshold)
+    for name, metric, old, new, change, regressed in rows:
+        flag = "REGRESSION" if regressed else ""
+        print(f"{name:24} {metric:22} {old:>12.3f} -> {new:>12.3f} {change:+8.1%} {flag}")
+    if regressions:
+        print(f"\n{len(regressions)} metric(s) regressed by more than {args.threshold:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
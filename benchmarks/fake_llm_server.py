@@ -0,0 +1,380 @@
+"""
+Deterministic local stand-in for the Ollama and Gemini REST APIs.
+
+Implements the endpoints the apps use:
+
+    GET  /api/tags
+    POST /api/generate, /api/chat            (streaming NDJSON or single JSON)
+    POST /api/embed, /api/embeddings
+    POST /v1beta/models/<model>:generateContent
+    POST /v1beta/models/<model>:streamGenerateContent?alt=sse
+
+Latency is simulated as `base_latency + prompt_eval + tokens / tokens_per_sec`.
+Prompt evaluation only charges for the part of the prompt that is not a prefix
+of the previous request for the same model, which mirrors Ollama's KV-cache
+reuse. Prompts asking for "numbered titles (1-N)" get a numbered list of N
+titles drawn from a small set of templates, so near-duplicates occur like they
+do with a real model.
+
+    python fake_llm_server.py --port 11435 --tokens-per-sec 30
+"""
+import re
+import sys
+import json
+import time
+import random
+import hashlib
+import argparse
+import threading
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+WORDS = (
+    "the model answers questions about local documents with short clear sentences "
+    "and explains each step so that readers can follow along without prior context"
+).split()
+
+
+@dataclass
+class FakeLLMConfig:
+    base_latency: float = 0.02
+    prompt_tokens_per_sec: float = 2000.0
+    tokens_per_sec: float = 200.0
+    reply_tokens: int = 48
+    error_rate: float = 0.0
+    error_codes: tuple = (429, 503)
+    embedding_dim: int = 384
+    max_parallel: int = 0  # 0 = unlimited; otherwise requests beyond it queue like OLLAMA_NUM_PARALLEL
+    seed: int = 0
+    models: list = field(default_factory=lambda: ["gemma3:1b", "gemma3:4b", "llama3.2:3b-instruct-q4_K_M", "nomic-embed-text"])
+
+
+def count_tokens(text):
+    return len(text.split())
+
+
+def reply_for(prompt, n_tokens, seed=0):
+    """Deterministic reply text for a prompt"""
+    digest = hashlib.sha256(f"{seed}:{prompt}".encode()).digest()
+    rng = random.Random(digest)
+    return " ".join(rng.choice(WORDS) for _ in range(n_tokens))
+
+
+TITLE_TEMPLATES = [
+    "{n} Ways to Master {topic}", "{n} Ways to Master {topic} Today", "{n} Simple Ways to Master {topic}",
+    "The Ultimate Guide to {topic}", "The Complete Guide to {topic}", "The Ultimate Beginner's Guide to {topic}",
+    "Why {topic} Matters More Than Ever", "Why {topic} Matters in 2025", "How to Get Started with {topic}",
+    "How to Get Started with {topic} Fast", "{topic} Explained for Beginners", "Is {topic} Worth It?",
+    "The Future of {topic}", "{topic} Myths You Should Stop Believing", "What Nobody Tells You About {topic}",
+    "{topic} in 10 Minutes a Day", "Lessons Learned from a Year of {topic}", "A Data-Driven Look at {topic}",
+    "Common {topic} Mistakes and How to Avoid Them", "{topic}: A Step-by-Step Playbook",
+    "The Hidden Costs of Ignoring {topic}", "Inside the Numbers: {topic} by the Data",
+    "Should You Bet Your Career on {topic}?", "From Zero to Confident with {topic}",
+]
+
+
+def titles_reply(prompt, count, seed=0):
+    """A numbered list of `count` titles; templates are drawn with replacement, like a model repeating itself"""
+    match = re.search(r"topic:\s*(.+)", prompt)
+    topic = match.group(1).strip().title() if match else "This Topic"
+    rng = random.Random(hashlib.sha256(f"{seed}:{prompt}".encode()).digest())
+    return "\n".join(
+        f"{i}. " + rng.choice(TITLE_TEMPLATES).format(n=rng.choice((5, 7, 10)), topic=topic) for i in range(1, count + 1)
+    )
+
+
+def embedding_for(text, dim, seed=0):
+    digest = hashlib.sha256(f"{seed}:{text}".encode()).digest()
+    rng = random.Random(digest)
+    vector = [rng.uniform(-1, 1) for _ in range(dim)]
+    norm = sum(v * v for v in vector) ** 0.5 or 1.0
+    return [v / norm for v in vector]
+
+
+class _Server(ThreadingHTTPServer):
+    # The default listen backlog of 5 drops connections under load tests
+    request_queue_size = 256
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients hanging up mid-response are expected in load tests
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def state(self):
+        return self.server.fake
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b"{}"
+        return json.loads(body or b"{}")
+
+    def _send_json(self, payload, status=200, headers=None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _start_stream(self, content_type):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _end_stream(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == "/api/tags":
+            models = [{
+                "name": name, "model": name, "size": 800_000_000, "modified_at": "2025-01-01T00:00:00Z",
+                "details": {"family": name.split(":")[0], "parameter_size": name.split(":")[-1].split("-")[0].upper(),
+                            "quantization_level": "Q4_K_M"},
+            } for name in self.state.config.models]
+            self._send_json({"models": models})
+        elif path in ("/", "/api/version"):
+            self._send_json({"version": "0.0.0-fake"})
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        parsed = urlparse(self.path)
+        path = parsed.path
+        payload = self._read_json()
+        self.state.record(path)
+        error = self.state.maybe_error()
+        if error:
+            self._send_json({"error": {"code": error, "message": "simulated upstream error"}},
+                            status=error, headers={"Retry-After": "1"})
+            return
+        if path == "/api/generate":
+            self._ollama_generate(payload, payload.get("prompt", ""), chat=False)
+        elif path == "/api/chat":
+            messages = payload.get("messages", [])
+            prompt = "\n".join(f"{m.get('role')}: {m.get('content', '')}" for m in messages)
+            self._ollama_generate(payload, prompt, chat=True)
+        elif path in ("/api/embed", "/api/embeddings"):
+            inputs = payload.get("input", payload.get("prompt", ""))
+            inputs = [inputs] if isinstance(inputs, str) else inputs
+            vectors = [embedding_for(text, self.state.config.embedding_dim, self.state.config.seed) for text in inputs]
+            time.sleep(self.state.config.base_latency + sum(map(count_tokens, inputs)) / self.state.config.prompt_tokens_per_sec)
+            if path == "/api/embeddings":
+                self._send_json({"embedding": vectors[0]})
+            else:
+                self._send_json({"model": payload.get("model"), "embeddings": vectors})
+        elif path.startswith("/v1beta/models/"):
+            model, _, method = path[len("/v1beta/models/"):].partition(":")
+            prompt = " ".join(
+                part.get("text", "")
+                for content in payload.get("contents", [])
+                for part in content.get("parts", [])
+            )
+            max_tokens = (payload.get("generationConfig") or {}).get("maxOutputTokens")
+            self._gemini_generate(model, prompt, stream=method == "streamGenerateContent", max_tokens=max_tokens)
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def _ollama_generate(self, payload, prompt, chat):
+        config = self.state.config
+        model = payload.get("model", "")
+        options = payload.get("options") or {}
+        n_tokens = int(options.get("num_predict") or config.reply_tokens)
+        if n_tokens < 0:
+            n_tokens = config.reply_tokens
+        text = reply_for(prompt, n_tokens, config.seed)
+        tokens = text.split()
+        with self.state.slot():
+            start = time.perf_counter_ns()
+            prompt_tokens = prompt.split()
+            evaluated = self.state.prompt_eval(model, prompt_tokens)
+            prompt_eval_s = evaluated / config.prompt_tokens_per_sec
+            time.sleep(config.base_latency + prompt_eval_s)
+            final = {
+                "model": model, "created_at": "2025-01-01T00:00:00Z", "done": True, "done_reason": "stop",
+                "prompt_eval_count": evaluated, "prompt_eval_duration": int(prompt_eval_s * 1e9),
+                "eval_count": len(tokens), "eval_duration": int(len(tokens) / config.tokens_per_sec * 1e9),
+                "load_duration": 0,
+            }
+            if not chat:
+                final["context"] = list(range(len(prompt_tokens) + len(tokens)))
+            if payload.get("stream", True):
+                self._start_stream("application/x-ndjson")
+                for i, token in enumerate(tokens):
+                    piece = token if i == 0 else " " + token
+                    time.sleep(1 / config.tokens_per_sec)
+                    chunk = {"model": model, "created_at": "2025-01-01T00:00:00Z", "done": False}
+                    if chat:
+                        chunk["message"] = {"role": "assistant", "content": piece}
+                    else:
+                        chunk["response"] = piece
+                    self._write_chunk((json.dumps(chunk) + "\n").encode())
+                final["total_duration"] = time.perf_counter_ns() - start
+                if chat:
+                    final["message"] = {"role": "assistant", "content": ""}
+                else:
+                    final["response"] = ""
+                self._write_chunk((json.dumps(final) + "\n").encode())
+                self._end_stream()
+            else:
+                time.sleep(len(tokens) / config.tokens_per_sec)
+                final["total_duration"] = time.perf_counter_ns() - start
+                if chat:
+                    final["message"] = {"role": "assistant", "content": text}
+                else:
+                    final["response"] = text
+                self._send_json(final)
+
+    def _gemini_generate(self, model, prompt, stream, max_tokens=None):
+        config = self.state.config
+        titles = re.search(r"numbered titles \(1-(\d+)\)", prompt)
+        if titles:
+            text = titles_reply(prompt, int(titles.group(1)), config.seed)
+        else:
+            text = reply_for(prompt, min(config.reply_tokens, max_tokens or config.reply_tokens), config.seed)
+        tokens = text.split()
+        usage = {"promptTokenCount": count_tokens(prompt), "candidatesTokenCount": len(tokens),
+                 "totalTokenCount": count_tokens(prompt) + len(tokens)}
+        time.sleep(config.base_latency + count_tokens(prompt) / config.prompt_tokens_per_sec)
+
+        def candidate(piece):
+            return {"content": {"parts": [{"text": piece}], "role": "model"}, "finishReason": "STOP", "index": 0}
+
+        if stream:
+            self._start_stream("text/event-stream")
+            # Gemini streams a handful of words per chunk
+            for i in range(0, len(tokens), 8):
+                piece = " ".join(tokens[i:i + 8]) + (" " if i + 8 < len(tokens) else "")
+                time.sleep(len(tokens[i:i + 8]) / config.tokens_per_sec)
+                event = {"candidates": [candidate(piece)], "usageMetadata": usage, "modelVersion": model}
+                self._write_chunk(f"data: {json.dumps(event)}\r\n\r\n".encode())
+            self._end_stream()
+        else:
+            time.sleep(len(tokens) / config.tokens_per_sec)
+            self._send_json({"candidates": [candidate(text)], "usageMetadata": usage, "modelVersion": model})
+
+
+class _ServerState:
+    def __init__(self, config):
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.lock = threading.Lock()
+        self.last_prompt = {}
+        self.requests = {}
+        self.semaphore = threading.BoundedSemaphore(config.max_parallel) if config.max_parallel else None
+
+    def record(self, path):
+        with self.lock:
+            self.requests[path] = self.requests.get(path, 0) + 1
+
+    def maybe_error(self):
+        if not self.config.error_rate:
+            return None
+        with self.lock:
+            if self.random.random() < self.config.error_rate:
+                return self.random.choice(self.config.error_codes)
+        return None
+
+    def prompt_eval(self, model, prompt_tokens):
+        """Number of prompt tokens that must be evaluated given the cached prefix for this model"""
+        with self.lock:
+            previous = self.last_prompt.get(model, [])
+            shared = 0
+            for a, b in zip(previous, prompt_tokens):
+                if a != b:
+                    break
+                shared += 1
+            self.last_prompt[model] = prompt_tokens
+        return max(1, len(prompt_tokens) - shared)
+
+    def slot(self):
+        return self.semaphore if self.semaphore is not None else _NullContext()
+
+
+class _NullContext:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class FakeLLMServer:
+    """Runs the fake API on a background thread: `with FakeLLMServer() as server: server.url`"""
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.config = config or FakeLLMConfig()
+        self.httpd = _Server((host, port), _Handler)
+        self.httpd.fake = _ServerState(self.config)
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def stats(self):
+        return dict(self.httpd.fake.requests)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="fake-llm-server", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--base-latency", type=float, default=FakeLLMConfig.base_latency)
+    parser.add_argument("--tokens-per-sec", type=float, default=FakeLLMConfig.tokens_per_sec)
+    parser.add_argument("--prompt-tokens-per-sec", type=float, default=FakeLLMConfig.prompt_tokens_per_sec)
+    parser.add_argument("--reply-tokens", type=int, default=FakeLLMConfig.reply_tokens)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--max-parallel", type=int, default=0)
+    args = parser.parse_args()
+
+    config = FakeLLMConfig(
+        base_latency=args.base_latency, tokens_per_sec=args.tokens_per_sec,
+        prompt_tokens_per_sec=args.prompt_tokens_per_sec, reply_tokens=args.reply_tokens,
+        error_rate=args.error_rate, max_parallel=args.max_parallel,
+    )
+    server = FakeLLMServer(config, host=args.host, port=args.port)
+    print(f"Fake Ollama/Gemini API listening on {server.url} (OLLAMA_HOST={server.url})")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
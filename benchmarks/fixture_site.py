@@ -0,0 +1,303 @@
+"""
+Deterministic fixture website for crawler benchmarks.
+
+Every page shares the same navigation, cookie banner and footer (like a real
+docs site), links to a few other pages and has its own body text. With `duplicate_every`,
+every Nth page is a near-copy of the page before it, like versioned docs. `/sitemap.xml`
+lists all pages and `/robots.txt` is served as well.
+
+Servers that push back can be simulated too: above `max_rps` requests/sec the site answers
+429 with a Retry-After header, and above `capacity` concurrent requests its latency grows
+with the load, like an overloaded backend.
+
+With `assets`, every page also pulls in images, a web font, a video and a third-party
+tracking script (served from `localhost` while pages are on 127.0.0.1), like a real page
+weighs far more than its text. With `stall_every`, every Nth page hangs for `stall_seconds`.
+
+    python fixture_site.py --port 8765 --pages 200
+"""
+import sys
+import time
+import random
+import argparse
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+TOPICS = ["install", "configure", "deploy", "monitor", "scale", "secure", "debug", "upgrade", "migrate", "backup"]
+SENTENCE_WORDS = (
+    "service cluster node request response cache index query token latency throughput "
+    "replica shard storage network policy schema client server queue worker batch"
+).split()
+
+NAV = """<nav class="site-nav"><a href="/">Home</a> | <a href="/page/0.html">Getting started</a> |
+<a href="/page/1.html">Guides</a> | <a href="/page/2.html">API reference</a> | <a href="/page/3.html">FAQ</a></nav>"""
+COOKIE_BANNER = """<div class="cookie-banner">We use cookies to improve your experience.
+By continuing to browse this site you agree to our use of cookies. <button>Accept</button></div>"""
+FOOTER = """<footer>Copyright 2025 Example Docs. All rights reserved. |
+<a href="/privacy.html">Privacy</a> | <a href="/terms.html">Terms</a> | Built with a static site generator.</footer>"""
+
+
+# path: (content type, size in bytes)
+ASSETS = {
+    "/assets/hero.jpg": ("image/jpeg", 250_000),
+    "/assets/diagram.png": ("image/png", 120_000),
+    "/assets/inter.woff2": ("font/woff2", 90_000),
+    "/assets/intro.mp4": ("video/mp4", 1_500_000),
+    "/assets/site.css": ("text/css", 15_000),
+    "/assets/tracker.js": ("application/javascript", 180_000),
+}
+
+
+@dataclass
+class FixtureSiteConfig:
+    pages: int = 50
+    paragraphs: int = 6
+    links_per_page: int = 4
+    latency: float = 0.0
+    crawl_delay: float = 0.0
+    duplicate_every: int = 0  # 0 = off; otherwise every Nth page repeats the previous one (N >= 2)
+    max_rps: float = 0.0  # 0 = unlimited; otherwise a token bucket with one second of burst
+    retry_after: float = 1.0
+    capacity: int = 0  # 0 = unlimited concurrent requests at `latency`
+    assets: bool = False
+    stall_every: int = 0  # 0 = off
+    stall_seconds: float = 60.0
+    seed: int = 0
+
+
+def page_body(index, config):
+    if config.duplicate_every and index % config.duplicate_every == config.duplicate_every - 1:
+        return page_body(index - 1, config).replace(f"(part {index - 1})", f"(part {index - 1}, latest version)", 1)
+    rng = random.Random(f"{config.seed}:{index}")
+    topic = TOPICS[index % len(TOPICS)]
+    paragraphs = []
+    for _ in range(config.paragraphs):
+        words = [rng.choice(SENTENCE_WORDS) for _ in range(rng.randint(40, 80))]
+        paragraphs.append(f"<p>To {topic} the {' '.join(words)}.</p>")
+    links = [rng.randrange(config.pages) for _ in range(config.links_per_page)]
+    # Real sites link the same page with tracking parameters, fragments and relative paths
+    variants = ["/page/{n}.html", "/page/{n}.html?utm_source=related", "/page/{n}.html#top", "../page/{n}.html"]
+    link_html = " ".join(f'<a href="{variants[i % len(variants)].format(n=n)}">Related page {n}</a>'
+                         for i, n in enumerate(links))
+    return f"<h1>How to {topic} (part {index})</h1>\n" + "\n".join(paragraphs) + f"\n<p>See also: {link_html}</p>"
+
+
+def render_assets(third_party_url):
+    return f"""<style>@font-face {{ font-family: Inter; src: url(/assets/inter.woff2); }} body {{ font-family: Inter; }}</style>
+<link rel="stylesheet" href="/assets/site.css">
+<img src="/assets/hero.jpg" alt="Hero"> <img src="/assets/diagram.png" alt="Diagram">
+<video src="/assets/intro.mp4" autoplay muted preload="auto"></video>
+<script src="{third_party_url}/assets/tracker.js"></script>"""
+
+
+def asset_body(path):
+    size = ASSETS[path][1]
+    # Scripts and styles still have to parse; everything else is filler bytes
+    if path.endswith((".js", ".css")):
+        return b"/*" + b"x" * (size - 4) + b"*/"
+    return b"\0" * size
+
+
+def render_page(index, config, third_party_url=None):
+    assets = render_assets(third_party_url) if config.assets and third_party_url else ""
+    return f"""<!DOCTYPE html>
+<html><head><title>Page {index}</title></head>
+<body>
+{assets}
+{NAV}
+{COOKIE_BANNER}
+<main>
+{page_body(index, config)}
+</main>
+{FOOTER}
+</body></html>"""
+
+
+def render_sitemap(base_url, config):
+    urls = "\n".join(f"  <url><loc>{base_url}/page/{i}.html</loc></url>" for i in range(config.pages))
+    return f"""<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+{urls}
+</urlset>"""
+
+
+def render_robots(base_url, config):
+    lines = ["User-agent: *", "Disallow: /private/"]
+    if config.crawl_delay:
+        lines.append(f"Crawl-delay: {config.crawl_delay}")
+    lines.append(f"Sitemap: {base_url}/sitemap.xml")
+    return "\n".join(lines) + "\n"
+
+
+class _Server(ThreadingHTTPServer):
+    # The default listen backlog of 5 drops connections under load tests
+    request_queue_size = 256
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients hanging up mid-response are expected in load tests
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, body, content_type="text/html; charset=utf-8", status=200, headers=None):
+        data = body.encode() if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        site = self.server.site
+        site.record()
+        path = urlparse(self.path).path
+        if path != "/robots.txt" and not site.admit():
+            self._send("<h1>Too many requests</h1>", status=429,
+                       headers={"Retry-After": f"{site.config.retry_after:g}"})
+            return
+        with site.serving() as load:
+            if site.config.latency:
+                threading.Event().wait(site.config.latency * load)
+            self._route(site, path)
+
+    def _route(self, site, path):
+        if path == "/sitemap.xml":
+            self._send(render_sitemap(site.url, site.config), "application/xml")
+        elif path == "/robots.txt":
+            self._send(render_robots(site.url, site.config), "text/plain")
+        elif path in ("/", "/index.html"):
+            self._send(render_page(0, site.config, site.third_party_url))
+        elif path in ASSETS:
+            self._send(asset_body(path), ASSETS[path][0], headers={"Cache-Control": "no-store"})
+        elif path.startswith("/page/") and path.endswith(".html"):
+            try:
+                index = int(path[len("/page/"):-len(".html")])
+            except ValueError:
+                index = -1
+            if 0 <= index < site.config.pages:
+                if site.config.stall_every and index % site.config.stall_every == site.config.stall_every - 1:
+                    threading.Event().wait(site.config.stall_seconds)
+                self._send(render_page(index, site.config, site.third_party_url))
+            else:
+                self._send("<h1>Not found</h1>", status=404)
+        else:
+            self._send("<h1>Not found</h1>", status=404)
+
+
+class FixtureSite:
+    """Serves the fixture site on a background thread: `with FixtureSite() as site: site.sitemap_url`"""
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.config = config or FixtureSiteConfig()
+        self.httpd = _Server((host, port), _Handler)
+        self.httpd.site = self
+        self.requests = 0
+        self.throttled = 0
+        self.inflight = 0
+        self.peak_inflight = 0
+        self.tokens = max(1.0, self.config.max_rps)
+        self.refilled = time.monotonic()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def third_party_url(self):
+        # Same server under another host name, so browsers treat it as a different site
+        return f"http://localhost:{self.httpd.server_address[1]}"
+
+    @property
+    def sitemap_url(self):
+        return f"{self.url}/sitemap.xml"
+
+    def page_urls(self):
+        return [f"{self.url}/page/{i}.html" for i in range(self.config.pages)]
+
+    def record(self):
+        with self.lock:
+            self.requests += 1
+
+    def admit(self):
+        """Token bucket for `max_rps`; False means the request gets a 429"""
+        if not self.config.max_rps:
+            return True
+        with self.lock:
+            now = time.monotonic()
+            burst = max(1.0, self.config.max_rps)
+            self.tokens = min(burst, self.tokens + (now - self.refilled) * self.config.max_rps)
+            self.refilled = now
+            if self.tokens < 1:
+                self.throttled += 1
+                return False
+            self.tokens -= 1
+            return True
+
+    @contextmanager
+    def serving(self):
+        """Count a request in flight; yields the latency multiplier for the current load"""
+        with self.lock:
+            self.inflight += 1
+            self.peak_inflight = max(self.peak_inflight, self.inflight)
+            load = max(1.0, self.inflight / self.config.capacity) if self.config.capacity else 1.0
+        try:
+            yield load
+        finally:
+            with self.lock:
+                self.inflight -= 1
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="fixture-site", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--pages", type=int, default=FixtureSiteConfig.pages)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--max-rps", type=float, default=0.0, help="Answer 429 above this many requests/sec")
+    parser.add_argument("--capacity", type=int, default=0, help="Concurrent requests before latency grows")
+    parser.add_argument("--crawl-delay", type=float, default=0.0, help="Crawl-delay advertised in robots.txt")
+    parser.add_argument("--assets", action="store_true", help="Add images, fonts, video and a third-party script")
+    args = parser.parse_args()
+
+    config = FixtureSiteConfig(pages=args.pages, latency=args.latency, max_rps=args.max_rps,
+                               capacity=args.capacity, crawl_delay=args.crawl_delay, assets=args.assets)
+    site = FixtureSite(config, host=args.host, port=args.port)
+    print(f"Fixture site on {site.url} (sitemap: {site.sitemap_url})")
+    try:
+        site.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
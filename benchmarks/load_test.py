@@ -0,0 +1,106 @@
+"""
+Load test for chat_with_website/query_server.py at rising concurrency.
+
+Each level runs N client threads with keep-alive connections until `--queries` queries
+have been answered, and reports queries/sec with p50/p99 latency.
+
+    python load_test.py --url http://127.0.0.1:8000 --concurrency 1,4,16,64
+    python load_test.py --endpoint query --concurrency 1,8   # full answers, read to the last chunk
+"""
+import json
+import time
+import random
+import argparse
+import threading
+import http.client
+from urllib.parse import urlparse
+
+from run_benchmarks import percentile
+
+QUERY_WORDS = ("install configure deploy monitor scale secure debug upgrade migrate backup "
+               "cluster cache index replica shard queue worker latency").split()
+
+
+def make_query(rng):
+    return "how do I " + " ".join(rng.choice(QUERY_WORDS) for _ in range(rng.randint(3, 8)))
+
+
+def _request(connection, endpoint, query):
+    body = {"query": query}
+    if endpoint == "query":
+        body["stream"] = True
+    # Bytes, so http.client sends headers and body in one packet
+    connection.request("POST", f"/{endpoint}", json.dumps(body).encode(), {"Content-Type": "application/json"})
+    response = connection.getresponse()
+    data = response.read()
+    if response.status != 200:
+        raise RuntimeError(f"HTTP {response.status}: {data[:200]!r}")
+    return data
+
+
+def run_level(url, concurrency, queries, endpoint="search", seed=0):
+    """queries/sec and latency percentiles for `queries` requests from `concurrency` threads"""
+    parsed = urlparse(url)
+    remaining = [queries]
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def client(index):
+        rng = random.Random(f"{seed}:{index}")
+        connection = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=60)
+        try:
+            while True:
+                with lock:
+                    if remaining[0] <= 0:
+                        return
+                    remaining[0] -= 1
+                start = time.perf_counter()
+                try:
+                    _request(connection, endpoint, make_query(rng))
+                except (OSError, RuntimeError, http.client.HTTPException) as e:
+                    connection.close()
+                    with lock:
+                        errors.append(str(e))
+                    continue
+                with lock:
+                    latencies.append(time.perf_counter() - start)
+        finally:
+            connection.close()
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    ms = [s * 1000 for s in latencies]
+    return {
+        "concurrency": concurrency, "queries": len(latencies), "errors": len(errors),
+        "queries_per_sec": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(percentile(ms, 50), 2) if ms else None,
+        "p99_ms": round(percentile(ms, 99), 2) if ms else None,
+    }
+
+
+def run(url, levels, queries, endpoint="search", seed=0):
+    return [run_level(url, level, queries, endpoint, seed) for level in levels]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--concurrency", default="1,4,16,64", help="Comma-separated client counts")
+    parser.add_argument("--queries", type=int, default=500, help="Queries per concurrency level")
+    parser.add_argument("--endpoint", choices=("search", "query"), default="search")
+    args = parser.parse_args()
+
+    print(f"{'clients':>8} {'queries/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for level in map(int, args.concurrency.split(",")):
+        result = run_level(args.url, level, args.queries, args.endpoint)
+        print(f"{level:>8} {result['queries_per_sec']:>10} {result['p50_ms']:>9} {result['p99_ms']:>9} "
+              f"{result['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,891 @@
+"""
+Benchmark suite for the four apps, run against local stand-ins only.
+
+Each benchmark runs in its own subprocess (the apps all ship a `main.py` and
+would otherwise shadow each other) and reports JSON metrics. Benchmarks whose
+app dependencies are not installed are reported as skipped.
+
+    python run_benchmarks.py --out results.json
+    python run_benchmarks.py --only ollama_chat_turn,ollama_stream_ttft
+    python compare.py baseline.json results.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import subprocess
+import statistics
+import importlib.util
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, HERE)
+# Benchmarked chatbots don't leave trace files behind; turn_tracing writes its own
+os.environ.setdefault("CHAT_TRACE_FILE", "")
+
+from fake_llm_server import FakeLLMServer, FakeLLMConfig  # noqa: E402
+from fixture_site import FixtureSite, FixtureSiteConfig  # noqa: E402
+
+sys.path.insert(0, ROOT)
+from chat_tracing import percentile  # noqa: E402
+
+BENCHMARKS = {}
+
+
+class Skipped(Exception):
+    pass
+
+
+def benchmark(func):
+    BENCHMARKS[func.__name__] = func
+    return func
+
+
+def latency_summary(samples_s, prefix="latency"):
+    ms = [s * 1000 for s in samples_s]
+    return {
+        f"{prefix}_p50_ms": round(percentile(ms, 50), 3),
+        f"{prefix}_p99_ms": round(percentile(ms, 99), 3),
+        f"{prefix}_mean_ms": round(statistics.fmean(ms), 3),
+        "samples": len(ms),
+    }
+
+
+def load_app_module(app_dir, filename="main.py"):
+    """Import an app's module from its own directory so its sibling imports resolve"""
+    path = os.path.join(ROOT, app_dir, filename)
+    sys.path.insert(0, os.path.dirname(path))
+    name = f"{app_dir}_{filename[:-3]}"
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    try:
+        spec.loader.exec_module(module)
+    except ImportError as e:
+        raise Skipped(f"{app_dir} dependencies not installed: {e}")
+    return module
+
+
+def require(*modules):
+    for module in modules:
+        if importlib.util.find_spec(module) is None:
+            raise Skipped(f"missing dependency: {module}")
+
+
+# --- LLM benchmarks -------------------------------------------------------
+
+@benchmark
+def llm_chatbot_turn(args):
+    """GeminiChatbot.get_response turn latency (scheduler + history) against the fake Gemini API"""
+    require("langchain_core")
+    from clients import FakeGenerativeModel, FakeConversation
+
+    app = load_app_module("llm_chatbot")
+    from scheduler import SchedulerConfig
+
+    with FakeLLMServer(FakeLLMConfig(seed=args.seed)) as server:
+        conversation = FakeConversation(FakeGenerativeModel("gemini-2.0-flash", server.url))
+        # A rate limit high enough that turns measure the scheduler's overhead, not its waiting
+        scheduler = app.UpstreamScheduler(SchedulerConfig(requests_per_minute=60_000))
+        chatbot = app.GeminiChatbot(conversation=conversation, scheduler=scheduler)
+        samples = []
+        for i in range(args.turns):
+            start = time.perf_counter()
+            reply = chatbot.get_response(f"Question number {i} about the product", [])
+            samples.append(time.perf_counter() - start)
+            # get_response() answers errors with an apology instead of raising; don't time those
+            if reply.startswith(("I'm having trouble", "The assistant is receiving too many requests")):
+                raise RuntimeError(f"turn {i} failed: {reply}")
+        chatbot.scheduler.shutdown()
+    return latency_summary(samples, "turn")
+
+
+@benchmark
+def ollama_chat_turn(args):
+    """initialize_chain(...).invoke turn latency with a growing history against the fake Ollama API"""
+    require("streamlit", "langchain_ollama")
+    with FakeLLMServer(FakeLLMConfig(seed=args.seed)) as server:
+        os.environ["OLLAMA_HOST"] = server.url
+        app = load_app_module("ollama_chatbot")
+        from langchain_core.messages import AIMessage, HumanMessage
+
+        chain = app.initialize_chain("gemma3:1b")
+        history = []
+        samples = []
+        for i in range(args.turns):
+            message = f"Question number {i} about the product"
+            history.append(HumanMessage(content=message))
+            start = time.perf_counter()
+            response = chain.invoke({"input": message, "history": history})
+            samples.append(time.perf_counter() - start)
+            history.append(AIMessage(content=response))
+    return latency_summary(samples, "turn")
+
+
+@benchmark
+def ollama_stream_ttft(args):
+    """Time to first token and tokens/sec when streaming from the fake Ollama API"""
+    require("streamlit", "langchain_ollama")
+    with FakeLLMServer(FakeLLMConfig(seed=args.seed, tokens_per_sec=100)) as server:
+        os.environ["OLLAMA_HOST"] = server.url
+        app = load_app_module("ollama_chatbot")
+        chain = app.initialize_chain("gemma3:1b")
+        ttfts, rates = [], []
+        for i in range(args.turns):
+            start = time.perf_counter()
+            first = None
+            chunks = 0
+            for _ in chain.stream({"input": f"Tell me about topic {i}", "history": []}):
+                if first is None:
+                    first = time.perf_counter() - start
+                chunks += 1
+            total = time.perf_counter() - start
+            ttfts.append(first)
+            rates.append(chunks / max(total - first, 1e-9))
+    result = latency_summary(ttfts, "ttft")
+    result["tokens_per_sec"] = round(statistics.fmean(rates), 2)
+    return result
+
+
+@benchmark
+def gemini_stream_ttft(args):
+    """Time to first chunk for Gemini-style SSE streaming"""
+    from clients import FakeGenerativeModel
+
+    with FakeLLMServer(FakeLLMConfig(seed=args.seed, tokens_per_sec=100)) as server:
+        model = FakeGenerativeModel("gemini-1.5-flash", server.url)
+        ttfts = []
+        for i in range(args.turns):
+            start = time.perf_counter()
+            for _ in model.generate_content(f"Write about topic {i}", stream=True):
+                ttfts.append(time.perf_counter() - start)
+                break
+    return latency_summary(ttfts, "ttft")
+
+
+@benchmark
+def gemini_provider(args):
+    """Shared provider overhead and throughput (8 threads) against the fake Gemini API"""
+    from concurrent.futures import ThreadPoolExecutor
+    from clients import FakeGenerativeModel
+
+    sys.path.insert(0, ROOT)
+    from gemini_provider import GeminiProvider
+
+    with FakeLLMServer(FakeLLMConfig(seed=args.seed, reply_tokens=50, tokens_per_sec=5000)) as server:
+        direct = FakeGenerativeModel("gemini-1.5-flash", server.url)
+        provider = GeminiProvider(model_factory=lambda name, **kwargs: FakeGenerativeModel(name, server.url))
+        samples = {"direct": [], "provider": []}
+        for i in range(args.turns):
+            for name, model in (("direct", direct), ("provider", provider.model("gemini-1.5-flash"))):
+                start = time.perf_counter()
+                model.generate_content(f"Question {i}")
+                samples[name].append(time.perf_counter() - start)
+        calls = args.turns * 8
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(lambda i: provider.model("gemini-1.5-flash").generate_content(f"Question {i}"), range(calls)))
+        elapsed = time.perf_counter() - start
+    stats = provider.stats()["gemini-1.5-flash"]
+    return {
+        "direct_p50_ms": round(percentile(samples["direct"], 50) * 1000, 3),
+        "provider_p50_ms": round(percentile(samples["provider"], 50) * 1000, 3),
+        "calls_per_sec_8_threads": round(calls / elapsed, 3),
+        "recorded_calls": stats["calls"],
+        "recorded_output_tokens": stats["output_tokens"],
+    }
+
+
+@benchmark
+def turn_tracing(args):
+    """Per-stage turn tracing: overhead on GeminiChatbot turns, and the stage report for both chatbots"""
+    require("langchain")
+    from clients import FakeGenerativeModel
+
+    app = load_app_module("llm_chatbot")
+    from scheduler import SchedulerConfig
+    from gemini_provider import GeminiProvider, as_langchain_llm
+    from chat_tracing import Tracer, callback_handler, load_spans, aggregate
+    from langchain.chains import ConversationChain
+    from langchain.memory import ConversationBufferMemory
+    from langchain.prompts import PromptTemplate
+
+    directory = tempfile.mkdtemp()
+    paths = {"gemini": os.path.join(directory, "gemini.jsonl"), "ollama": os.path.join(directory, "ollama.jsonl")}
+    with FakeLLMServer(FakeLLMConfig(seed=args.seed, tokens_per_sec=2000, base_latency=0.005)) as server:
+        provider = GeminiProvider(model_factory=lambda name, **kwargs: FakeGenerativeModel(name, server.url))
+        llm = as_langchain_llm(provider.model("gemini-2.0-flash", max_retries=0))
+
+        def conversation():
+            prompt = PromptTemplate(input_variables=["history", "input"],
+                                    template="Current conversation:\n{history}\nHuman: {input}\nAI Assistant:")
+            return ConversationChain(llm=llm, memory=ConversationBufferMemory(return_messages=True), prompt=prompt)
+
+        # A rate limit high enough that the scheduler never holds a turn back
+        scheduler = app.UpstreamScheduler(SchedulerConfig(requests_per_minute=60_000))
+        untraced = conversation()
+        traced = app.GeminiChatbot(conversation=conversation(), scheduler=scheduler,
+                                   tracer=Tracer.from_env("llm_chatbot", paths["gemini"]))
+        samples = {"untraced": [], "traced": []}
+        for i in range(args.turns):
+            message = f"Question number {i} about the product"
+            start = time.perf_counter()
+            traced.scheduler.call(untraced.predict, input=message)
+            samples["untraced"].append(time.perf_counter() - start)
+            start = time.perf_counter()
+            traced.get_response(message, [])
+            samples["traced"].append(time.perf_counter() - start)
+        traced.scheduler.shutdown()
+        result = {
+            "untraced_turn_p50_ms": round(percentile(samples["untraced"], 50) * 1000, 3),
+            "traced_turn_p50_ms": round(percentile(samples["traced"], 50) * 1000, 3),
+        }
+
+        try:
+            require("langchain_ollama")
+        except Skipped:
+            del paths["ollama"]
+        else:
+            sys.path.insert(0, os.path.join(ROOT, "ollama_chatbot"))
+            from chains import build_chain
+            from langchain_core.messages import AIMessage, HumanMessage
+
+            chain = build_chain("gemma3:1b", host=server.url)
+            tracer = Tracer.from_env("ollama_chatbot", paths["ollama"])
+            history = []
+            for i in range(args.turns):
+                history.append(HumanMessage(content=f"Question number {i} about the product"))
+                with tracer.turn("ollama") as turn:
+                    callbacks = [callback_handler(turn)]
+                    response = "".join(chain.stream({"input": history[-1].content, "context": "", "history": history},
+                                                    config={"callbacks": callbacks}))
+                history.append(AIMessage(content=response))
+
+    for label, path in paths.items():
+        report = aggregate(load_spans(path))
+        for name, stage in report["stages"].items():
+            result[f"{label}_{name}_p50_ms"] = stage["p50_ms"]
+            result[f"{label}_{name}_p95_ms"] = stage["p95_ms"]
+        tokens = sum(s["prompt_tokens"] + s["completion_tokens"] for s in report["sessions"].values())
+        result[f"{label}_tokens_per_turn"] = round(tokens / report["turns"], 1)
+        result[f"{label}_trace_bytes_per_turn"] = round(os.path.getsize(path) / report["turns"])
+    return result
+
+
+@benchmark
+def session_memory(args):
+    """Ollama app memory per session: the old messages + chat_history copies vs. the session store, with a budget"""
+    require("langchain_core")
+    import random
+    import tracemalloc
+    from langchain_core.messages import AIMessage, HumanMessage
+
+    sessions_module = load_app_module("ollama_chatbot", "sessions.py")
+    history_module = load_app_module("ollama_chatbot", "history.py")
+    rng = random.Random(args.seed)
+    words = "the model answers questions about the indexed product documentation in detail".split()
+    pool = [{"source": f"manual-{i}.pdf", "text": " ".join(rng.choices(words, k=150))} for i in range(20)]
+    n_sessions, n_turns = 100, args.turns
+
+    def turns():
+        for i in range(n_turns):
+            # Each search returns fresh dicts and strings, as DocumentIndex.search does
+            passages = [{"source": passage["source"], "text": passage["text"].encode().decode(), "distance": rng.random()}
+                        for passage in rng.sample(pool, 4)]
+            yield f"Question {i}: " + " ".join(rng.choices(words, k=30)), " ".join(rng.choices(words, k=200)), passages
+
+    def measure(build):
+        tracemalloc.start()
+        kept = [build() for _ in range(n_sessions)]
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        return kept, size
+
+    def old_layout():
+        messages, chat_history = [], []
+        for question, answer, passages in turns():
+            messages += [{"role": "user", "content": question}, {"role": "assistant", "content": answer, "sources": passages}]
+            chat_history += [HumanMessage(content=question), AIMessage(content=answer)]
+        return messages, chat_history
+
+    directory = tempfile.mkdtemp()
+    registry = sessions_module.SessionRegistry(directory=directory, memory_budget=2 ** 40)
+    manager = history_module.HistoryManager(budget=1536)
+
+    def store():
+        session_id = f"s{len(registry.sessions)}"
+        conversation = registry.open(session_id)
+        registry.touch(session_id, conversation)
+        for question, answer, passages in turns():
+            conversation.add_user(question)
+            manager.reset()
+            manager.window(conversation.history)
+            conversation.add_assistant(answer, passages)
+        return conversation
+
+    _, old_bytes = measure(old_layout)
+    conversations, store_bytes = measure(store)
+    result = {
+        "sessions": n_sessions,
+        "messages_per_session": 2 * n_turns,
+        "old_kb_per_session": round(old_bytes / n_sessions / 1024, 1),
+        "store_kb_per_session": round(store_bytes / n_sessions / 1024, 1),
+        "store_resident_kb_per_session": round(registry.report()["resident_bytes"] / n_sessions / 1024, 1),
+    }
+
+    # Window assembly for one turn, with the session in memory and right after it was unloaded
+    conversation = conversations[-1]
+    manager.reset()
+    manager.window(conversation.history)
+    samples = {"resident": [], "reloaded": []}
+    for _ in range(20):
+        start = time.perf_counter()
+        manager.window(conversation.history)
+        samples["resident"].append(time.perf_counter() - start)
+        conversation.unload()
+        start = time.perf_counter()
+        conversation.touch()
+        manager.window(conversation.history)
+        samples["reloaded"].append(time.perf_counter() - start)
+    result["window_resident_p50_ms"] = round(percentile(samples["resident"], 50) * 1000, 3)
+    result["window_reloaded_p50_ms"] = round(percentile(samples["reloaded"], 50) * 1000, 3)
+
+    # A budget of a quarter of the sessions: touching each in turn unloads the least recently active
+    registry.memory_budget = registry.report()["resident_bytes"] // 4
+    for i, conversation in enumerate(conversations):
+        registry.touch(f"s{i}", conversation)
+    report = registry.report()
+    result.update({
+        "budget_kb": registry.memory_budget // 1024,
+        "budget_resident_kb": report["resident_bytes"] // 1024,
+        "budget_unloads": report["unloads"],
+        "disk_kb_per_session": round(report["disk_bytes"] / n_sessions / 1024, 1),
+    })
+    registry.close()
+    return result
+
+
+@benchmark
+def blog_generate(args):
+    """GenerateBlogWorker.run wall-clock time and time to first chunk against the fake Gemini API"""
+    require("PyQt6", "google.generativeai", "docx")
+    from clients import FakeGenerativeModel
+
+    app = load_app_module("blog_generator")
+    with FakeLLMServer(FakeLLMConfig(seed=args.seed, reply_tokens=400, tokens_per_sec=2000)) as server:
+        model = FakeGenerativeModel("gemini-1.5-flash", server.url)
+        samples, ttfts = [], []
+        for i in range(max(1, args.turns // 2)):
+            worker = app.GenerateBlogWorker(model, f"Title {i}", "speed, cache", 500)
+            first_chunk = []
+            worker.chunk_received.connect(lambda _: first_chunk.append(time.perf_counter()))
+            start = time.perf_counter()
+            worker.run()
+            samples.append(time.perf_counter() - start)
+            ttfts.append(first_chunk[0] - start)
+    result = latency_summary(samples, "blog")
+    result.update(latency_summary(ttfts, "ttft"))
+    return result
+
+
+@benchmark
+def blog_titles(args):
+    """Distinct titles per second: one "10 titles" call vs. 4 concurrent samples with near-duplicate filtering"""
+    require("numpy")
+    from clients import FakeGenerativeModel
+
+    prompts = load_app_module("blog_generator", "prompts.py")
+    titles = load_app_module("blog_generator", "titles.py")
+    topics = [f"topic {i}" for i in range(max(1, args.turns // 4))]
+    single_distinct = sampled_distinct = single_time = sampled_time = 0.0
+    with FakeLLMServer(FakeLLMConfig(seed=args.seed, tokens_per_sec=100)) as server:
+        model = FakeGenerativeModel("gemini-1.5-flash", server.url)
+        for topic in topics:
+            start = time.perf_counter()
+            text = model.generate_content(prompts.titles_prompt(topic)).text
+            candidates = [titles.TitleCandidate(title, 0, None) for title in prompts.parse_titles(text)]
+            single_distinct += len(titles.rank_titles(candidates, topic, limit=None))
+            single_time += time.perf_counter() - start
+
+            sampler = titles.TitleSampler(model, limit=None)
+            start = time.perf_counter()
+            sampled_distinct += len(sampler.run(topic))
+            sampled_time += time.perf_counter() - start
+    return {
+        "single_distinct_per_call": round(single_distinct / len(topics), 2),
+        "sampled_distinct_per_run": round(sampled_distinct / len(topics), 2),
+        "single_distinct_per_sec": round(single_distinct / single_time, 3),
+        "sampled_distinct_per_sec": round(sampled_distinct / sampled_time, 3),
+    }
+
+
+@benchmark
+def blog_batch(args):
+    """BatchGenerator posts/sec, one worker vs. a pool of 8, against the fake Gemini API"""
+    from clients import FakeGenerativeModel
+
+    batch = load_app_module("blog_generator", "batch.py")
+    titles = [f"Title {i}" for i in range(max(8, args.turns))]
+    result = {}
+    with FakeLLMServer(FakeLLMConfig(seed=args.seed, reply_tokens=400, tokens_per_sec=2000)) as server:
+        model = FakeGenerativeModel("gemini-1.5-flash", server.url)
+        for workers in (1, 8):
+            generator = batch.BatchGenerator(model, "speed, cache", 500, max_workers=workers, requests_per_minute=0)
+            start = time.perf_counter()
+            jobs = generator.run(titles)
+            elapsed = time.perf_counter() - start
+            result[f"posts_per_sec_{workers}_workers"] = round(sum(job.status == batch.DONE for job in jobs) / elapsed, 3)
+    return result
+
+
+@benchmark
+def blog_sectioned(args):
+    """3,000-word post: one long call vs. outline + parallel sections + stitching"""
+    from clients import FakeGenerativeModel
+
+    pipeline = load_app_module("blog_generator", "pipeline.py")
+    # ~4,000 tokens for the single call; sections are capped by their own max_output_tokens
+    with FakeLLMServer(FakeLLMConfig(seed=args.seed, reply_tokens=4000, tokens_per_sec=400)) as server:
+        model = FakeGenerativeModel("gemini-1.5-flash", server.url)
+        start = time.perf_counter()
+        model.generate_content("Write a 3000-word blog post")
+        single = time.perf_counter() - start
+        section_times = []
+        generator = pipeline.SectionedGenerator(model, "Title", "speed, cache", 3000)
+        call = generator._call
+
+        def timed_call(prompt, max_tokens):
+            call_start = time.perf_counter()
+            try:
+                return call(prompt, max_tokens)
+            finally:
+                section_times.append(time.perf_counter() - call_start)
+
+        generator._call = timed_call
+        start = time.perf_counter()
+        generator.run()
+        sectioned = time.perf_counter() - start
+    return {"single_call_s": round(single, 3), "sectioned_s": round(sectioned, 3),
+            "slowest_call_s": round(max(section_times), 3), "calls": len(section_times)}
+
+
+def markdown_post(i, seed, sections=6):
+    """A generated-looking ~1,000-word markdown post with headings, lists and emphasis"""
+    import random
+
+    rng = random.Random(seed * 1000 + i)
+    words = ["latency", "cache", "throughput", "model", "prompt", "token", "index", "batch", "stream", "worker"]
+
+    def sentence():
+        return " ".join(rng.choice(words) for _ in range(rng.randint(8, 16))).capitalize() + "."
+
+    parts = []
+    for section in range(sections):
+        parts.append(f"## Section {section + 1}: **{rng.choice(words).title()}** matters")
+        parts.append(" ".join(sentence() for _ in range(4)) + f" This is *important* for `{rng.choice(words)}`.")
+        parts.append("\n".join(f"- **{rng.choice(words).title()}:** {sentence()}" for _ in range(4)))
+        parts.append("### Steps")
+        parts.append("\n".join(f"{n}. {sentence()}" for n in range(1, 4)))
+        parts.append(" ".join(sentence() for _ in range(3)))
+    return "\n\n".join(parts)
+
+
+@benchmark
+def blog_export(args):
+    """Markdown-to-DOCX export docs/sec for 100 generated posts, one process vs. a process pool"""
+    require("docx")
+    sys.path.insert(0, os.path.join(ROOT, "blog_generator"))
+    import export
+
+    posts = [{"title": f"Post {i}", "content": markdown_post(i, args.seed), "model_name": "gemini-1.5-flash",
+              "keywords": "speed, cache", "word_count": 1000} for i in range(100)]
+    with tempfile.TemporaryDirectory() as workdir:
+        start = time.perf_counter()
+        for i, post in enumerate(posts):
+            export.write_blog_docx(os.path.join(workdir, f"{i}.docx"), post["title"], post["content"],
+                                   post["model_name"], post["keywords"], post["word_count"])
+        serial = time.perf_counter() - start
+        start = time.perf_counter()
+        export.bulk_export(posts, os.path.join(workdir, "bulk"))
+        pooled = time.perf_counter() - start
+    return {"documents": len(posts), "processes": os.cpu_count(),
+            "docs_per_sec_serial": round(len(posts) / serial, 3),
+            "docs_per_sec_pool": round(len(posts) / pooled, 3)}
+
+
+# --- chat_with_website benchmarks ----------------------------------------
+
+def fixture_documents(count, seed):
+    from fixture_site import page_body
+    import re
+
+    config = FixtureSiteConfig(pages=count, seed=seed)
+    return [re.sub(r"<[^>]+>", "", page_body(i, config)) for i in range(count)]
+
+
+@benchmark
+def index_dedupe(args):
+    """Boilerplate stripping + SimHash near-duplicate skipping on fixture pages (every 5th page a near-copy)"""
+    from fixture_site import render_page
+    import re
+
+    dedupe = load_app_module("chat_with_website", "dedupe.py")
+    config = FixtureSiteConfig(pages=args.pages, duplicate_every=5, seed=args.seed)
+    # Roughly what the markdown generator keeps: the text of every element, one per line
+    pages = [(f"/page/{i}.html", re.sub(r"<[^>]+>", "\n", render_page(i, config))) for i in range(args.pages)]
+    start = time.perf_counter()
+    documents, metadatas, report = dedupe.prepare_documents(pages)
+    elapsed = time.perf_counter() - start
+    result = report.as_dict()
+    result.update({"bytes_saved_pct": round(report.bytes_saved / report.bytes_in * 100, 1),
+                   "pages_per_sec": round(len(pages) / elapsed, 3)})
+    return result
+
+
+@benchmark
+def frontier_crawl(args):
+    """Link-following discovery of the fixture site without its sitemap, pause/resume, and frontier URLs/sec"""
+    import re
+    import urllib.request
+
+    frontier_module = load_app_module("chat_with_website", "frontier.py")
+
+    def crawl(frontier, limit=None):
+        fetched = 0
+        while (item := frontier.pop()) is not None and (limit is None or fetched < limit):
+            url, depth = item
+            try:
+                with urllib.request.urlopen(url, timeout=10) as response:
+                    html = response.read().decode()
+                ok = True
+            except OSError:
+                html, ok = "", False
+            fetched += 1
+            for href in re.findall(r'href="([^"]+)"', html):
+                frontier.add(href, depth + 1, base=url)
+            frontier.finish(url, ok)
+        return fetched
+
+    with tempfile.TemporaryDirectory() as workdir, FixtureSite(FixtureSiteConfig(pages=args.pages, seed=args.seed)) as site:
+        path = os.path.join(workdir, "frontier.sqlite3")
+        frontier = frontier_module.Frontier(path, seeds=[site.url + "/"], max_pages=100000, max_depth=50)
+        start = time.perf_counter()
+        first = crawl(frontier, limit=args.pages // 2)
+        frontier.close()
+        # Resume from disk, like a paused crawl
+        frontier = frontier_module.Frontier(path, seeds=[site.url + "/"], max_pages=100000, max_depth=50)
+        second = crawl(frontier)
+        elapsed = time.perf_counter() - start
+        discovered = frontier.count(frontier_module.DONE)
+        frontier.close()
+
+        # 100,000 distinct pages, each linked twice with different tracking parameters and fragments
+        urls = [f"https://example.com/docs/{i % 100000}/?b={i % 100000 % 7}&utm_source={i}#frag{i}" for i in range(200000)]
+        frontier = frontier_module.Frontier(os.path.join(workdir, "synthetic.sqlite3"),
+                                            seeds=["https://example.com/docs/"], max_depth=5)
+        start = time.perf_counter()
+        for url in urls:
+            frontier.add(url, 1)
+        add_elapsed = time.perf_counter() - start
+        queued = frontier.count(frontier_module.QUEUED)
+        frontier.close()
+    return {
+        "site_pages": args.pages, "pages_discovered": discovered, "fetches": first + second,
+        "resumed_after": first, "discovery_s": round(elapsed, 3),
+        "frontier_urls_per_sec": round(len(urls) / add_elapsed, 1), "synthetic_unique_queued": queued,
+        "bloom_bytes": len(frontier.bloom.bits),
+    }
+
+
+@benchmark
+def adaptive_throttle(args):
+    """Per-host AIMD throttle vs. a fixed pool against a fixture site that answers 429 above 40 req/s"""
+    import asyncio
+    import urllib.request
+    from urllib.error import HTTPError
+    from concurrent.futures import ThreadPoolExecutor
+
+    throttle_module = load_app_module("chat_with_website", "throttle.py")
+    workers = 16
+
+    def get(url):
+        try:
+            with urllib.request.urlopen(url, timeout=10) as response:
+                response.read()
+                return response.status, None
+        except HTTPError as e:
+            return e.code, e.headers.get("Retry-After")
+
+    async def crawl(urls, throttle=None):
+        loop = asyncio.get_running_loop()
+        queue, statuses = list(reversed(urls)), []
+        with ThreadPoolExecutor(workers) as pool:
+            async def worker():
+                while queue:
+                    url = queue.pop()
+                    if throttle is not None:
+                        await throttle.acquire(url)
+                    start = time.monotonic()
+                    status, retry_after = await loop.run_in_executor(pool, get, url)
+                    if throttle is not None:
+                        await throttle.release(url, time.monotonic() - start, status, retry_after)
+                    statuses.append(status)
+                    if status == 429:
+                        queue.insert(0, url)
+
+            start = time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(workers)))
+            return statuses, time.perf_counter() - start
+
+    results = {}
+    pages = max(args.pages, 600)
+    config = FixtureSiteConfig(pages=pages, seed=args.seed, latency=0.02, capacity=4, max_rps=40, retry_after=0.25)
+    for name, throttle in (("fixed", None), ("adaptive", throttle_module.Throttle())):
+        with FixtureSite(config) as site:
+            statuses, elapsed = asyncio.run(crawl(site.page_urls(), throttle))
+            results[f"{name}_pages_per_sec"] = round(pages / elapsed, 1)
+            results[f"{name}_429s"] = statuses.count(429)
+            results[f"{name}_requests_per_page"] = round(len(statuses) / pages, 2)
+            results[f"{name}_peak_inflight"] = site.peak_inflight
+        if throttle is not None:
+            results["adaptive_final_rate"] = round(next(iter(throttle.hosts.values())).rate, 1)
+
+    # robots.txt Crawl-delay caps the rate, however fast the host answers
+    with FixtureSite(FixtureSiteConfig(pages=100, seed=args.seed, crawl_delay=0.05)) as site:
+        throttle = throttle_module.Throttle()
+        statuses, elapsed = asyncio.run(crawl(site.page_urls(), throttle))
+        results["crawl_delay_pages_per_sec"] = round(len(statuses) / elapsed, 1)
+        results["crawl_delay_max_rate"] = next(iter(throttle.hosts.values())).max_rate
+    return results
+
+
+@benchmark
+def crawl_pages_per_sec(args):
+    """CrawlerThread.crawl_sequential throughput against the fixture site (headless Chromium)"""
+    require("PyQt6", "crawl4ai", "chromadb")
+    app = load_app_module("chat_with_website", "app.py")
+    with tempfile.TemporaryDirectory() as workdir, FixtureSite(FixtureSiteConfig(pages=args.pages, seed=args.seed)) as site:
+        os.chdir(workdir)
+        crawler = app.CrawlerThread(site.sitemap_url, os.path.join(workdir, "out"))
+        urls = crawler.get_sitemap_urls()
+        import asyncio
+
+        start = time.perf_counter()
+        documents = asyncio.run(crawler.crawl_sequential(urls))
+        elapsed = time.perf_counter() - start
+    return {"pages": len(urls), "crawled": len(documents), "elapsed_s": round(elapsed, 3),
+            "pages_per_sec": round(len(documents) / elapsed, 3)}
+
+
+@benchmark
+def render_profile(args):
+    """Full vs. lean render profile on a fixture site with heavy assets: bandwidth, render time, peak RSS, hung pages"""
+    require("crawl4ai", "psutil")
+    import asyncio
+    import dataclasses
+
+    render = load_app_module("chat_with_website", "render.py")
+
+    async def crawl(profile, site, sessions=4):
+        renderer = await render.Renderer(profile).start()
+        queue = list(reversed(site.page_urls()))
+        failed = []
+        start = time.perf_counter()
+
+        async def worker(session_id):
+            while queue:
+                url = queue.pop()
+                result = await renderer.render(url, session_id)
+                if result is None or not result.success:
+                    failed.append(url)
+
+        try:
+            await asyncio.gather(*(worker(f"session{i}") for i in range(sessions)))
+            renderer.stats.sample_rss()
+        finally:
+            await renderer.close()
+        return dict(renderer.stats.as_dict(), failed=len(failed)), time.perf_counter() - start
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        for profile in (render.FULL_PROFILE, dataclasses.replace(render.LEAN_PROFILE, recycle_after=10)):
+            with FixtureSite(FixtureSiteConfig(pages=args.pages, seed=args.seed, assets=True)) as site:
+                stats, elapsed = asyncio.run(crawl(profile, site))
+            name = profile.name
+            results[f"{name}_pages_per_sec"] = round(stats["pages"] / elapsed, 2)
+            results[f"{name}_mb_downloaded"] = round(stats["bytes_downloaded"] / 1e6, 2)
+            results[f"{name}_render_p50_ms"] = stats["render_p50_ms"]
+            results[f"{name}_render_p95_ms"] = stats["render_p95_ms"]
+            results[f"{name}_peak_rss_mb"] = round(stats["peak_rss_bytes"] / 1e6, 1)
+        results["lean_requests_blocked"] = sum(stats["requests_blocked"].values())
+        results["bandwidth_saved_pct"] = round(100 * (1 - results["lean_mb_downloaded"] / results["full_mb_downloaded"]), 1)
+        results["rss_saved_mb"] = round(results["full_peak_rss_mb"] - results["lean_peak_rss_mb"], 1)
+
+        # Every 10th page hangs for a minute; the page and render timeouts move the crawl past it
+        hung = dataclasses.replace(render.LEAN_PROFILE, page_timeout=3, render_timeout=5)
+        with FixtureSite(FixtureSiteConfig(pages=30, seed=args.seed, stall_every=10, stall_seconds=60)) as site:
+            stats, elapsed = asyncio.run(crawl(hung, site))
+        results["stalled_pages_given_up"] = stats["failed"]
+        results["stalled_crawl_s"] = round(elapsed, 2)
+    return results
+
+
+@benchmark
+def embedding_docs_per_sec(args):
+    """ChromaDBManager.add_documents throughput (ONNX MiniLM embeddings)"""
+    require("PyQt6", "crawl4ai", "chromadb")
+    app = load_app_module("chat_with_website", "app.py")
+    documents = fixture_documents(args.pages, args.seed)
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        manager = app.ChromaDBManager()
+        # Embed one document first so model loading is not counted
+        manager.add_documents(["warm up"])
+        start = time.perf_counter()
+        manager.add_documents(documents)
+        elapsed = time.perf_counter() - start
+    return {"documents": len(documents), "elapsed_s": round(elapsed, 3),
+            "docs_per_sec": round(len(documents) / elapsed, 3)}
+
+
+@benchmark
+def retrieval_latency(args):
+    """ChromaDBManager.search_documents p50/p99 over the fixture corpus"""
+    require("PyQt6", "crawl4ai", "chromadb")
+    app = load_app_module("chat_with_website", "app.py")
+    documents = fixture_documents(args.pages, args.seed)
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        manager = app.ChromaDBManager()
+        manager.add_documents(documents)
+        queries = [f"how to {topic} the cluster" for topic in ("install", "deploy", "scale", "secure", "debug")]
+        manager.search_documents(queries[0])
+        samples = []
+        for i in range(args.queries):
+            start = time.perf_counter()
+            manager.search_documents(queries[i % len(queries)])
+            samples.append(time.perf_counter() - start)
+    return latency_summary(samples, "query")
+
+
+@benchmark
+def query_server_load(args):
+    """query_server.py /search queries/sec and p99 at 1-64 concurrent users, micro-batched vs. one query per batch"""
+    require("chromadb")
+    import threading
+    import load_test
+
+    os.environ["GEMINI_BACKEND"] = "fake"
+    store_module = load_app_module("chat_with_website", "store.py")
+    server_module = load_app_module("chat_with_website", "query_server.py")
+    levels = [1, 4, 16, 64]
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        store = store_module.ChromaDBManager(path=os.path.join(workdir, "chroma"))
+        store.add_documents(fixture_documents(args.pages, args.seed))
+        store.warm_up()
+        model = server_module.get_provider("fake").model(server_module.MODEL_NAME)
+        for mode, max_batch in (("unbatched", 1), ("batched", server_module.MAX_BATCH)):
+            service = server_module.QueryService(store, model, max_batch=max_batch)
+            server = server_module.QueryServer(("127.0.0.1", 0), service)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            try:
+                for level in load_test.run(server.url, levels, args.queries, seed=args.seed):
+                    results[f"{mode}_c{level['concurrency']}_queries_per_sec"] = level["queries_per_sec"]
+                    results[f"{mode}_c{level['concurrency']}_p99_ms"] = level["p99_ms"]
+                if max_batch > 1:
+                    # Streamed answers from the offline Gemini backend, read to the last chunk
+                    level = load_test.run_level(server.url, 16, args.queries, endpoint="query", seed=args.seed)
+                    results["stream_c16_queries_per_sec"] = level["queries_per_sec"]
+                    results["stream_c16_p99_ms"] = level["p99_ms"]
+                    results["mean_batch"] = service.stats()["mean_batch"]
+            finally:
+                server.shutdown()
+                server.server_close()
+                service.batcher.close()
+    return results
+
+
+# --- runner ---------------------------------------------------------------
+
+def run_single(name, args):
+    """Run one benchmark in this process and print its JSON result"""
+    try:
+        result = BENCHMARKS[name](args)
+    except Skipped as e:
+        result = {"skipped": str(e)}
+    except Exception as e:
+        result = {"error": f"{type(e).__name__}: {e}"}
+    print("RESULT " + json.dumps(result), flush=True)
+
+
+def run_isolated(name, args):
+    command = [sys.executable, __file__, "--single", name, "--turns", str(args.turns),
+               "--pages", str(args.pages), "--queries", str(args.queries), "--seed", str(args.seed)]
+    proc = subprocess.run(command, capture_output=True, text=True, cwd=HERE)
+    for line in proc.stdout.splitlines():
+        if line.startswith("RESULT "):
+            return json.loads(line[len("RESULT "):])
+    return {"error": f"benchmark process exited with {proc.returncode}: {proc.stderr.strip()[-500:]}"}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, cwd=ROOT).stdout.strip()
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", help="Write JSON results to this file")
+    parser.add_argument("--only", help="Comma-separated benchmark names (default: all)")
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--list", action="store_true", help="List benchmarks and exit")
+    parser.add_argument("--single", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.list:
+        for name, func in BENCHMARKS.items():
+            print(f"{name:24} {func.__doc__}")
+        return
+    if args.single:
+        run_single(args.single, args)
+        return
+
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "git_commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": {"turns": args.turns, "pages": args.pages, "queries": args.queries, "seed": args.seed},
+        },
+        "benchmarks": {},
+    }
+    for name in names:
+        print(f"running {name} ...", file=sys.stderr, flush=True)
+        results["benchmarks"][name] = run_isolated(name, args)
+        print(f"  {json.dumps(results['benchmarks'][name])}", file=sys.stderr, flush=True)
+
+    output = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+import os
+import sys
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from prompts import blog_prompt
+from cache import BLOG, blog_params, model_id
+
+# Retry classification is shared with the other apps through the provider at the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from gemini_provider import is_retryable
+
+QUEUED = "queued"
+RUNNING = "running"
+RETRYING = "retrying"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+class RateLimiter:
+    """Spaces requests evenly so at most `per_minute` start in any minute, across all threads (0 = no limit)"""
+
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self.next_slot = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self, cancelled=None):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        delay = slot - time.monotonic()
+        if delay > 0:
+            # Wake early when the batch is cancelled
+            (cancelled or threading.Event()).wait(delay)
+
+
+class BatchJob:
+    def __init__(self, index, title):
+        self.index = index
+        self.title = title
+        self.status = QUEUED
+        self.attempts = 0
+        self.error = None
+        self.text = None
+        self.path = None
+        self.elapsed = None
+        self.cached = False
+
+
+class BatchGenerator:
+    """
+    Generates one blog post per title on a bounded thread pool. Requests are rate
+    limited, retryable errors are retried with exponential backoff, and every post
+    is exported to .docx as soon as it finishes. Posts already in `cache` are reused
+    unless `force` is set. `on_update(job)` is called from the pool threads whenever
+    a job changes state.
+    """
+
+    def __init__(self, model, keywords, word_count, output_dir=None, model_name="", max_workers=4,
+                 requests_per_minute=15, max_retries=3, on_update=None, cache=None, force=False):
+        self.model = model
+        self.keywords = keywords
+        self.word_count = word_count
+        self.output_dir = output_dir
+        self.model_name = model_name
+        self.max_workers = max_workers
+        self.limiter = RateLimiter(requests_per_minute)
+        self.max_retries = max_retries
+        self.on_update = on_update
+        self.cache = cache
+        self.force = force
+        self.cancelled = threading.Event()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def _update(self, job, status, error=None):
+        job.status = status
+        job.error = error
+        if self.on_update:
+            self.on_update(job)
+
+    def _generate(self, job):
+        params = blog_params(job.title, self.keywords, self.word_count)
+        if self.cache is not None and not self.force:
+            text = self.cache.get(BLOG, model_id(self.model), params)
+            if text:
+                job.cached = True
+                return text
+        text = self._call(job)
+        if self.cache is not None and text is not None:
+            self.cache.put(BLOG, model_id(self.model), params, text)
+        return text
+
+    def _call(self, job):
+        for attempt in range(self.max_retries + 1):
+            self.limiter.wait(self.cancelled)
+            if self.cancelled.is_set():
+                return None
+            job.attempts = attempt + 1
+            try:
+                return self.model.generate_content(blog_prompt(job.title, self.keywords, self.word_count)).text
+            except Exception as e:
+                if attempt == self.max_retries or not is_retryable(e):
+                    raise
+                self._update(job, RETRYING, str(e))
+                # Full jitter so parallel jobs don't retry in lockstep
+                self.cancelled.wait(random.uniform(0, min(30.0, 2.0 * 2 ** attempt)))
+
+    def _export(self, job):
+        # python-docx is only needed when exporting
+        from export import slugify, write_blog_docx
+
+        filename = f"{job.index + 1:02d}_{slugify(job.title)}.docx"
+        return write_blog_docx(os.path.join(self.output_dir, filename), job.title, job.text,
+                               self.model_name, self.keywords, self.word_count)
+
+    def _run_job(self, job):
+        if self.cancelled.is_set():
+            self._update(job, CANCELLED)
+            return job
+        self._update(job, RUNNING)
+        start = time.perf_counter()
+        try:
+            job.text = self._generate(job)
+            if job.text is None:
+                self._update(job, CANCELLED)
+                return job
+            if self.output_dir:
+                job.path = self._export(job)
+            job.elapsed = time.perf_counter() - start
+            self._update(job, DONE)
+        except Exception as e:
+            job.elapsed = time.perf_counter() - start
+            self._update(job, FAILED, str(e))
+        return job
+
+    def run(self, titles):
+        """Generate all titles and return the jobs in input order"""
+        jobs = [BatchJob(i, title) for i, title in enumerate(titles)]
+        if self.output_dir:
+            os.makedirs(self.output_dir, exist_ok=True)
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="blog-batch") as pool:
+            return list(pool.map(self._run_job, jobs))
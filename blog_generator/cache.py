@@ -0,0 +1,127 @@
+import json
+import time
+import sqlite3
+import hashlib
+from contextlib import contextmanager
+
+CACHE_PATH = "generation_cache.sqlite3"
+MAX_ENTRIES = 500
+MAX_BYTES = 50 * 1024 * 1024
+TTL_SECONDS = 30 * 24 * 3600
+
+TITLES = "titles"
+BLOG = "blog"
+
+
+def _normalize_text(value):
+    return " ".join(str(value).split()).lower()
+
+
+def normalize_params(params):
+    """Parameters that produce the same prompt map to the same key: case, spacing and keyword order don't matter"""
+    normalized = {}
+    for name, value in params.items():
+        if name == "keywords":
+            value = sorted({_normalize_text(k) for k in str(value).split(",") if k.strip()})
+        elif isinstance(value, str):
+            value = _normalize_text(value)
+        normalized[name] = value
+    return normalized
+
+
+def model_id(model):
+    return getattr(model, "model_name", str(model)).removeprefix("models/")
+
+
+def blog_params(title, keywords, word_count, mode="single"):
+    return {"title": title, "keywords": keywords, "word_count": word_count, "mode": mode}
+
+
+def cache_key(kind, model_name, params):
+    payload = json.dumps({"kind": kind, "model": model_name, "params": normalize_params(params)}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class GenerationCache:
+    """
+    Persistent cache of generated titles and posts in a local SQLite file. Entries
+    expire after `ttl` seconds, and the least recently used ones are evicted once
+    there are more than `max_entries` or they take more than `max_bytes`.
+    """
+
+    def __init__(self, path=CACHE_PATH, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES, ttl=TTL_SECONDS):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        with self._connect() as db:
+            db.execute("""CREATE TABLE IF NOT EXISTS generations (
+                key TEXT PRIMARY KEY, kind TEXT, model TEXT, params TEXT, text TEXT,
+                size INTEGER, created REAL, accessed REAL)""")
+            db.execute("CREATE INDEX IF NOT EXISTS generations_accessed ON generations (accessed)")
+
+    @contextmanager
+    def _connect(self):
+        # One short-lived connection per call, so workers on any thread can use the cache
+        db = sqlite3.connect(self.path, timeout=10)
+        try:
+            with db:
+                yield db
+        finally:
+            db.close()
+
+    def get(self, kind, model_name, params):
+        key = cache_key(kind, model_name, params)
+        now = time.time()
+        with self._connect() as db:
+            row = db.execute("SELECT text, created FROM generations WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            if now - row[1] > self.ttl:
+                db.execute("DELETE FROM generations WHERE key = ?", (key,))
+                return None
+            db.execute("UPDATE generations SET accessed = ? WHERE key = ?", (now, key))
+            return row[0]
+
+    def put(self, kind, model_name, params, text):
+        if not text:
+            return
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO generations VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (cache_key(kind, model_name, params), kind, model_name, json.dumps(params), text,
+                 len(text.encode()), now, now),
+            )
+            self._evict(db, now)
+
+    def _evict(self, db, now):
+        db.execute("DELETE FROM generations WHERE created < ?", (now - self.ttl,))
+        count, size = db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM generations").fetchone()
+        if count <= self.max_entries and size <= self.max_bytes:
+            return
+        removed = 0
+        for key, entry_size in db.execute("SELECT key, size FROM generations ORDER BY accessed").fetchall():
+            if count - removed <= self.max_entries and size <= self.max_bytes:
+                break
+            db.execute("DELETE FROM generations WHERE key = ?", (key,))
+            removed += 1
+            size -= entry_size
+
+    def history(self, limit=200):
+        """Most recent generations, newest first, for the history browser"""
+        with self._connect() as db:
+            rows = db.execute(
+                "SELECT key, kind, model, params, created FROM generations ORDER BY created DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [{"key": key, "kind": kind, "model": model, "params": json.loads(params), "created": created}
+                for key, kind, model, params, created in rows]
+
+    def load(self, key):
+        with self._connect() as db:
+            row = db.execute("SELECT text FROM generations WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def clear(self):
+        with self._connect() as db:
+            db.execute("DELETE FROM generations")
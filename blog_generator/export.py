@@ -0,0 +1,203 @@
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from docx import Document
+from docx.shared import Pt
+
+HEADING = "heading"
+PARAGRAPH = "paragraph"
+BULLET = "bullet"
+NUMBERED = "numbered"
+QUOTE = "quote"
+CODE = "code"
+RULE = "rule"
+
+INLINE_PATTERN = re.compile(
+    r"\*\*\*(?P<bold_italic>.+?)\*\*\*"
+    r"|\*\*(?P<bold>.+?)\*\*|(?<!\w)__(?P<bold2>.+?)__(?!\w)"
+    r"|\*(?P<italic>[^\s*](?:.*?[^\s*])??)\*|(?<!\w)_(?P<italic2>[^\s_](?:.*?[^\s_])??)_(?!\w)"
+    r"|`(?P<code>[^`]+)`"
+    r"|\[(?P<link>[^\]]+)\]\([^)]*\)"
+)
+HEADING_PATTERN = re.compile(r"(#{1,6})\s+(.*?)(?:\s+#+)?\s*$")
+RULE_PATTERN = re.compile(r"\s*([-*_])(?:\s*\1){2,}\s*$")
+BULLET_PATTERN = re.compile(r"(\s*)[-*+]\s+(.*)")
+NUMBERED_PATTERN = re.compile(r"(\s*)\d+[.)]\s+(.*)")
+QUOTE_PATTERN = re.compile(r"\s*>\s?(.*)")
+
+
+def slugify(text, max_length=60):
+    slug = re.sub(r"[^a-zA-Z0-9]+", "-", text).strip("-").lower()
+    return slug[:max_length].rstrip("-") or "blog"
+
+
+def parse_inline(text):
+    """Split a line into runs of (text, bold, italic, code); links keep only their text"""
+    runs = []
+    position = 0
+    for match in INLINE_PATTERN.finditer(text):
+        if match.start() > position:
+            runs.append((text[position:match.start()], False, False, False))
+        kind = match.lastgroup
+        runs.append((
+            match.group(kind),
+            kind in ("bold_italic", "bold", "bold2"),
+            kind in ("bold_italic", "italic", "italic2"),
+            kind == "code",
+        ))
+        position = match.end()
+    if position < len(text):
+        runs.append((text[position:], False, False, False))
+    return runs
+
+
+def _list_level(indent):
+    return min(len(indent.expandtabs(4)) // 2, 2)
+
+
+def parse_markdown(text):
+    """
+    Parse generated markdown into a list of blocks: (HEADING, level, runs),
+    (PARAGRAPH, runs), (BULLET, level, runs), (NUMBERED, level, runs),
+    (QUOTE, runs), (CODE, text) and (RULE,).
+    """
+    blocks = []
+    paragraph = []
+    code = None
+
+    def flush():
+        if paragraph:
+            blocks.append((PARAGRAPH, parse_inline(" ".join(paragraph))))
+            paragraph.clear()
+
+    for line in text.splitlines():
+        if code is not None:
+            if line.strip().startswith("```"):
+                blocks.append((CODE, "\n".join(code)))
+                code = None
+            else:
+                code.append(line)
+            continue
+        if line.strip().startswith("```"):
+            flush()
+            code = []
+        elif not line.strip():
+            flush()
+        elif match := HEADING_PATTERN.match(line):
+            flush()
+            blocks.append((HEADING, len(match.group(1)), parse_inline(match.group(2))))
+        elif RULE_PATTERN.match(line):
+            flush()
+            blocks.append((RULE,))
+        elif match := BULLET_PATTERN.match(line):
+            flush()
+            blocks.append((BULLET, _list_level(match.group(1)), parse_inline(match.group(2))))
+        elif match := NUMBERED_PATTERN.match(line):
+            flush()
+            blocks.append((NUMBERED, _list_level(match.group(1)), parse_inline(match.group(2))))
+        elif match := QUOTE_PATTERN.match(line):
+            flush()
+            blocks.append((QUOTE, parse_inline(match.group(1))))
+        else:
+            paragraph.append(line.strip())
+    flush()
+    if code is not None:
+        blocks.append((CODE, "\n".join(code)))
+    return blocks
+
+
+def _add_runs(paragraph, runs):
+    for text, bold, italic, code in runs:
+        run = paragraph.add_run(text)
+        if bold:
+            run.bold = True
+        if italic:
+            run.italic = True
+        if code:
+            run.font.name = "Courier New"
+            run.font.size = Pt(10)
+
+
+def _styled_paragraph(doc, style_ids, style):
+    # python-docx scans the whole styles part on every `style=` lookup, which dominates
+    # rendering time; resolve each style id once per document and set it directly
+    if style not in style_ids:
+        style_ids[style] = doc.styles[style].style_id
+    paragraph = doc.add_paragraph()
+    paragraph._p.style = style_ids[style]
+    return paragraph
+
+
+def render_blocks(doc, blocks):
+    """Add parsed markdown blocks to a python-docx Document as native headings, lists and runs"""
+    style_ids = {}
+    for block in blocks:
+        kind = block[0]
+        if kind == HEADING:
+            _add_runs(_styled_paragraph(doc, style_ids, f"Heading {min(block[1], 4)}"), block[2])
+        elif kind == PARAGRAPH:
+            _add_runs(doc.add_paragraph(), block[1])
+        elif kind in (BULLET, NUMBERED):
+            # The default template has "List Bullet", "List Bullet 2", "List Bullet 3" and the same for numbers
+            style = "List Bullet" if kind == BULLET else "List Number"
+            if block[1]:
+                style += f" {block[1] + 1}"
+            _add_runs(_styled_paragraph(doc, style_ids, style), block[2])
+        elif kind == QUOTE:
+            _add_runs(_styled_paragraph(doc, style_ids, "Quote"), block[1])
+        elif kind == CODE:
+            run = doc.add_paragraph().add_run(block[1])
+            run.font.name = "Courier New"
+            run.font.size = Pt(10)
+        elif kind == RULE:
+            doc.add_paragraph("_" * 50)
+
+
+def write_blog_docx(path, title, content, model_name, keywords, word_count):
+    """Save a generated blog post as a Word document"""
+    doc = Document()
+
+    # Add title
+    doc.add_heading(title, 0)
+
+    # Add metadata
+    doc.add_paragraph(f"Generated using: {model_name}")
+    doc.add_paragraph(f"Keywords: {keywords}")
+    doc.add_paragraph(f"Target word count: {word_count}")
+
+    # Add a horizontal line
+    doc.add_paragraph("_" * 50)
+
+    # Add content, parsed from markdown in one pass
+    render_blocks(doc, parse_markdown(content))
+
+    doc.save(path)
+    return path
+
+
+def export_job(job):
+    """Process pool entry point; `job` is the argument tuple for `write_blog_docx`"""
+    return write_blog_docx(*job)
+
+
+def bulk_export(posts, output_dir, max_workers=None, on_progress=None):
+    """
+    Export many posts to `output_dir` on a process pool, since rendering is CPU-bound.
+    `posts` are dicts with title, content, model_name, keywords and word_count.
+    Returns the paths in input order; `on_progress(done, total)` is called as they are written.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    jobs = [
+        (os.path.join(output_dir, f"{i + 1:03d}_{slugify(post['title'])}.docx"), post["title"], post["content"],
+         post["model_name"], post["keywords"], post["word_count"])
+        for i, post in enumerate(posts)
+    ]
+    workers = max_workers or os.cpu_count() or 1
+    paths = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Several documents per task, so the pickling round trip doesn't dominate
+        for path in pool.map(export_job, jobs, chunksize=max(1, len(jobs) // (workers * 4))):
+            paths.append(path)
+            if on_progress:
+                on_progress(len(paths), len(jobs))
+    return paths
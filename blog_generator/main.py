@@ -1,63 +1,294 @@
 import sys
 import os
 import json
-import google.generativeai as genai
+import time
+import multiprocessing
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                             QHBoxLayout, QLabel, QLineEdit, QTextEdit, QPushButton, 
                             QSlider, QMessageBox, QProgressBar, QComboBox, 
-                            QStackedWidget, QFrame)
+                            QStackedWidget, QFrame, QSpinBox, QTableWidget,
+                            QTableWidgetItem, QHeaderView, QCheckBox, QDialog,
+                            QListWidget, QListWidgetItem, QDialogButtonBox)
 from PyQt6.QtCore import Qt, QThread, pyqtSignal
-from PyQt6.QtGui import QFont, QPalette, QColor
-from docx import Document
+from PyQt6.QtGui import QFont, QPalette, QColor, QTextCursor
 from datetime import datetime
+from prompts import blog_prompt, parse_titles
+from titles import TitleSampler
+from batch import BatchGenerator, DONE, FAILED, CANCELLED, RETRYING
+from export import write_blog_docx, bulk_export
+from pipeline import SectionedGenerator
+from cache import GenerationCache, TITLES, BLOG, blog_params, model_id
+
+# The shared Gemini client lives at the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from gemini_provider import get_provider
 
 # Worker threads remain the same as previous implementation
 class GenerateTitlesWorker(QThread):
-    finished = pyqtSignal(str)
+    finished = pyqtSignal(list)
     error = pyqtSignal(str)
 
-    def __init__(self, model, topic):
+    def __init__(self, model, topic, cache=None, force=False):
         super().__init__()
         self.model = model
         self.topic = topic
+        self.cache = cache
+        self.force = force
+        self.from_cache = False
+        self.summary = ""
 
     def run(self):
         try:
-            prompt = f"""Generate 10 unique, engaging, and SEO-friendly blog titles for the topic: {self.topic}
-            Please provide numbered titles (1-10) that are creative and compelling."""
-            
-            response = self.model.generate_content(prompt)
-            self.finished.emit(response.text)
+            params = {"topic": self.topic, "mode": "sampled"}
+            if self.cache is not None and not self.force:
+                text = self.cache.get(TITLES, model_id(self.model), params)
+                if text:
+                    self.from_cache = True
+                    self.summary = "Loaded from cache (no API call)"
+                    self.finished.emit(parse_titles(text))
+                    return
+            sampler = TitleSampler(self.model)
+            titles = [candidate.title for candidate in sampler.run(self.topic)]
+            self.summary = (f"{len(titles)} distinct titles from {len(sampler.candidates)} candidates "
+                            f"in {sampler.elapsed:.1f}s; click one to use it")
+            if self.cache is not None and titles:
+                self.cache.put(TITLES, model_id(self.model), params,
+                               "\n".join(f"{i}. {title}" for i, title in enumerate(titles, 1)))
+            self.finished.emit(titles)
         except Exception as e:
             self.error.emit(str(e))
 
 class GenerateBlogWorker(QThread):
     finished = pyqtSignal(str)
     error = pyqtSignal(str)
+    chunk_received = pyqtSignal(str)
+    metrics = pyqtSignal(float, float, float)  # elapsed s, time to first token s, tokens/sec
 
-    def __init__(self, model, title, keywords, word_count):
+    def __init__(self, model, title, keywords, word_count, cache=None, force=False):
         super().__init__()
         self.model = model
         self.title = title
         self.keywords = keywords
         self.word_count = word_count
+        self.cache = cache
+        self.force = force
+        self.stopped = False
+        self.from_cache = False
+        self.response = None
+
+    def stop(self):
+        # Abort a streaming request right away. generate_content() only returns once the first chunk
+        # has arrived, so a stop while waiting for it takes effect when that chunk comes in.
+        self.stopped = True
+        if self.response is not None:
+            self._close(self.response)
+
+    def _close(self, response):
+        # The SDK has no public cancel; closing the underlying stream aborts the request
+        for target in (getattr(response, "_iterator", None), response):
+            for method in ("cancel", "close"):
+                if callable(getattr(target, method, None)):
+                    try:
+                        getattr(target, method)()
+                        return
+                    except (ValueError, RuntimeError):
+                        # A generator can't be closed from another thread while it is running
+                        continue
 
     def run(self):
+        parts = []
         try:
-            prompt = f"""Write a comprehensive blog post with the following specifications:
-            Title: {self.title}
-            Keywords to include: {self.keywords}
-            Target word count: {self.word_count}
-            
-            Please write an engaging, well-structured blog post that naturally incorporates the keywords
-            and maintains a professional tone. Include an introduction, main body with subheadings,
-            and a conclusion."""
-            
-            response = self.model.generate_content(prompt)
-            self.finished.emit(response.text)
+            params = blog_params(self.title, self.keywords, self.word_count)
+            if self.cache is not None and not self.force:
+                text = self.cache.get(BLOG, model_id(self.model), params)
+                if text:
+                    self.from_cache = True
+                    self.chunk_received.emit(text)
+                    self.finished.emit(text)
+                    return
+            prompt = blog_prompt(self.title, self.keywords, self.word_count)
+            start = time.perf_counter()
+            first_token = None
+            response = self.response = self.model.generate_content(prompt, stream=True)
+            try:
+                # stop() may have run before the response was known to it
+                for chunk in (() if self.stopped else response):
+                    if self.stopped:
+                        break
+                    now = time.perf_counter()
+                    if first_token is None:
+                        first_token = now - start
+                    parts.append(chunk.text)
+                    self.chunk_received.emit(chunk.text)
+                    # ~4 characters per token; the exact count is only known at the end. The rate
+                    # needs a second chunk: until then no time has passed since the first token.
+                    tokens = sum(map(len, parts[1:])) / 4
+                    rate = tokens / (now - start - first_token) if len(parts) > 1 else 0.0
+                    self.metrics.emit(now - start, first_token, rate)
+            finally:
+                if self.stopped:
+                    self._close(response)
+            text = "".join(parts)
+            # Partial posts from a stopped generation aren't cached
+            if self.cache is not None and not self.stopped:
+                self.cache.put(BLOG, model_id(self.model), params, text)
+            self.finished.emit(text)
+        except Exception as e:
+            # Closing the stream on Stop makes the iteration raise a cancellation error; keep the partial post
+            if self.stopped:
+                self.finished.emit("".join(parts))
+            else:
+                self.error.emit(str(e))
+
+class SectionedBlogWorker(QThread):
+    finished = pyqtSignal(str)
+    error = pyqtSignal(str)
+    progress = pyqtSignal(int, int)  # calls done, total calls
+
+    def __init__(self, model, title, keywords, word_count, cache=None, force=False):
+        super().__init__()
+        self.generator = SectionedGenerator(model, title, keywords, word_count, on_progress=self.progress.emit)
+        self.model_name = model_id(model)
+        self.params = blog_params(title, keywords, word_count, mode="sectioned")
+        self.cache = cache
+        self.force = force
+        self.stopped = False
+        self.from_cache = False
+        self.elapsed = 0.0
+
+    def stop(self):
+        self.stopped = True
+        self.generator.cancel()
+
+    def run(self):
+        start = time.perf_counter()
+        try:
+            if self.cache is not None and not self.force:
+                text = self.cache.get(BLOG, self.model_name, self.params)
+                if text:
+                    self.from_cache = True
+                    self.finished.emit(text)
+                    return
+            # After stop() this returns at once with the sections finished so far
+            text = self.generator.run()
+            if self.cache is not None and not self.stopped:
+                self.cache.put(BLOG, self.model_name, self.params, text)
+            self.progress.emit(self.generator.total, self.generator.total)
+            self.elapsed = time.perf_counter() - start
+            self.finished.emit(text)
+        except Exception as e:
+            # Stopping while the outline is planned surfaces as an error here; there is nothing to keep
+            if self.stopped:
+                self.finished.emit("")
+            else:
+                self.error.emit(str(e))
+
+class BatchGenerateWorker(QThread):
+    job_updated = pyqtSignal(int, str, str)  # row, status, details
+    finished = pyqtSignal(int, int)  # posts saved, posts failed
+
+    def __init__(self, model, titles, keywords, word_count, output_dir, model_name, max_workers,
+                 requests_per_minute, cache=None, force=False):
+        super().__init__()
+        self.titles = titles
+        self.generator = BatchGenerator(model, keywords, word_count, output_dir=output_dir, model_name=model_name,
+                                        max_workers=max_workers, requests_per_minute=requests_per_minute,
+                                        on_update=self.report, cache=cache, force=force)
+
+    def report(self, job):
+        # Called from the pool threads; the signal is delivered on the GUI thread
+        if job.status == DONE and job.cached:
+            details = f"{os.path.basename(job.path)} (from cache)"
+        elif job.status == DONE:
+            details = f"{os.path.basename(job.path)} ({job.elapsed:.1f}s, {job.attempts} attempt(s))"
+        elif job.status == RETRYING:
+            details = f"Attempt {job.attempts} failed, retrying: {job.error}"
+        else:
+            details = job.error or ""
+        self.job_updated.emit(job.index, job.status, details)
+
+    def cancel(self):
+        self.generator.cancel()
+
+    def run(self):
+        jobs = self.generator.run(self.titles)
+        self.finished.emit(sum(job.status == DONE for job in jobs), sum(job.status == FAILED for job in jobs))
+
+class ExportWorker(QThread):
+    saved = pyqtSignal(str)
+    error = pyqtSignal(str)
+
+    def __init__(self, filename, title, content, model_name, keywords, word_count):
+        super().__init__()
+        self.args = (filename, title, content, model_name, keywords, word_count)
+
+    def run(self):
+        try:
+            self.saved.emit(write_blog_docx(*self.args))
+        except Exception as e:
+            self.error.emit(str(e))
+
+class BulkExportWorker(QThread):
+    progress = pyqtSignal(int, int)  # documents written, total
+    finished = pyqtSignal(str, int)  # output folder, documents written
+    error = pyqtSignal(str)
+
+    def __init__(self, posts, output_dir):
+        super().__init__()
+        self.posts = posts
+        self.output_dir = output_dir
+
+    def run(self):
+        try:
+            paths = bulk_export(self.posts, self.output_dir, on_progress=self.progress.emit)
+            self.finished.emit(self.output_dir, len(paths))
         except Exception as e:
             self.error.emit(str(e))
 
+class HistoryDialog(QDialog):
+    """Browse cached generations and open one without calling the API"""
+
+    def __init__(self, cache, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Generation History")
+        self.setMinimumSize(700, 500)
+        self.selected = None
+        self.export_all = False
+        
+        layout = QVBoxLayout()
+        self.list_widget = QListWidget()
+        for entry in cache.history():
+            params = entry["params"]
+            created = datetime.fromtimestamp(entry["created"]).strftime("%Y-%m-%d %H:%M")
+            if entry["kind"] == TITLES:
+                label = f"[Titles] {params['topic']}"
+            else:
+                label = f"[Blog] {params['title']} ({params['word_count']} words, {params.get('mode', 'single')})"
+            item = QListWidgetItem(f"{created}  {label}  ·  {entry['model']}")
+            item.setData(Qt.ItemDataRole.UserRole, entry)
+            self.list_widget.addItem(item)
+        self.list_widget.itemDoubleClicked.connect(self.accept)
+        
+        buttons = QDialogButtonBox(QDialogButtonBox.StandardButton.Open | QDialogButtonBox.StandardButton.Cancel)
+        buttons.accepted.connect(self.accept)
+        buttons.rejected.connect(self.reject)
+        export_btn = buttons.addButton("Export All Posts", QDialogButtonBox.ButtonRole.ActionRole)
+        export_btn.clicked.connect(self.accept_export_all)
+        
+        layout.addWidget(self.list_widget)
+        layout.addWidget(buttons)
+        self.setLayout(layout)
+
+    def accept(self, *args):
+        item = self.list_widget.currentItem()
+        if item is not None:
+            self.selected = item.data(Qt.ItemDataRole.UserRole)
+        super().accept()
+
+    def accept_export_all(self):
+        self.export_all = True
+        super().accept()
+
 class APIKeyScreen(QWidget):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -165,20 +396,28 @@ class MainScreen(QWidget):
             }
         """)
         
+        # Reuse of earlier generations
+        self.force_regenerate_checkbox = QCheckBox("Force regenerate (skip cache)")
+        self.history_btn = QPushButton("History")
+        
         # Titles output
         self.titles_progress = QProgressBar()
         self.titles_progress.setVisible(False)
-        self.titles_output = QTextEdit()
-        self.titles_output.setReadOnly(True)
-        self.titles_output.setStyleSheet("QTextEdit { background-color: white; border: 1px solid #ccc; border-radius: 4px; }")
+        self.titles_stats_label = QLabel("")
+        self.titles_stats_label.setWordWrap(True)
+        self.titles_list = QListWidget()
+        self.titles_list.setStyleSheet("QListWidget { background-color: white; border: 1px solid #ccc; border-radius: 4px; }")
         
         left_layout.addWidget(model_label)
         left_layout.addWidget(self.model_combo)
         left_layout.addWidget(title_label)
         left_layout.addWidget(self.title_input)
         left_layout.addWidget(self.generate_titles_btn)
+        left_layout.addWidget(self.force_regenerate_checkbox)
+        left_layout.addWidget(self.history_btn)
         left_layout.addWidget(self.titles_progress)
-        left_layout.addWidget(self.titles_output)
+        left_layout.addWidget(self.titles_stats_label)
+        left_layout.addWidget(self.titles_list)
         left_column.setLayout(left_layout)
         
         # Column 2 (Right side)
@@ -204,10 +443,14 @@ class MainScreen(QWidget):
         
         self.word_count_slider = QSlider(Qt.Orientation.Horizontal)
         self.word_count_slider.setMinimum(100)
-        self.word_count_slider.setMaximum(1000)
+        self.word_count_slider.setMaximum(3000)
         self.word_count_slider.setValue(500)
         self.word_count_slider.setTickPosition(QSlider.TickPosition.TicksBelow)
-        self.word_count_slider.setTickInterval(100)
+        self.word_count_slider.setTickInterval(250)
+        
+        # Long posts: plan an outline, then write all sections in parallel
+        self.sectioned_checkbox = QCheckBox("Sectioned (outline, then sections in parallel)")
+        self.sectioned_checkbox.setToolTip("Faster and more even for long posts; does not stream")
         
         # Generate blog button
         self.generate_blog_btn = QPushButton("Generate Blog")
@@ -228,6 +471,9 @@ class MainScreen(QWidget):
         # Blog output
         self.blog_progress = QProgressBar()
         self.blog_progress.setVisible(False)
+        self.blog_stats_label = QLabel("")
+        self.stop_blog_btn = QPushButton("Stop")
+        self.stop_blog_btn.setEnabled(False)
         self.blog_output = QTextEdit()
         self.blog_output.setReadOnly(True)
         self.blog_output.setStyleSheet("QTextEdit { background-color: white; border: 1px solid #ccc; border-radius: 4px; }")
@@ -255,15 +501,80 @@ class MainScreen(QWidget):
         right_layout.addWidget(word_count_label)
         right_layout.addWidget(self.word_count_slider)
         right_layout.addWidget(self.word_count_label)
+        right_layout.addWidget(self.sectioned_checkbox)
         right_layout.addWidget(self.generate_blog_btn)
+        right_layout.addWidget(self.stop_blog_btn)
         right_layout.addWidget(self.blog_progress)
+        right_layout.addWidget(self.blog_stats_label)
         right_layout.addWidget(self.blog_output)
         right_layout.addWidget(self.download_btn)
         right_column.setLayout(right_layout)
         
+        # Column 3 (Batch generation)
+        batch_column = QFrame()
+        batch_column.setFrameStyle(QFrame.Shape.Box | QFrame.Shadow.Raised)
+        batch_column.setStyleSheet("QFrame { background-color: #f5f5f5; border-radius: 10px; padding: 10px; }")
+        batch_layout = QVBoxLayout()
+        
+        # Titles for the batch, one per line
+        batch_titles_label = QLabel("Batch Titles (one per line):")
+        self.batch_titles_input = QTextEdit()
+        self.batch_titles_input.setStyleSheet("QTextEdit { background-color: white; border: 1px solid #ccc; border-radius: 4px; }")
+        self.use_titles_btn = QPushButton("Use Generated Titles")
+        
+        # Concurrency and rate limit
+        batch_workers_label = QLabel("Parallel jobs:")
+        self.batch_workers_spin = QSpinBox()
+        self.batch_workers_spin.setRange(1, 16)
+        self.batch_workers_spin.setValue(4)
+        batch_rpm_label = QLabel("Requests per minute:")
+        self.batch_rpm_spin = QSpinBox()
+        self.batch_rpm_spin.setRange(1, 2000)
+        self.batch_rpm_spin.setValue(15)
+        
+        # Generate and stop buttons
+        self.generate_batch_btn = QPushButton("Generate Batch")
+        self.generate_batch_btn.setStyleSheet("""
+            QPushButton {
+                background-color: #7E57C2;
+                color: white;
+                border: none;
+                padding: 8px 16px;
+                border-radius: 4px;
+                font-weight: bold;
+            }
+            QPushButton:hover {
+                background-color: #5E35B1;
+            }
+        """)
+        self.stop_batch_btn = QPushButton("Stop Batch")
+        self.stop_batch_btn.setEnabled(False)
+        
+        # Per-job progress
+        self.batch_progress = QProgressBar()
+        self.batch_progress.setVisible(False)
+        self.batch_table = QTableWidget(0, 3)
+        self.batch_table.setHorizontalHeaderLabels(["Title", "Status", "Details"])
+        self.batch_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Stretch)
+        self.batch_table.setStyleSheet("QTableWidget { background-color: white; border: 1px solid #ccc; border-radius: 4px; }")
+        
+        batch_layout.addWidget(batch_titles_label)
+        batch_layout.addWidget(self.batch_titles_input)
+        batch_layout.addWidget(self.use_titles_btn)
+        batch_layout.addWidget(batch_workers_label)
+        batch_layout.addWidget(self.batch_workers_spin)
+        batch_layout.addWidget(batch_rpm_label)
+        batch_layout.addWidget(self.batch_rpm_spin)
+        batch_layout.addWidget(self.generate_batch_btn)
+        batch_layout.addWidget(self.stop_batch_btn)
+        batch_layout.addWidget(self.batch_progress)
+        batch_layout.addWidget(self.batch_table)
+        batch_column.setLayout(batch_layout)
+        
         # Add columns to main layout
         main_layout.addWidget(left_column)
         main_layout.addWidget(right_column)
+        main_layout.addWidget(batch_column)
         self.setLayout(main_layout)
 
 class BlogGeneratorApp(QMainWindow):
@@ -287,12 +598,24 @@ class BlogGeneratorApp(QMainWindow):
         self.stacked_widget.addWidget(self.api_screen)
         self.stacked_widget.addWidget(self.main_screen)
         
+        # Earlier titles and posts, reused instead of calling the API again
+        self.cache = GenerationCache()
+        
+        # Configured once; models and connections are reused across clicks
+        self.provider = get_provider()
+        
         # Connect signals
         self.api_screen.submit_btn.clicked.connect(self.handle_api_key)
         self.main_screen.generate_titles_btn.clicked.connect(self.generate_titles)
         self.main_screen.generate_blog_btn.clicked.connect(self.generate_blog)
+        self.main_screen.stop_blog_btn.clicked.connect(self.stop_blog)
+        self.main_screen.history_btn.clicked.connect(self.show_history)
+        self.main_screen.titles_list.itemClicked.connect(self.use_title)
         self.main_screen.download_btn.clicked.connect(self.save_to_word)
         self.main_screen.word_count_slider.valueChanged.connect(self.update_word_count_label)
+        self.main_screen.use_titles_btn.clicked.connect(self.use_generated_titles)
+        self.main_screen.generate_batch_btn.clicked.connect(self.generate_batch)
+        self.main_screen.stop_batch_btn.clicked.connect(self.stop_batch)
         
         # Check for saved API key
         self.check_saved_api_key()
@@ -362,7 +685,7 @@ class BlogGeneratorApp(QMainWindow):
                     config = json.load(f)
                     api_key = config.get('api_key')
                     if api_key:
-                        genai.configure(api_key=api_key)
+                        self.provider.configure(api_key)
                         self.stacked_widget.setCurrentWidget(self.main_screen)
                         return
         except Exception:
@@ -376,7 +699,7 @@ class BlogGeneratorApp(QMainWindow):
             return
             
         try:
-            genai.configure(api_key=api_key)
+            self.provider.configure(api_key)
             # Save API key
             with open('config.json', 'w') as f:
                 json.dump({'api_key': api_key}, f)
@@ -393,7 +716,7 @@ class BlogGeneratorApp(QMainWindow):
             QMessageBox.warning(self, "Warning", "Please enter a topic!")
             return
         
-        model = genai.GenerativeModel(self.main_screen.model_combo.currentText())
+        model = self.provider.model(self.main_screen.model_combo.currentText())
         
         # Disable button and show progress
         self.main_screen.generate_titles_btn.setEnabled(False)
@@ -401,7 +724,7 @@ class BlogGeneratorApp(QMainWindow):
         self.main_screen.titles_progress.setRange(0, 0)
         
         # Create and start worker thread
-        self.titles_worker = GenerateTitlesWorker(model, topic)
+        self.titles_worker = GenerateTitlesWorker(model, topic, cache=self.cache, force=self.force_regenerate())
         self.titles_worker.finished.connect(self.on_titles_generated)
         self.titles_worker.error.connect(self.on_error)
         self.titles_worker.start()
@@ -415,34 +738,201 @@ class BlogGeneratorApp(QMainWindow):
             QMessageBox.warning(self, "Warning", "Please fill in all fields!")
             return
         
-        model = genai.GenerativeModel(self.main_screen.model_combo.currentText())
+        model_name = self.main_screen.model_combo.currentText()
         
-        # Disable button and show progress
+        # Disable button and show progress towards the target word count
         self.main_screen.generate_blog_btn.setEnabled(False)
+        self.main_screen.stop_blog_btn.setEnabled(True)
         self.main_screen.blog_progress.setVisible(True)
-        self.main_screen.blog_progress.setRange(0, 0)
+        self.main_screen.blog_progress.setRange(0, word_count)
+        self.main_screen.blog_progress.setValue(0)
+        self.main_screen.blog_output.clear()
+        self.main_screen.blog_stats_label.setText("Waiting for the first token...")
+        self.blog_words = 0
         
-        # Create and start worker thread
-        self.blog_worker = GenerateBlogWorker(model, title, keywords, word_count)
+        if self.main_screen.sectioned_checkbox.isChecked():
+            self.main_screen.blog_stats_label.setText("Planning the outline...")
+            # SectionedGenerator retries failed sections itself
+            model = self.provider.model(model_name, max_retries=0)
+            self.blog_worker = SectionedBlogWorker(model, title, keywords, word_count, cache=self.cache,
+                                                   force=self.force_regenerate())
+            self.blog_worker.progress.connect(self.on_sections_progress)
+            self.blog_worker.finished.connect(self.on_blog_generated)
+            self.blog_worker.error.connect(self.on_error)
+            self.blog_worker.start()
+            return
+        
+        # Create and start worker thread; the post streams into the editor as it is written
+        self.blog_worker = GenerateBlogWorker(self.provider.model(model_name), title, keywords, word_count,
+                                              cache=self.cache, force=self.force_regenerate())
+        self.blog_worker.chunk_received.connect(self.on_blog_chunk)
+        self.blog_worker.metrics.connect(self.on_blog_metrics)
         self.blog_worker.finished.connect(self.on_blog_generated)
         self.blog_worker.error.connect(self.on_error)
         self.blog_worker.start()
 
-    def on_titles_generated(self, text):
-        self.main_screen.titles_output.setText(text)
+    def stop_blog(self):
+        self.blog_worker.stop()
+        self.main_screen.stop_blog_btn.setEnabled(False)
+
+    def on_blog_chunk(self, text):
+        output = self.main_screen.blog_output
+        output.moveCursor(QTextCursor.MoveOperation.End)
+        output.insertPlainText(text)
+        self.blog_words += len(text.split())
+        progress = self.main_screen.blog_progress
+        progress.setValue(min(self.blog_words, progress.maximum()))
+
+    def on_sections_progress(self, done, total):
+        progress = self.main_screen.blog_progress
+        progress.setRange(0, total)
+        progress.setValue(done)
+        # Calls: outline, one per section, then stitching
+        if done == 1:
+            self.main_screen.blog_stats_label.setText(f"Writing {total - 2} sections in parallel...")
+        elif done == total - 1:
+            self.main_screen.blog_stats_label.setText("Stitching sections together...")
+
+    def on_blog_metrics(self, elapsed, first_token, tokens_per_sec):
+        # The rate is 0 until a second chunk arrives
+        rate = f"{tokens_per_sec:.0f}" if tokens_per_sec else "–"
+        self.main_screen.blog_stats_label.setText(
+            f"First token {first_token:.2f}s · {rate} tokens/sec · {elapsed:.1f}s elapsed"
+        )
+
+    def force_regenerate(self):
+        return self.main_screen.force_regenerate_checkbox.isChecked()
+
+    def show_history(self):
+        dialog = HistoryDialog(self.cache, self)
+        if not dialog.exec():
+            return
+        if dialog.export_all:
+            self.export_history()
+            return
+        if dialog.selected is None:
+            return
+        entry = dialog.selected
+        text = self.cache.load(entry["key"])
+        if text is None:
+            QMessageBox.warning(self, "Warning", "This generation is no longer cached!")
+            return
+        params = entry["params"]
+        index = self.main_screen.model_combo.findText(entry["model"])
+        if index >= 0:
+            self.main_screen.model_combo.setCurrentIndex(index)
+        if entry["kind"] == TITLES:
+            self.main_screen.title_input.setText(params["topic"])
+            self.set_titles(parse_titles(text))
+            self.main_screen.titles_stats_label.setText("Opened from history")
+        else:
+            self.main_screen.selected_title_input.setText(params["title"])
+            self.main_screen.keywords_input.setText(params["keywords"])
+            self.main_screen.word_count_slider.setValue(params["word_count"])
+            self.main_screen.sectioned_checkbox.setChecked(params.get("mode") == "sectioned")
+            self.main_screen.blog_output.setText(text)
+            self.main_screen.blog_stats_label.setText("Opened from history")
+
+    def use_generated_titles(self):
+        titles = [self.main_screen.titles_list.item(row).text() for row in range(self.main_screen.titles_list.count())]
+        if not titles:
+            QMessageBox.warning(self, "Warning", "Generate titles first!")
+            return
+        self.main_screen.batch_titles_input.setPlainText("\n".join(titles))
+
+    def generate_batch(self):
+        titles = [line.strip() for line in self.main_screen.batch_titles_input.toPlainText().splitlines() if line.strip()]
+        keywords = self.main_screen.keywords_input.text().strip()
+        word_count = self.main_screen.word_count_slider.value()
+        
+        if not titles or not keywords:
+            QMessageBox.warning(self, "Warning", "Please enter batch titles and keywords!")
+            return
+        
+        model_name = self.main_screen.model_combo.currentText()
+        # BatchGenerator retries with its own backoff and reports each attempt
+        model = self.provider.model(model_name, max_retries=0)
+        self.batch_output_dir = f"batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        
+        # One row per job
+        table = self.main_screen.batch_table
+        table.setRowCount(len(titles))
+        for row, title in enumerate(titles):
+            table.setItem(row, 0, QTableWidgetItem(title))
+            table.setItem(row, 1, QTableWidgetItem("queued"))
+            table.setItem(row, 2, QTableWidgetItem(""))
+        
+        self.main_screen.generate_batch_btn.setEnabled(False)
+        self.main_screen.stop_batch_btn.setEnabled(True)
+        self.main_screen.batch_progress.setVisible(True)
+        self.main_screen.batch_progress.setRange(0, len(titles))
+        self.main_screen.batch_progress.setValue(0)
+        
+        self.batch_worker = BatchGenerateWorker(
+            model, titles, keywords, word_count, self.batch_output_dir, model_name,
+            max_workers=self.main_screen.batch_workers_spin.value(),
+            requests_per_minute=self.main_screen.batch_rpm_spin.value(),
+            cache=self.cache, force=self.force_regenerate(),
+        )
+        self.batch_worker.job_updated.connect(self.on_batch_job_updated)
+        self.batch_worker.finished.connect(self.on_batch_finished)
+        self.batch_worker.start()
+
+    def stop_batch(self):
+        # Running jobs finish; queued jobs are cancelled
+        self.batch_worker.cancel()
+        self.main_screen.stop_batch_btn.setEnabled(False)
+
+    def on_batch_job_updated(self, row, status, details):
+        table = self.main_screen.batch_table
+        table.setItem(row, 1, QTableWidgetItem(status))
+        table.setItem(row, 2, QTableWidgetItem(details))
+        if status in (DONE, FAILED, CANCELLED):
+            progress = self.main_screen.batch_progress
+            progress.setValue(progress.value() + 1)
+
+    def on_batch_finished(self, saved, failed):
+        self.main_screen.generate_batch_btn.setEnabled(True)
+        self.main_screen.stop_batch_btn.setEnabled(False)
+        self.main_screen.batch_progress.setVisible(False)
+        QMessageBox.information(self, "Batch Finished",
+                                f"{saved} blog(s) saved to {self.batch_output_dir}, {failed} failed")
+
+    def set_titles(self, titles):
+        self.main_screen.titles_list.clear()
+        self.main_screen.titles_list.addItems(titles)
+
+    def use_title(self, item):
+        self.main_screen.selected_title_input.setText(item.text())
+
+    def on_titles_generated(self, titles):
+        self.set_titles(titles)
+        self.main_screen.titles_stats_label.setText(self.titles_worker.summary)
         self.main_screen.generate_titles_btn.setEnabled(True)
         self.main_screen.titles_progress.setVisible(False)
 
     def on_blog_generated(self, text):
-        self.main_screen.blog_output.setText(text)
+        # A run stopped before producing anything leaves the editor as it is
+        if text or not self.blog_worker.stopped:
+            self.main_screen.blog_output.setText(text)
         self.main_screen.generate_blog_btn.setEnabled(True)
+        self.main_screen.stop_blog_btn.setEnabled(False)
         self.main_screen.blog_progress.setVisible(False)
+        if self.blog_worker.from_cache:
+            self.main_screen.blog_stats_label.setText("Loaded from cache (no API call); tick Force regenerate for a new one")
+        elif self.blog_worker.stopped:
+            self.main_screen.blog_stats_label.setText(self.main_screen.blog_stats_label.text() + " (stopped)")
+        elif isinstance(self.blog_worker, SectionedBlogWorker):
+            self.main_screen.blog_stats_label.setText(
+                f"{len(text.split())} words in {self.blog_worker.elapsed:.1f}s"
+            )
 
     def on_error(self, error_message):
         QMessageBox.critical(self, "Error", f"An error occurred: {error_message}")
         # Re-enable buttons and hide progress bars
         self.main_screen.generate_titles_btn.setEnabled(True)
         self.main_screen.generate_blog_btn.setEnabled(True)
+        self.main_screen.stop_blog_btn.setEnabled(False)
         self.main_screen.titles_progress.setVisible(False)
         self.main_screen.blog_progress.setVisible(False)
 
@@ -450,38 +940,67 @@ class BlogGeneratorApp(QMainWindow):
         if not self.main_screen.blog_output.toPlainText():
             QMessageBox.warning(self, "Warning", "No content to save!")
             return
-            
-        try:
-            # Create a new Document
-            doc = Document()
-            
-            # Add title
-            doc.add_heading(self.main_screen.selected_title_input.text(), 0)
-            
-            # Add metadata
-            doc.add_paragraph(f"Generated using: {self.main_screen.model_combo.currentText()}")
-            doc.add_paragraph(f"Keywords: {self.main_screen.keywords_input.text()}")
-            doc.add_paragraph(f"Target word count: {self.main_screen.word_count_slider.value()}")
-            
-            # Add a horizontal line
-            doc.add_paragraph("_" * 50)
-            
-            # Add content
-            doc.add_paragraph(self.main_screen.blog_output.toPlainText())
-            
-            # Generate filename with timestamp
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"blog_{timestamp}.docx"
-            
-            # Save the document
-            doc.save(filename)
-            
-            QMessageBox.information(self, "Success", f"Blog saved as {filename}")
-            
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to save document: {str(e)}")
+        
+        # Generate filename with timestamp
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filename = f"blog_{timestamp}.docx"
+        
+        # Widgets are read here; rendering and writing the document happen off the GUI thread
+        self.main_screen.download_btn.setEnabled(False)
+        self.export_worker = ExportWorker(
+            filename,
+            self.main_screen.selected_title_input.text(),
+            self.main_screen.blog_output.toPlainText(),
+            self.main_screen.model_combo.currentText(),
+            self.main_screen.keywords_input.text(),
+            self.main_screen.word_count_slider.value(),
+        )
+        self.export_worker.saved.connect(self.on_export_saved)
+        self.export_worker.error.connect(self.on_export_error)
+        self.export_worker.start()
+
+    def on_export_saved(self, filename):
+        self.main_screen.download_btn.setEnabled(True)
+        QMessageBox.information(self, "Success", f"Blog saved as {filename}")
+
+    def on_export_error(self, error_message):
+        self.main_screen.download_btn.setEnabled(True)
+        QMessageBox.critical(self, "Error", f"Failed to save document: {error_message}")
+
+    def export_history(self):
+        posts = []
+        for entry in self.cache.history():
+            if entry["kind"] != BLOG:
+                continue
+            text = self.cache.load(entry["key"])
+            if text:
+                params = entry["params"]
+                posts.append({"title": params["title"], "content": text, "model_name": entry["model"],
+                              "keywords": params["keywords"], "word_count": params["word_count"]})
+        if not posts:
+            QMessageBox.warning(self, "Warning", "No cached blog posts to export!")
+            return
+        
+        self.main_screen.blog_progress.setVisible(True)
+        self.main_screen.blog_progress.setRange(0, len(posts))
+        self.main_screen.blog_progress.setValue(0)
+        self.bulk_export_worker = BulkExportWorker(posts, f"export_{datetime.now().strftime('%Y%m%d_%H%M%S')}")
+        self.bulk_export_worker.progress.connect(lambda done, total: self.main_screen.blog_progress.setValue(done))
+        self.bulk_export_worker.finished.connect(self.on_bulk_export_finished)
+        self.bulk_export_worker.error.connect(self.on_bulk_export_error)
+        self.bulk_export_worker.start()
+
+    def on_bulk_export_finished(self, output_dir, count):
+        self.main_screen.blog_progress.setVisible(False)
+        QMessageBox.information(self, "Export Finished", f"{count} blog(s) saved to {output_dir}")
+
+    def on_bulk_export_error(self, error_message):
+        self.main_screen.blog_progress.setVisible(False)
+        QMessageBox.critical(self, "Error", f"Failed to export documents: {error_message}")
 
 def main():
+    # The bulk export process pool must work in the frozen (PyInstaller) build too
+    multiprocessing.freeze_support()
     app = QApplication(sys.argv)
     
     # Set application style
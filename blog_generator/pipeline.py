@@ -0,0 +1,184 @@
+import os
+import re
+import sys
+import json
+import random
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from prompts import outline_prompt, section_prompt, stitch_prompt
+
+# Retry classification is shared with the other apps through the provider at the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from gemini_provider import is_retryable
+
+
+def section_count(word_count):
+    """Roughly one section per 350 words, between 3 and 10"""
+    return max(3, min(10, round(word_count / 350)))
+
+
+def parse_json(text):
+    """The JSON object or list in a model reply, with or without ```json fences"""
+    match = re.search(r"[\[{].*[\]}]", text, re.DOTALL)
+    if not match:
+        raise ValueError("No JSON found in the reply")
+    return json.loads(match.group(0))
+
+
+def default_outline(word_count, count):
+    headings = ["Introduction"] + [f"Part {i}" for i in range(1, count - 1)] + ["Conclusion"]
+    return [{"heading": heading, "points": [], "words": word_count // count} for heading in headings]
+
+
+def parse_outline(text, word_count, count):
+    """(brief, sections) from the outline reply; falls back to a generic outline if it isn't usable"""
+    try:
+        data = parse_json(text)
+        sections = [{
+            "heading": str(section["heading"]).strip(),
+            "points": [str(point) for point in section.get("points") or []],
+            "words": int(section.get("words") or word_count // count),
+        } for section in data["sections"]]
+        if sections:
+            return str(data.get("brief") or ""), sections
+    except (ValueError, KeyError, TypeError, AttributeError):
+        pass
+    return "", default_outline(word_count, count)
+
+
+def strip_heading(body, heading):
+    """Drop a leading line that just repeats the section heading"""
+    lines = body.strip().splitlines()
+    if lines and lines[0].strip("#* ").lower() == heading.strip("#* ").lower():
+        lines = lines[1:]
+    return "\n".join(lines).strip()
+
+
+def edge_sentences(text, max_words=40):
+    """First and last sentence of a section, capped in length to keep the stitching call cheap"""
+    parts = re.split(r"(?<=[.!?])\s+", " ".join(text.split()))
+    return " ".join(parts[0].split()[:max_words]), " ".join(parts[-1].split()[-max_words:])
+
+
+class SectionedGenerator:
+    """
+    Outline-then-expand blog generation. One call plans the outline and a shared
+    style brief, every section is then written concurrently, and a short stitching
+    call adds transitions between sections. Wall-clock time is about the outline
+    plus the slowest section instead of the whole post. `on_progress(done, total)`
+    counts completed calls. After cancel(), run() returns right away with the
+    sections finished so far; calls still in flight are abandoned.
+    """
+
+    def __init__(self, model, title, keywords, word_count, max_workers=None, max_retries=2, on_progress=None):
+        self.model = model
+        self.title = title
+        self.keywords = keywords
+        self.word_count = word_count
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        self.on_progress = on_progress
+        self.cancelled = threading.Event()
+        # Resolved by cancel(), so run() stops waiting for the sections still being written
+        self.stopping = Future()
+        self.done = 0
+        self.total = section_count(word_count) + 2
+        self.lock = threading.Lock()
+
+    def cancel(self):
+        with self.lock:
+            self.cancelled.set()
+            if not self.stopping.done():
+                self.stopping.set_result(None)
+
+    def _progress(self):
+        with self.lock:
+            self.done += 1
+            done, total = self.done, self.total
+        if self.on_progress:
+            self.on_progress(done, total)
+
+    def _call(self, prompt, max_tokens):
+        for attempt in range(self.max_retries + 1):
+            if self.cancelled.is_set():
+                raise InterruptedError("Generation stopped")
+            try:
+                return self.model.generate_content(prompt, generation_config={"max_output_tokens": max_tokens}).text
+            except Exception as e:
+                if attempt == self.max_retries or not is_retryable(e):
+                    raise
+                self.cancelled.wait(random.uniform(0, 2.0 * 2 ** attempt))
+
+    def outline(self):
+        count = section_count(self.word_count)
+        reply = self._call(outline_prompt(self.title, self.keywords, self.word_count, count), 1024)
+        brief, sections = parse_outline(reply, self.word_count, count)
+        with self.lock:
+            self.total = len(sections) + 2
+        self._progress()
+        return brief, sections
+
+    def write_section(self, brief, sections, section):
+        outline = "\n".join(f"{i}. {s['heading']}" for i, s in enumerate(sections, 1))
+        # ~1.3 tokens per word, with headroom so sections aren't cut off
+        body = self._call(section_prompt(self.title, self.keywords, brief, outline, section), section["words"] * 2 + 256)
+        self._progress()
+        return strip_heading(body, section["heading"])
+
+    def stitch(self, sections, bodies):
+        """One transition sentence per section boundary; best effort, the post is fine without"""
+        boundaries = []
+        for i in range(1, len(sections)):
+            boundaries.append((
+                {"heading": sections[i - 1]["heading"], "last": edge_sentences(bodies[i - 1])[1]},
+                {"heading": sections[i]["heading"], "first": edge_sentences(bodies[i])[0]},
+            ))
+        try:
+            transitions = parse_json(self._call(stitch_prompt(self.title, boundaries), 60 * len(boundaries)))
+            if not isinstance(transitions, list) or len(transitions) != len(boundaries):
+                transitions = []
+        except InterruptedError:
+            raise
+        except Exception:
+            transitions = []
+        self._progress()
+        return [str(t).strip() for t in transitions]
+
+    def write_sections(self, brief, sections):
+        """Section bodies in outline order; None for sections not finished when cancelled"""
+        # By default every section is written at once (there are at most 10)
+        pool = ThreadPoolExecutor(max_workers=self.max_workers or len(sections), thread_name_prefix="blog-section")
+        futures = [pool.submit(self.write_section, brief, sections, section) for section in sections]
+        try:
+            pending = set(futures)
+            while pending and not self.cancelled.is_set():
+                done, pending = wait(pending | {self.stopping}, return_when=FIRST_COMPLETED)
+                pending.discard(self.stopping)
+                for future in done:
+                    error = future.exception()
+                    if error is not None and not isinstance(error, InterruptedError):
+                        raise error
+        finally:
+            # After a stop, don't wait for the calls still running; their replies are dropped
+            pool.shutdown(wait=not self.cancelled.is_set(), cancel_futures=True)
+        return [future.result() if future.done() and not future.cancelled() and future.exception() is None else None
+                for future in futures]
+
+    def run(self):
+        """The finished post as markdown with a `##` heading per section"""
+        brief, sections = self.outline()
+        bodies = self.write_sections(brief, sections)
+        transitions = []
+        if not self.cancelled.is_set():
+            try:
+                transitions = self.stitch(sections, bodies)
+            except InterruptedError:
+                pass
+        parts = []
+        for i, (section, body) in enumerate(zip(sections, bodies)):
+            if body is None:
+                continue
+            if i and transitions:
+                body = f"{transitions[i - 1]}\n\n{body}"
+            parts.append(f"## {section['heading']}\n\n{body}")
+        return "\n\n".join(parts)
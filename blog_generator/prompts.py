@@ -0,0 +1,80 @@
+import re
+
+
+def titles_prompt(topic):
+    return f"""Generate 10 unique, engaging, and SEO-friendly blog titles for the topic: {topic}
+            Please provide numbered titles (1-10) that are creative and compelling."""
+
+
+def sample_titles_prompt(topic, count, angle):
+    return f"""Generate {count} unique, engaging, and SEO-friendly blog titles for the topic: {topic}
+            Take a {angle} angle. Please provide numbered titles (1-{count}) only, one per line, without explanations."""
+
+
+def blog_prompt(title, keywords, word_count):
+    return f"""Write a comprehensive blog post with the following specifications:
+            Title: {title}
+            Keywords to include: {keywords}
+            Target word count: {word_count}
+
+            Please write an engaging, well-structured blog post that naturally incorporates the keywords
+            and maintains a professional tone. Include an introduction, main body with subheadings,
+            and a conclusion."""
+
+
+def parse_titles(text):
+    """Titles from the numbered list returned for `titles_prompt`, without numbering or markdown"""
+    titles = []
+    for line in text.splitlines():
+        match = re.match(r"\s*(?:\d+[.)]|[-*])\s+(.+)", line)
+        if not match:
+            continue
+        title = match.group(1).strip()
+        # Titles come as "**Title** - explanation", "*Title*" or in quotes
+        title = re.sub(r"^\*\*(.+?)\*\*.*$", r"\1", title)
+        title = title.strip("*_\"' ")
+        if title:
+            titles.append(title)
+    return titles
+
+
+def outline_prompt(title, keywords, word_count, sections):
+    return f"""Plan a blog post.
+Title: {title}
+Keywords to include: {keywords}
+Target word count: {word_count}
+
+Reply with JSON only, in this shape:
+{{"brief": "...", "sections": [{{"heading": "...", "points": ["...", "..."], "words": 300}}]}}
+
+"brief" is two or three sentences on audience, tone and style that every section must follow.
+Plan exactly {sections} sections with 3-5 key points each. The first section is the introduction and the
+last is the conclusion. The "words" values add up to about {word_count}."""
+
+
+def section_prompt(title, keywords, brief, outline, section):
+    points = "\n".join(f"- {point}" for point in section["points"])
+    return f"""You are writing one section of the blog post "{title}".
+Style brief: {brief}
+Keywords to use where they fit naturally: {keywords}
+
+Outline of the whole post (the other sections are written separately, so don't cover their points):
+{outline}
+
+Write only the section "{section['heading']}", about {section['words']} words, covering:
+{points}
+
+Don't repeat the section heading. You may use ### subheadings, bullet lists and **bold**."""
+
+
+def stitch_prompt(title, boundaries):
+    pairs = "\n\n".join(
+        f"{i}. End of \"{before['heading']}\": {before['last']}\n   Start of \"{after['heading']}\": {after['first']}"
+        for i, (before, after) in enumerate(boundaries, 1)
+    )
+    return f"""These are the section boundaries of the blog post "{title}", whose sections were written separately.
+For each boundary write one short transition sentence to open the next section so the post reads as a whole.
+
+{pairs}
+
+Reply with a JSON list of {len(boundaries)} strings only."""
@@ -0,0 +1,80 @@
+import pytest
+
+import cache
+from cache import BLOG, TITLES, GenerationCache, blog_params, cache_key, model_id
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(cache.time, "time", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def store(tmp_path, clock):
+    return GenerationCache(str(tmp_path / "cache.sqlite3"), max_entries=3, max_bytes=1000, ttl=100)
+
+
+def test_key_ignores_case_spacing_and_keyword_order():
+    a = cache_key(BLOG, "gemini", blog_params("Hello  World", "b, a,A", 500))
+    b = cache_key(BLOG, "gemini", blog_params("hello world", "a, b", 500))
+    assert a == b
+    assert a != cache_key(BLOG, "gemini", blog_params("hello world", "a, b", 600))
+    assert a != cache_key(TITLES, "gemini", blog_params("hello world", "a, b", 500))
+    assert a != cache_key(BLOG, "other", blog_params("hello world", "a, b", 500))
+
+
+def test_model_id_strips_prefix():
+    class Model:
+        model_name = "models/gemini-1.5-flash"
+
+    assert model_id(Model()) == "gemini-1.5-flash"
+
+
+def test_get_put_round_trip(store):
+    params = blog_params("Title", "x", 500)
+    assert store.get(BLOG, "m", params) is None
+    store.put(BLOG, "m", params, "post")
+    assert store.get(BLOG, "m", params) == "post"
+    # Empty generations are not cached
+    store.put(BLOG, "m", blog_params("Other", "x", 500), "")
+    assert len(store.history()) == 1
+
+
+def test_entries_expire(store, clock):
+    params = blog_params("Title", "x", 500)
+    store.put(BLOG, "m", params, "post")
+    clock[0] += 101
+    assert store.get(BLOG, "m", params) is None
+    assert store.history() == []
+
+
+def test_least_recently_used_is_evicted(store, clock):
+    for i in range(3):
+        store.put(BLOG, "m", blog_params(f"t{i}", "", 500), f"post {i}")
+        clock[0] += 1
+    # Reading t0 makes t1 the least recently used
+    store.get(BLOG, "m", blog_params("t0", "", 500))
+    clock[0] += 1
+    store.put(BLOG, "m", blog_params("t3", "", 500), "post 3")
+    titles = {entry["params"]["title"] for entry in store.history()}
+    assert titles == {"t0", "t2", "t3"}
+
+
+def test_size_budget_evicts(store, clock):
+    store.put(BLOG, "m", blog_params("small", "", 500), "x" * 100)
+    clock[0] += 1
+    store.put(BLOG, "m", blog_params("large", "", 500), "y" * 950)
+    assert [entry["params"]["title"] for entry in store.history()] == ["large"]
+
+
+def test_history_load_and_clear(store, clock):
+    store.put(TITLES, "m", {"topic": "a"}, "1. A")
+    clock[0] += 1
+    store.put(BLOG, "m", blog_params("b", "", 500), "post b")
+    history = store.history()
+    assert [entry["kind"] for entry in history] == [BLOG, TITLES]
+    assert store.load(history[1]["key"]) == "1. A"
+    store.clear()
+    assert store.history() == [] and store.load(history[0]["key"]) is None
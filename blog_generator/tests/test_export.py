@@ -0,0 +1,91 @@
+import pytest
+
+pytest.importorskip("docx")
+
+from export import (  # noqa: E402
+    BULLET, CODE, HEADING, NUMBERED, PARAGRAPH, QUOTE, RULE, parse_inline, parse_markdown, slugify, write_blog_docx,
+)
+
+
+def run(text, bold=False, italic=False, code=False):
+    return (text, bold, italic, code)
+
+
+def test_inline_formatting():
+    assert parse_inline("a **b** *c* ***d*** `e` [f](http://x) __g__ _h_") == [
+        run("a "), run("b", bold=True), run(" "), run("c", italic=True), run(" "),
+        run("d", bold=True, italic=True), run(" "), run("e", code=True), run(" "), run("f"), run(" "),
+        run("g", bold=True), run(" "), run("h", italic=True),
+    ]
+
+
+def test_inline_leaves_word_underscores_and_lone_stars():
+    assert parse_inline("snake_case_name and 2 * 3 * 4") == [run("snake_case_name and 2 * 3 * 4")]
+
+
+def test_blocks():
+    text = """# Title #
+
+First line
+continues here.
+
+## Section
+- one
+  - nested
+    - deeper
+      - capped
+1. first
+2) second
+> quoted **words**
+
+---
+```python
+print("**not bold**")
+
+x = 1
+```
+"""
+    assert parse_markdown(text) == [
+        (HEADING, 1, [run("Title")]),
+        (PARAGRAPH, [run("First line continues here.")]),
+        (HEADING, 2, [run("Section")]),
+        (BULLET, 0, [run("one")]),
+        (BULLET, 1, [run("nested")]),
+        (BULLET, 2, [run("deeper")]),
+        (BULLET, 2, [run("capped")]),
+        (NUMBERED, 0, [run("first")]),
+        (NUMBERED, 0, [run("second")]),
+        (QUOTE, [run("quoted "), run("words", bold=True)]),
+        (RULE,),
+        (CODE, 'print("**not bold**")\n\nx = 1'),
+    ]
+
+
+def test_unclosed_code_block_is_kept():
+    assert parse_markdown("text\n```\ncode") == [(PARAGRAPH, [run("text")]), (CODE, "code")]
+
+
+def test_slugify():
+    assert slugify("Hello, World! 2024") == "hello-world-2024"
+    assert slugify("???") == "blog"
+    assert len(slugify("x" * 100)) == 60
+
+
+def test_docx_uses_native_styles(tmp_path):
+    from docx import Document
+
+    path = write_blog_docx(str(tmp_path / "post.docx"), "Title", "## Part\n\n- item\n\nSome **bold** text",
+                           "gemini", "a, b", 500)
+    paragraphs = Document(path).paragraphs
+    styles = [(p.style.name, p.text) for p in paragraphs]
+    assert ("Heading 2", "Part") in styles
+    assert ("List Bullet", "item") in styles
+    body = next(p for p in paragraphs if p.text == "Some bold text")
+    assert [r.bold for r in body.runs] == [None, True, None]
+
+
+def test_adjacent_italics_stay_separate():
+    assert parse_inline("*a* and *b c*, _d_ or _e_") == [
+        run("a", italic=True), run(" and "), run("b c", italic=True), run(", "),
+        run("d", italic=True), run(" or "), run("e", italic=True),
+    ]
@@ -0,0 +1,108 @@
+import re
+import zlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from prompts import sample_titles_prompt, parse_titles
+
+# Each sample gets its own temperature and angle, so the samples explore different titles
+TEMPERATURES = (0.7, 0.9, 1.1, 1.3)
+ANGLES = ("practical how-to", "list-style", "question-driven", "bold, opinionated", "beginner-friendly",
+          "data-driven")
+SAMPLES = 4
+TITLES_PER_SAMPLE = 5
+EMBED_DIM = 1024
+# Titles at least this similar are the same idea worded differently
+DUPLICATE_SIMILARITY = 0.7
+IDEAL_LENGTH = (30, 70)
+
+
+class TitleCandidate:
+    def __init__(self, title, sample, temperature):
+        self.title = title
+        self.sample = sample
+        self.temperature = temperature
+        self.support = 1
+        self.score = 0.0
+
+
+def _features(text):
+    text = " ".join(re.sub(r"[^a-z0-9 ]+", " ", text.lower()).split())
+    return text.split() + [text[i:i + 3] for i in range(len(text) - 2)]
+
+
+def embed_titles(texts, dim=EMBED_DIM):
+    """
+    Local embeddings: hashed word and character-trigram counts, L2-normalized into the
+    rows of a matrix. Cheap enough to run on every generation, with no model to load.
+    """
+    vectors = np.zeros((len(texts), dim), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for feature in _features(text):
+            vectors[row, zlib.crc32(feature.encode()) % dim] += 1.0
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-9)
+
+
+def rank_titles(candidates, topic, limit=10, threshold=DUPLICATE_SIMILARITY):
+    """
+    Score candidates and keep the best of each group of near-duplicates. A title scores
+    higher when it is relevant to the topic, when several samples arrived at the same
+    idea, and when its length suits a headline.
+    """
+    if not candidates:
+        return []
+    vectors = embed_titles([c.title for c in candidates])
+    similarities = vectors @ vectors.T
+    relevance = vectors @ embed_titles([topic])[0]
+    support = (similarities >= threshold).sum(axis=1)
+    for candidate, sim_support, topic_similarity in zip(candidates, support, relevance):
+        candidate.support = int(sim_support)
+        low, high = IDEAL_LENGTH
+        length_penalty = max(0, low - len(candidate.title), len(candidate.title) - high) / high
+        candidate.score = float(topic_similarity) + 0.1 * (candidate.support - 1) - length_penalty
+
+    order = sorted(range(len(candidates)), key=lambda i: candidates[i].score, reverse=True)
+    kept = []
+    for i in order:
+        # Greedy: a title is kept unless it is a near-duplicate of a better one already kept
+        if kept and similarities[i, kept].max() >= threshold:
+            continue
+        kept.append(i)
+        if limit and len(kept) == limit:
+            break
+    return [candidates[i] for i in kept]
+
+
+class TitleSampler:
+    """
+    Generates titles as several small concurrent requests at different temperatures
+    and angles, parses them into candidates, then removes near-duplicates and ranks them.
+    """
+
+    def __init__(self, model, samples=SAMPLES, per_sample=TITLES_PER_SAMPLE, limit=10):
+        self.model = model
+        self.samples = samples
+        self.per_sample = per_sample
+        self.limit = limit
+        self.candidates = []
+        self.elapsed = None
+
+    def _sample(self, topic, index):
+        temperature = TEMPERATURES[index % len(TEMPERATURES)]
+        prompt = sample_titles_prompt(topic, self.per_sample, ANGLES[index % len(ANGLES)])
+        response = self.model.generate_content(prompt, generation_config={"temperature": temperature})
+        return [TitleCandidate(title, index, temperature) for title in parse_titles(response.text)]
+
+    def run(self, topic):
+        """Ranked, deduplicated candidates; failed samples are skipped unless all of them fail"""
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.samples, thread_name_prefix="title-sample") as pool:
+            futures = [pool.submit(self._sample, topic, i) for i in range(self.samples)]
+        errors = [f.exception() for f in futures if f.exception() is not None]
+        if len(errors) == len(futures):
+            raise errors[0]
+        self.candidates = [candidate for f in futures if f.exception() is None for candidate in f.result()]
+        ranked = rank_titles(self.candidates, topic, self.limit)
+        self.elapsed = time.perf_counter() - start
+        return ranked
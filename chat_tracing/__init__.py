@@ -0,0 +1,10 @@
+"""Per-turn tracing for llm_chatbot and ollama_chatbot: stage spans, token counts and a report"""
+from .tracer import Tracer, Turn, Span, FileExporter, STAGES, TRACE_FILE
+from .callbacks import callback_handler, usage_from_result
+from .report import load_spans, aggregate, format_report, percentile
+
+__all__ = [
+    "Tracer", "Turn", "Span", "FileExporter", "STAGES", "TRACE_FILE",
+    "callback_handler", "usage_from_result", "load_spans", "aggregate", "format_report",
+    "percentile",
+]
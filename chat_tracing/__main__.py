@@ -0,0 +1,26 @@
+"""
+p50/p95 per stage and tokens per session from a trace file.
+
+    python -m chat_tracing llm_chatbot/traces.jsonl
+    python -m chat_tracing traces.jsonl --json
+"""
+import json
+import argparse
+
+from .report import load_spans, aggregate, format_report
+from .tracer import TRACE_FILE
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m chat_tracing", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path", nargs="?", default=TRACE_FILE or "traces.jsonl")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args()
+
+    report = aggregate(load_spans(args.path))
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+
+
+if __name__ == "__main__":
+    main()
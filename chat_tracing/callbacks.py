@@ -0,0 +1,135 @@
+import time
+
+
+def usage_from_result(response):
+    """(prompt_tokens, completion_tokens) reported by the model in an LLMResult, or (None, None)"""
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                return usage.get("input_tokens"), usage.get("output_tokens")
+            info = generation.generation_info or {}
+            # Ollama's own counters, then the ones as_langchain_llm() reports for Gemini
+            if info.get("eval_count") is not None:
+                return info.get("prompt_eval_count"), info.get("eval_count")
+            if info.get("completion_tokens") is not None:
+                return info.get("prompt_tokens"), info.get("completion_tokens")
+    usage = (response.llm_output or {}).get("token_usage") or {}
+    return usage.get("prompt_tokens"), usage.get("completion_tokens")
+
+
+def callback_handler(turn):
+    """
+    A LangChain callback handler that turns one chain run into stage spans on `turn`.
+    Create it right before invoking the chain; with a legacy Chain (ConversationChain)
+    the time until the chain starts is spent loading and formatting the memory. Without
+    LangChain installed it is a plain object, and close() records the call as one span.
+    """
+    try:
+        from langchain_core.callbacks import BaseCallbackHandler
+    except ImportError:
+        # Only offline stand-ins can be called then, and they never invoke the callbacks
+        BaseCallbackHandler = object
+
+    class TurnCallbackHandler(BaseCallbackHandler):
+        def __init__(self):
+            self.called = time.perf_counter()
+            self.root = None
+            self.root_start = None
+            self.runs = {}
+            self.prompt_seen = False
+            self.parser_run = None
+            self.llm_start = None
+            self.llm_end = None
+            self.first_token = None
+            self.prompt_chars = 0
+            self.model = None
+
+        def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, run_type=None, name=None,
+                           **kwargs):
+            now = time.perf_counter()
+            if parent_run_id is None:
+                self.root, self.root_start = run_id, now
+            self.runs[run_id] = (parent_run_id, run_type, now)
+
+        def on_chain_end(self, outputs, *, run_id, **kwargs):
+            self._end_chain(run_id)
+
+        def on_chain_error(self, error, *, run_id, **kwargs):
+            self._end_chain(run_id, type(error).__name__)
+
+        def _end_chain(self, run_id, error=None):
+            now = time.perf_counter()
+            if run_id not in self.runs:
+                return
+            parent, run_type, start = self.runs.pop(run_id)
+            if run_type == "prompt":
+                self.prompt_seen = True
+                turn.add("render_prompt", start, now)
+            elif run_type == "parser":
+                self.parser_run = (start, now)
+            elif parent == self.root and self.llm_start is None:
+                # An input step of an LCEL chain, e.g. the mapping that formats the history
+                turn.add("format_history", start, now)
+            elif run_id == self.root:
+                self._end_root(now, error)
+
+        def _end_root(self, now, error):
+            if self.llm_start is None:
+                return
+            if not self.prompt_seen:
+                # A legacy Chain loads its memory before it starts and renders the prompt without a run of its own
+                turn.add("format_history", self.called, self.root_start)
+                turn.add("render_prompt", self.root_start, self.llm_start)
+            llm_end = self.llm_end if self.llm_end is not None else now
+            if self.parser_run:
+                # A streamed parser runs alongside the model; only what it does after the last token is parsing time
+                start, end = self.parser_run
+                turn.add("parse", max(start, llm_end), max(end, llm_end))
+            else:
+                turn.add("parse", llm_end, now, error=error)
+
+        def on_llm_start(self, serialized, prompts, *, run_id, **kwargs):
+            self._start_llm(sum(len(prompt) for prompt in prompts), kwargs)
+
+        def on_chat_model_start(self, serialized, messages, *, run_id, **kwargs):
+            self._start_llm(sum(len(str(m.content)) for batch in messages for m in batch), kwargs)
+
+        def _start_llm(self, prompt_chars, kwargs):
+            self.llm_start = time.perf_counter()
+            self.llm_end = self.first_token = None
+            self.prompt_chars = prompt_chars
+            self.model = (kwargs.get("metadata") or {}).get("ls_model_name")
+
+        def on_llm_new_token(self, token, **kwargs):
+            if self.first_token is None and self.llm_start is not None:
+                self.first_token = time.perf_counter()
+                turn.add("ttft", self.llm_start, self.first_token)
+
+        def on_llm_end(self, response, **kwargs):
+            self.llm_end = time.perf_counter()
+            prompt_tokens, completion_tokens = usage_from_result(response)
+            estimated = completion_tokens is None
+            if estimated:
+                # No usage from the model: roughly four characters per token
+                text = "".join(g.text for generations in response.generations for g in generations)
+                prompt_tokens, completion_tokens = self.prompt_chars // 4 + 1, len(text) // 4 + 1
+            turn.add("upstream", self.llm_start, self.llm_end, **{
+                "gen_ai.request.model": self.model, "gen_ai.usage.input_tokens": prompt_tokens,
+                "gen_ai.usage.output_tokens": completion_tokens,
+            })
+            turn.tokens(prompt_tokens, completion_tokens, estimated=estimated)
+            if self.model:
+                turn.set(**{"gen_ai.request.model": self.model})
+
+        def on_llm_error(self, error, **kwargs):
+            self.llm_end = time.perf_counter()
+            span = turn.add("upstream", self.llm_start, self.llm_end, **{"gen_ai.request.model": self.model})
+            span.error = type(error).__name__
+
+        def close(self):
+            """For stand-ins that take no callbacks: the whole call is counted as the upstream call"""
+            if self.root is None and self.llm_start is None:
+                turn.add("upstream", self.called, time.perf_counter())
+
+    return TurnCallbackHandler()
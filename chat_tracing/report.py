@@ -0,0 +1,103 @@
+import json
+from collections import defaultdict
+
+from .tracer import STAGES
+
+
+def _otlp_attribute(value):
+    if "intValue" in value:
+        return int(value["intValue"])
+    return next(iter(value.values()), None)
+
+
+def load_spans(path):
+    """Spans from a trace file in either format, as flat dicts (see FileExporter)"""
+    spans = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "resourceSpans" not in record:
+                spans.append(record)
+                continue
+            for resource in record["resourceSpans"]:
+                for scope in resource.get("scopeSpans", []):
+                    for span in scope.get("spans", []):
+                        start, end = int(span["startTimeUnixNano"]), int(span["endTimeUnixNano"])
+                        spans.append({
+                            "trace_id": span["traceId"], "span_id": span["spanId"],
+                            "parent_span_id": span.get("parentSpanId"), "name": span["name"],
+                            "start_unix_nano": start, "end_unix_nano": end, "duration_ms": (end - start) / 1e6,
+                            "error": span.get("status", {}).get("message"),
+                            "attributes": {a["key"]: _otlp_attribute(a["value"]) for a in span.get("attributes", [])},
+                        })
+    return spans
+
+
+def percentile(values, pct):
+    """
+    The pct-th percentile, interpolated linearly between the closest ranks (None for no
+    values). Shared by the latency reports and benchmarks of the apps.
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    lower = int(rank)
+    if rank == lower or ordered[lower] == ordered[lower + 1]:
+        # Also keeps infinite values (e.g. failed requests) from interpolating to NaN
+        return ordered[lower]
+    return ordered[lower] + (ordered[lower + 1] - ordered[lower]) * (rank - lower)
+
+
+def aggregate(spans):
+    """
+    p50/p95 per stage over turns (a stage that ran more than once in a turn, e.g. a
+    retried upstream call, counts as its total) and token totals per session.
+    """
+    roots = {span["trace_id"]: span for span in spans if not span.get("parent_span_id")}
+    per_turn = defaultdict(lambda: defaultdict(float))
+    for span in spans:
+        if span.get("parent_span_id") and span["trace_id"] in roots:
+            per_turn[span["name"]][span["trace_id"]] += span["duration_ms"]
+    per_turn["turn"] = {trace_id: root["duration_ms"] for trace_id, root in roots.items()}
+
+    stages = {}
+    for name in ["turn"] + [s for s in STAGES if s in per_turn] + sorted(set(per_turn) - set(STAGES) - {"turn"}):
+        durations = list(per_turn[name].values())
+        if durations:
+            stages[name] = {
+                "turns": len(durations),
+                "p50_ms": round(percentile(durations, 50), 1),
+                "p95_ms": round(percentile(durations, 95), 1),
+                "mean_ms": round(sum(durations) / len(durations), 1),
+            }
+
+    sessions = {}
+    for root in sorted(roots.values(), key=lambda span: span["start_unix_nano"]):
+        attributes = root["attributes"]
+        session = sessions.setdefault(attributes.get("session.id") or "-", {
+            "turns": 0, "errors": 0, "prompt_tokens": 0, "completion_tokens": 0, "estimated": False,
+        })
+        session["turns"] += 1
+        session["errors"] += bool(root.get("error"))
+        session["prompt_tokens"] += attributes.get("gen_ai.usage.input_tokens") or 0
+        session["completion_tokens"] += attributes.get("gen_ai.usage.output_tokens") or 0
+        session["estimated"] |= bool(attributes.get("gen_ai.usage.estimated"))
+    return {"turns": len(roots), "stages": stages, "sessions": sessions}
+
+
+def format_report(report):
+    lines = [f"{report['turns']} turns", "", f"{'stage':<16} {'turns':>6} {'p50 ms':>10} {'p95 ms':>10} {'mean ms':>10}"]
+    for name, stage in report["stages"].items():
+        lines.append(f"{name:<16} {stage['turns']:>6} {stage['p50_ms']:>10} {stage['p95_ms']:>10} {stage['mean_ms']:>10}")
+    lines += ["", f"{'session':<34} {'turns':>6} {'prompt tok':>11} {'completion tok':>15} {'tok/turn':>9}"]
+    for session_id, session in report["sessions"].items():
+        total = session["prompt_tokens"] + session["completion_tokens"]
+        mark = "~" if session["estimated"] else ""
+        lines.append(f"{session_id[:34]:<34} {session['turns']:>6} {mark + str(session['prompt_tokens']):>11} "
+                     f"{mark + str(session['completion_tokens']):>15} {total // session['turns']:>9}")
+    if any(session["estimated"] for session in report["sessions"].values()):
+        lines.append("~ some token counts are estimates; the model did not report usage")
+    return "\n".join(lines)
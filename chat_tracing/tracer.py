@@ -0,0 +1,193 @@
+import os
+import json
+import time
+import uuid
+import threading
+from contextlib import contextmanager
+
+# Where finished turns are appended; unset or empty (the default) turns tracing off
+TRACE_FILE = os.getenv("CHAT_TRACE_FILE", "")
+# "jsonl" writes one flat JSON object per span; "otlp" writes one OTLP/JSON export request per turn,
+# the format the OpenTelemetry Collector's otlpjsonfile receiver reads
+TRACE_FORMAT = os.getenv("CHAT_TRACE_FORMAT", "jsonl")
+FORMATS = ("jsonl", "otlp")
+
+# Stage spans, in the order they happen in a turn
+STAGES = ("queue", "retrieval", "format_history", "render_prompt", "upstream", "ttft", "parse")
+
+
+class Span:
+    def __init__(self, name, trace_id, parent_id=None, start=None, attributes=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        # perf_counter seconds; converted to wall-clock time on export
+        self.start = time.perf_counter() if start is None else start
+        self.end = None
+        self.attributes = dict(attributes or {})
+        self.error = None
+
+    def set(self, **attributes):
+        self.attributes.update({key: value for key, value in attributes.items() if value is not None})
+        return self
+
+    @property
+    def duration(self):
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+
+class Turn:
+    """
+    One chat turn: a root span plus a child span per stage (see STAGES). The spans stay
+    in memory until end(), which hands the whole turn to the exporter in one write.
+    Stages may repeat (retries); the report adds them up per turn.
+    """
+
+    def __init__(self, tracer, session_id, name="turn", **attributes):
+        self.tracer = tracer
+        self.root = Span(name, uuid.uuid4().hex, attributes={"session.id": session_id, **attributes})
+        self.spans = [self.root]
+        self.lock = threading.Lock()
+        self.ended = False
+
+    @property
+    def start(self):
+        return self.root.start
+
+    def add(self, name, start, end, **attributes):
+        """Record a stage whose start and end (perf_counter seconds) were measured elsewhere"""
+        span = Span(name, self.root.trace_id, self.root.span_id, start=start).set(**attributes)
+        span.end = end
+        with self.lock:
+            self.spans.append(span)
+        return span
+
+    @contextmanager
+    def span(self, name, **attributes):
+        span = Span(name, self.root.trace_id, self.root.span_id).set(**attributes)
+        try:
+            yield span
+        except BaseException as e:
+            span.error = type(e).__name__
+            raise
+        finally:
+            span.end = time.perf_counter()
+            with self.lock:
+                self.spans.append(span)
+
+    def set(self, **attributes):
+        self.root.set(**attributes)
+        return self
+
+    def tokens(self, prompt=None, completion=None, estimated=False):
+        """Token usage of the turn, summed over upstream calls (retries, summaries)"""
+        with self.lock:
+            attributes = self.root.attributes
+            for key, value in (("gen_ai.usage.input_tokens", prompt), ("gen_ai.usage.output_tokens", completion)):
+                if value is not None:
+                    attributes[key] = attributes.get(key, 0) + value
+            if estimated:
+                attributes["gen_ai.usage.estimated"] = True
+
+    def end(self, error=None):
+        with self.lock:
+            if self.ended:
+                return
+            self.ended = True
+            self.root.end = time.perf_counter()
+            self.root.error = error
+            spans = list(self.spans)
+        self.tracer.export(spans)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end(exc_type.__name__ if exc_type else None)
+
+
+class FileExporter:
+    """Appends finished turns to a local file, one line per span (jsonl) or per turn (otlp)"""
+
+    def __init__(self, path, format="jsonl", service="chat"):
+        if format not in FORMATS:
+            raise ValueError(f"Unknown trace format {format!r}; expected one of {FORMATS}")
+        self.path = path
+        self.format = format
+        self.service = service
+        self.lock = threading.Lock()
+        # Offset from perf_counter to the Unix epoch, so spans get wall-clock timestamps
+        self.epoch = time.time() - time.perf_counter()
+
+    def _unix_nano(self, seconds):
+        return int((self.epoch + seconds) * 1e9)
+
+    def _flat(self, span):
+        return {
+            "trace_id": span.trace_id, "span_id": span.span_id, "parent_span_id": span.parent_id,
+            "name": span.name, "service": self.service,
+            "start_unix_nano": self._unix_nano(span.start), "end_unix_nano": self._unix_nano(span.end),
+            "duration_ms": round((span.end - span.start) * 1000, 3),
+            "error": span.error, "attributes": span.attributes,
+        }
+
+    def _otlp_span(self, span):
+        result = {
+            "traceId": span.trace_id, "spanId": span.span_id, "name": span.name, "kind": 1,
+            "startTimeUnixNano": str(self._unix_nano(span.start)),
+            "endTimeUnixNano": str(self._unix_nano(span.end)),
+            "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in span.attributes.items()],
+        }
+        if span.parent_id:
+            result["parentSpanId"] = span.parent_id
+        if span.error:
+            result["status"] = {"code": 2, "message": span.error}
+        return result
+
+    def export(self, spans):
+        if self.format == "otlp":
+            lines = [json.dumps({"resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service}}]},
+                "scopeSpans": [{"scope": {"name": "chat_tracing"}, "spans": [self._otlp_span(s) for s in spans]}],
+            }]})]
+        else:
+            lines = [json.dumps(self._flat(span)) for span in spans]
+        data = "\n".join(lines) + "\n"
+        with self.lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(data)
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        # OTLP/JSON encodes 64-bit integers as strings
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class Tracer:
+    """Starts Turns for one app and exports them when they end; without an exporter nothing is written"""
+
+    def __init__(self, service, exporter=None):
+        self.service = service
+        self.exporter = exporter
+
+    @classmethod
+    def from_env(cls, service, path=None, format=None):
+        path = TRACE_FILE if path is None else path
+        return cls(service, FileExporter(path, format or TRACE_FORMAT, service) if path else None)
+
+    @property
+    def enabled(self):
+        return self.exporter is not None
+
+    def turn(self, session_id, **attributes):
+        return Turn(self, session_id, **attributes)
+
+    def export(self, spans):
+        if self.exporter is not None:
+            self.exporter.export(spans)
@@ -1,63 +1,59 @@
 import sys
 import os
+import json
+import time
 import asyncio
 import requests
 from xml.etree import ElementTree
-from urllib.parse import urlparse
-
-import chromadb
-from chromadb.utils import embedding_functions
-import google.generativeai as genai
+from urllib.parse import urlparse, urljoin
 
 from PyQt6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, 
     QLabel, QLineEdit, QPushButton, QFileDialog, 
     QProgressBar, QMessageBox, QTextEdit, QSplitter,
-    QLineEdit, QStackedWidget
+    QLineEdit, QStackedWidget, QCheckBox, QSpinBox
 )
 from PyQt6.QtCore import Qt, QThread, pyqtSignal, QTimer
 from PyQt6.QtGui import QPalette, QColor, QFont, QTextCursor
 
-from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig
-from crawl4ai.markdown_generation_strategy import DefaultMarkdownGenerator
-
-class ChromaDBManager:
-    def __init__(self, collection_name='web_documents'):
-        embedding_function = embedding_functions.ONNXMiniLM_L6_V2()
-        
-        self.client = chromadb.PersistentClient(path="./chroma_storage")
-        self.collection = self.client.get_or_create_collection(
-            name=collection_name, 
-            embedding_function=embedding_function
-        )
-
-    def add_documents(self, documents, metadata=None):
-        # Generate unique IDs for each document
-        ids = [f"doc_{hash(doc)}" for doc in documents]
-        
-        # Add documents to the collection
-        self.collection.add(
-            documents=documents,
-            ids=ids,
-            metadatas=metadata
-        )
+# The shared Gemini client lives at the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from gemini_provider import get_provider
+from store import ChromaDBManager, answer_prompt
+from dedupe import prepare_documents
+from frontier import Frontier, FRONTIER_FILE, MAX_PAGES, MAX_DEPTH, QUEUED
+from throttle import Throttle, THROTTLE_STATUSES
+from render import Renderer, LEAN_PROFILE, FULL_PROFILE
 
-    def search_documents(self, query, n_results=5):
-        results = self.collection.query(
-            query_texts=[query],
-            n_results=n_results
-        )
-        return results['documents'][0]
+# Pages crawled at once; each host's throttle decides how many of them it actually gets
+CONCURRENCY = 8
+# Attempts per page when the server answers 429/503
+MAX_ATTEMPTS = 3
 
 class CrawlerThread(QThread):
     update_signal = pyqtSignal(int)  # Progress percentage
     finished_signal = pyqtSignal(bool, list)
+    rate_signal = pyqtSignal(str)  # Per-host crawl rate
 
-    def __init__(self, sitemap_url, output_dir):
+    def __init__(self, sitemap_url, output_dir, follow_links=False, max_pages=MAX_PAGES, max_depth=MAX_DEPTH,
+                 render_profile=LEAN_PROFILE):
         super().__init__()
         self.sitemap_url = sitemap_url
         self.output_dir = output_dir
+        self.follow_links = follow_links
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.render_profile = render_profile
+        self.render_stats = None
         self.chroma_manager = ChromaDBManager()
+        self.report = None
+        self.frontier_status = None
+        self.throttle = Throttle()
+        self.stopped = False
+
+    def stop(self):
+        # Crawls stop after the current page; link-following crawls resume from the frontier on disk
+        self.stopped = True
 
     def get_sitemap_urls(self):            
         try:
@@ -72,74 +68,167 @@ class CrawlerThread(QThread):
         except Exception as e:
             return []
 
-    async def crawl_sequential(self, urls):
+    async def _start_crawler(self):
         os.makedirs(self.output_dir, exist_ok=True)
-
-        browser_config = BrowserConfig(
-            headless=True,
-            extra_args=["--disable-gpu", "--disable-dev-shm-usage", "--no-sandbox"],
+        renderer = Renderer(self.render_profile)
+        self.render_stats = renderer.stats
+        return await renderer.start()
+
+    async def _close_crawler(self, renderer):
+        await renderer.close()
+        with open(os.path.join(self.output_dir, 'render_report.json'), 'w', encoding='utf-8') as f:
+            json.dump(renderer.stats.as_dict(), f, indent=2)
+
+    def _save_page(self, url, markdown, crawled_documents, pages):
+        parsed_url = urlparse(url)
+        filepath = os.path.join(
+            self.output_dir,
+            f"{parsed_url.netloc}{parsed_url.path}".replace('/', '_')
         )
+        
+        if not filepath.endswith('.md'):
+            filepath += '.md'
+        
+        try:
+            with open(filepath, 'w', encoding='utf-8') as f:
+                f.write(markdown)
+            
+            # Add document to crawled_documents for ChromaDB
+            crawled_documents.append(markdown)
+            pages.append((url, markdown))
+        except Exception:
+            pass
+
+    def _index_pages(self, pages):
+        # Strip boilerplate shared across the crawl and skip near-duplicate pages before embedding
+        if pages:
+            documents, metadatas, self.report = prepare_documents(pages)
+            if documents:
+                self.chroma_manager.add_documents(documents, metadatas)
+            with open(os.path.join(self.output_dir, 'index_report.json'), 'w', encoding='utf-8') as f:
+                json.dump(self.report.as_dict(), f, indent=2)
+
+    async def _fetch(self, renderer, url, session_id):
+        """Render one page within its host's throttle; None when robots.txt disallows it or it timed out"""
+        if not await self.throttle.acquire(url):
+            return None
+        start = time.monotonic()
+        status = retry_after = None
+        try:
+            result = await renderer.render(url, session_id)
+            if result is not None:
+                status = getattr(result, 'status_code', None) or (200 if result.success else None)
+                headers = getattr(result, 'response_headers', None) or {}
+                retry_after = next((value for key, value in headers.items() if key.lower() == 'retry-after'), None)
+            return result
+        finally:
+            await self.throttle.release(url, time.monotonic() - start, status, retry_after)
+            self.rate_signal.emit(self.throttle.summary())
 
-        crawl_config = CrawlerRunConfig(
-            markdown_generator=DefaultMarkdownGenerator()
-        )
+    @staticmethod
+    def _throttled(result):
+        return getattr(result, 'status_code', None) in THROTTLE_STATUSES
 
-        crawler = AsyncWebCrawler(config=browser_config)
-        await crawler.start()
+    async def crawl_sequential(self, urls):
+        renderer = await self._start_crawler()
 
         crawled_documents = []
+        pages = []
+        queue = [(url, 1) for url in reversed(urls)]
+        done = 0
+
+        async def worker(session_id):
+            nonlocal done
+            while queue and not self.stopped:
+                url, attempt = queue.pop()
+                result = await self._fetch(renderer, url, session_id)
+                if result is not None and self._throttled(result) and attempt < MAX_ATTEMPTS:
+                    # Retried once the host's Retry-After or backoff allows
+                    queue.insert(0, (url, attempt + 1))
+                    continue
+                if result is not None and result.success and not self._throttled(result):
+                    self._save_page(url, result.markdown_v2.raw_markdown, crawled_documents, pages)
 
-        try:
-            total_urls = len(urls)
-            session_id = "session1"
-            for index, url in enumerate(urls, 1):
-                result = await crawler.arun(
-                    url=url,
-                    config=crawl_config,
-                    session_id=session_id
-                )
-                if result.success:
-                    parsed_url = urlparse(url)
-                    filepath = os.path.join(
-                        self.output_dir,
-                        f"{parsed_url.netloc}{parsed_url.path}".replace('/', '_')
-                    )
-                    
-                    if not filepath.endswith('.md'):
-                        filepath += '.md'
-                    
-                    try:
-                        with open(filepath, 'w', encoding='utf-8') as f:
-                            f.write(result.markdown_v2.raw_markdown)
-                        
-                        # Add document to crawled_documents for ChromaDB
-                        crawled_documents.append(result.markdown_v2.raw_markdown)
-                    except Exception:
-                        pass
-                
                 # Update progress
-                progress = int((index / total_urls) * 100)
-                self.update_signal.emit(progress)
+                done += 1
+                self.update_signal.emit(int((done / len(urls)) * 100))
+
+        try:
+            await asyncio.gather(*(worker(f"session{i}") for i in range(CONCURRENCY)))
         finally:
-            await crawler.close()
+            await self._close_crawler(renderer)
+
+        self._index_pages(pages)
+        return crawled_documents
+
+    async def crawl_frontier(self, frontier):
+        """Breadth-first crawl from the frontier's seeds, following in-scope links"""
+        renderer = await self._start_crawler()
 
-        # Add crawled documents to ChromaDB
-        if crawled_documents:
-            self.chroma_manager.add_documents(crawled_documents)
+        crawled_documents = []
+        pages = []
+        attempts = {}
+
+        async def worker(session_id):
+            while not self.stopped:
+                item = frontier.pop()
+                if item is None:
+                    # Pages still in flight may queue more links
+                    if not frontier.claimed:
+                        return
+                    await asyncio.sleep(0.05)
+                    continue
+                url, depth = item
+                result = await self._fetch(renderer, url, session_id)
+                if result is not None and self._throttled(result):
+                    attempts[url] = attempts.get(url, 1) + 1
+                    if attempts[url] <= MAX_ATTEMPTS:
+                        frontier.release(url)
+                        continue
+                success = result is not None and result.success and not self._throttled(result)
+                if success:
+                    self._save_page(url, result.markdown_v2.raw_markdown, crawled_documents, pages)
+                    if depth < frontier.max_depth:
+                        for link in (result.links or {}).get("internal", []):
+                            frontier.add(link.get("href", ""), depth + 1, base=url)
+                frontier.finish(url, success)
+                self.update_signal.emit(frontier.progress())
 
+        try:
+            await asyncio.gather(*(worker(f"session{i}") for i in range(CONCURRENCY)))
+            self.frontier_status = (f"{frontier.crawled()} pages crawled, {frontier.count(QUEUED)} still queued"
+                                    + (" (paused; start again with the same URL and output directory to resume)"
+                                       if self.stopped and frontier.count(QUEUED) else "")
+                                    + ("\nAn unfinished crawl of another site in this output directory was discarded."
+                                       if frontier.discarded else ""))
+        finally:
+            await self._close_crawler(renderer)
+            frontier.close()
+
+        self._index_pages(pages)
         return crawled_documents
 
+    def _seed_urls(self):
+        # Without a sitemap, start from the given page, or the site root when the URL is the missing sitemap
+        if self.sitemap_url.lower().endswith('.xml'):
+            return [urljoin(self.sitemap_url, '/')]
+        return [self.sitemap_url]
+
     def run(self):
         try:
             urls = self.get_sitemap_urls()
-            if urls:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            if self.follow_links or not urls:
+                # Sitemap URLs (if any) seed the frontier alongside the start page
+                os.makedirs(self.output_dir, exist_ok=True)
+                frontier = Frontier(os.path.join(self.output_dir, FRONTIER_FILE), seeds=self._seed_urls() + urls,
+                                    max_pages=self.max_pages, max_depth=self.max_depth)
+                documents = loop.run_until_complete(self.crawl_frontier(frontier))
+                self.finished_signal.emit(bool(documents), documents)
+            else:
                 documents = loop.run_until_complete(self.crawl_sequential(urls))
-                
                 self.finished_signal.emit(True, documents)
-            else:
-                self.finished_signal.emit(False, [])
         except Exception:
             self.finished_signal.emit(False, [])
 
@@ -173,7 +262,7 @@ class WebCrawlerGeminiApp(QWidget):
 
         # Sitemap URL input
         url_layout = QHBoxLayout()
-        url_label = QLabel('Sitemap URL:')
+        url_label = QLabel('Sitemap or Start URL:')
         self.url_input = QLineEdit()
         url_layout.addWidget(url_label)
         url_layout.addWidget(self.url_input)
@@ -190,12 +279,38 @@ class WebCrawlerGeminiApp(QWidget):
         dir_layout.addWidget(dir_button)
         crawler_layout.addLayout(dir_layout)
 
+        # Link-following mode; also used when the site has no sitemap
+        follow_layout = QHBoxLayout()
+        self.follow_links_checkbox = QCheckBox('Follow links')
+        self.max_pages_spin = QSpinBox()
+        self.max_pages_spin.setRange(1, 1000000)
+        self.max_pages_spin.setValue(MAX_PAGES)
+        self.max_pages_spin.setPrefix('Max pages: ')
+        self.max_depth_spin = QSpinBox()
+        self.max_depth_spin.setRange(0, 50)
+        self.max_depth_spin.setValue(MAX_DEPTH)
+        self.max_depth_spin.setPrefix('Max depth: ')
+        follow_layout.addWidget(self.follow_links_checkbox)
+        follow_layout.addWidget(self.max_pages_spin)
+        follow_layout.addWidget(self.max_depth_spin)
+        crawler_layout.addLayout(follow_layout)
+
+        # Skip images, media, fonts and third-party requests, with render timeouts and context recycling
+        self.lean_render_checkbox = QCheckBox('Lean rendering (text only)')
+        self.lean_render_checkbox.setChecked(True)
+        crawler_layout.addWidget(self.lean_render_checkbox)
+
         # Progress bar
         self.progress_bar = QProgressBar()
         self.progress_bar.setRange(0, 100)
         self.progress_bar.setValue(0)
         crawler_layout.addWidget(self.progress_bar)
 
+        # Current request rate per host, adapted to how the server responds
+        self.rate_label = QLabel()
+        self.rate_label.setWordWrap(True)
+        crawler_layout.addWidget(self.rate_label)
+
         # Crawl button
         self.crawl_button = QPushButton('Start Crawling')
         self.crawl_button.setStyleSheet("""
@@ -217,6 +332,11 @@ class WebCrawlerGeminiApp(QWidget):
         self.crawl_button.clicked.connect(self.start_crawling)
         crawler_layout.addWidget(self.crawl_button)
 
+        self.pause_button = QPushButton('Pause')
+        self.pause_button.setEnabled(False)
+        self.pause_button.clicked.connect(self.pause_crawling)
+        crawler_layout.addWidget(self.pause_button)
+
         crawler_widget.setLayout(crawler_layout)
         splitter.addWidget(crawler_widget)
 
@@ -264,7 +384,7 @@ class WebCrawlerGeminiApp(QWidget):
         output_dir = self.dir_input.text().strip()
 
         if not sitemap_url:
-            QMessageBox.warning(self, 'Error', 'Please enter a sitemap URL')
+            QMessageBox.warning(self, 'Error', 'Please enter a sitemap or start URL')
             return
 
         if not output_dir:
@@ -273,21 +393,44 @@ class WebCrawlerGeminiApp(QWidget):
 
         # Disable crawl button and reset progress
         self.crawl_button.setEnabled(False)
+        self.pause_button.setEnabled(True)
         self.progress_bar.setValue(0)
+        self.rate_label.clear()
 
         # Start crawling thread
-        self.crawler_thread = CrawlerThread(sitemap_url, output_dir)
+        self.crawler_thread = CrawlerThread(
+            sitemap_url, output_dir,
+            follow_links=self.follow_links_checkbox.isChecked(),
+            max_pages=self.max_pages_spin.value(),
+            max_depth=self.max_depth_spin.value(),
+            render_profile=LEAN_PROFILE if self.lean_render_checkbox.isChecked() else FULL_PROFILE,
+        )
         self.crawler_thread.update_signal.connect(self.update_progress)
         self.crawler_thread.finished_signal.connect(self.crawling_finished)
+        self.crawler_thread.rate_signal.connect(self.rate_label.setText)
         self.crawler_thread.start()
 
     def update_progress(self, value):
         self.progress_bar.setValue(value)
 
+    def pause_crawling(self):
+        self.crawler_thread.stop()
+        self.pause_button.setEnabled(False)
+
     def crawling_finished(self, success, documents):
         self.crawl_button.setEnabled(True)
+        self.pause_button.setEnabled(False)
         if success:
-            QMessageBox.information(self, 'Success', 'Crawling completed successfully!')
+            message = 'Crawling completed successfully!'
+            if self.crawler_thread.frontier_status:
+                message += '\n\n' + self.crawler_thread.frontier_status
+            if self.crawler_thread.throttle.hosts:
+                message += '\n\n' + self.crawler_thread.throttle.summary()
+            if self.crawler_thread.render_stats is not None:
+                message += '\n\n' + self.crawler_thread.render_stats.summary()
+            if self.crawler_thread.report is not None:
+                message += '\n\n' + self.crawler_thread.report.summary()
+            QMessageBox.information(self, 'Success', message)
         else:
             QMessageBox.warning(self, 'Error', 'Crawling encountered an issue')
 
@@ -304,16 +447,14 @@ class WebCrawlerGeminiApp(QWidget):
             return
 
         try:
-            # Configure Gemini
-            genai.configure(api_key=api_key)
-            model = genai.GenerativeModel('gemini-1.5-flash')
+            # Configured once per key; the model and its connection are reused across queries
+            model = get_provider(api_key).model('gemini-1.5-flash')
 
             # Retrieve relevant documents from ChromaDB
             context_docs = self.chroma_manager.search_documents(query)
-            context = "\n\n".join(context_docs)
 
             # Construct prompt with context
-            full_prompt = f"Context:\n{context}\n\nQuery: {query}\n\nProvide a precise answer based only on the context above."
+            full_prompt = answer_prompt(query, context_docs)
 
             # Generate response
             response = model.generate_content(full_prompt)
@@ -0,0 +1,144 @@
+import re
+import hashlib
+from collections import Counter
+
+# A line is boilerplate when it repeats on at least this many pages and this share of the crawl
+BOILERPLATE_MIN_PAGES = 3
+BOILERPLATE_RATIO = 0.3
+# SimHash: 64-bit fingerprints over word 3-grams; pages within this Hamming distance are near-duplicates.
+# A ~1% edit of a docs page moves up to ~7 bits, while unrelated pages of one site differ by 13+.
+SHINGLE_WORDS = 3
+MAX_DISTANCE = 7
+# 8 bands of 8 bits: two fingerprints within distance 7 share at least one band exactly
+BANDS = 8
+
+
+def normalize_line(line):
+    return " ".join(line.lower().split())
+
+
+def _keep_always(line):
+    # Code fences and blank lines hold the markdown structure together
+    stripped = line.strip()
+    return not stripped or stripped.startswith("```")
+
+
+def learn_boilerplate(pages, min_pages=BOILERPLATE_MIN_PAGES, ratio=BOILERPLATE_RATIO):
+    """Normalized lines that repeat across the crawl (navigation, cookie banners, footers)"""
+    frequency = Counter()
+    for text in pages:
+        frequency.update({normalize_line(line) for line in text.splitlines() if not _keep_always(line)})
+    threshold = max(min_pages, ratio * len(pages))
+    return {line for line, count in frequency.items() if count >= threshold}
+
+
+def strip_boilerplate(text, boilerplate):
+    """Remove boilerplate lines, then collapse the blank lines they leave behind"""
+    lines = [line for line in text.splitlines() if _keep_always(line) or normalize_line(line) not in boilerplate]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+def simhash(text, shingle_words=SHINGLE_WORDS):
+    words = re.findall(r"\w+", text.lower())
+    shingles = [" ".join(words[i:i + shingle_words]) for i in range(max(1, len(words) - shingle_words + 1))]
+    weights = [0] * 64
+    for shingle in shingles:
+        value = int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), "big")
+        for bit in range(64):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit in range(64) if weights[bit] > 0)
+
+
+class SimHashIndex:
+    """LSH over SimHash fingerprints: only pages sharing a band are compared"""
+
+    def __init__(self, max_distance=MAX_DISTANCE, bands=BANDS):
+        self.max_distance = max_distance
+        self.bands = bands
+        self.width = 64 // bands
+        self.buckets = [{} for _ in range(bands)]
+        self.fingerprints = {}
+
+    def _bands(self, fingerprint):
+        mask = (1 << self.width) - 1
+        return [fingerprint >> (band * self.width) & mask for band in range(self.bands)]
+
+    def find(self, fingerprint):
+        """Key of an indexed near-duplicate, or None"""
+        for band, value in enumerate(self._bands(fingerprint)):
+            for key in self.buckets[band].get(value, ()):
+                if bin(fingerprint ^ self.fingerprints[key]).count("1") <= self.max_distance:
+                    return key
+        return None
+
+    def add(self, key, fingerprint):
+        self.fingerprints[key] = fingerprint
+        for band, value in enumerate(self._bands(fingerprint)):
+            self.buckets[band].setdefault(value, []).append(key)
+
+
+class IndexReport:
+    def __init__(self):
+        self.pages = 0
+        self.indexed = 0
+        self.duplicates = 0
+        self.empty = 0
+        self.boilerplate_lines = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    @property
+    def embeddings_saved(self):
+        return self.pages - self.indexed
+
+    @property
+    def bytes_saved(self):
+        return self.bytes_in - self.bytes_out
+
+    def as_dict(self):
+        return {
+            "pages": self.pages, "indexed": self.indexed, "duplicates": self.duplicates, "empty": self.empty,
+            "boilerplate_lines": self.boilerplate_lines, "bytes_in": self.bytes_in, "bytes_out": self.bytes_out,
+            "bytes_saved": self.bytes_saved, "embeddings_saved": self.embeddings_saved,
+        }
+
+    def summary(self):
+        saved = self.bytes_saved / self.bytes_in * 100 if self.bytes_in else 0
+        return (f"Indexed {self.indexed} of {self.pages} pages: {self.duplicates} near-duplicates skipped, "
+                f"{self.boilerplate_lines} repeated boilerplate lines stripped from every page. "
+                f"Saved {self.bytes_saved:,} bytes ({saved:.0f}%) and {self.embeddings_saved} embeddings.")
+
+
+def prepare_documents(pages):
+    """
+    Index-time stage for a crawl. `pages` is a list of (url, markdown). Strips boilerplate
+    learned across the crawl and skips near-duplicate pages, linking their URLs to the
+    page that is indexed. Returns (documents, metadatas, report).
+    """
+    report = IndexReport()
+    boilerplate = learn_boilerplate([text for _, text in pages])
+    report.boilerplate_lines = len(boilerplate)
+    index = SimHashIndex()
+    documents, metadatas, duplicates = [], [], {}
+    for url, text in pages:
+        report.pages += 1
+        report.bytes_in += len(text.encode())
+        content = strip_boilerplate(text, boilerplate)
+        if not content:
+            report.empty += 1
+            continue
+        fingerprint = simhash(content)
+        original = index.find(fingerprint)
+        if original is not None:
+            report.duplicates += 1
+            duplicates.setdefault(original, []).append(url)
+            continue
+        index.add(len(documents), fingerprint)
+        documents.append(content)
+        metadatas.append({"url": url})
+        report.bytes_out += len(content.encode())
+    for position, urls in duplicates.items():
+        # Chroma metadata values must be scalars
+        metadatas[position]["duplicate_urls"] = " ".join(urls)
+    report.indexed = len(documents)
+    return documents, metadatas, report
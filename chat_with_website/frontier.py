@@ -0,0 +1,180 @@
+import re
+import json
+import math
+import sqlite3
+import hashlib
+import logging
+import posixpath
+from urllib.parse import urljoin, urlsplit, urlunsplit, parse_qsl, urlencode, quote
+
+FRONTIER_FILE = "frontier.sqlite3"
+MAX_PAGES = 500
+MAX_DEPTH = 3
+# Sized for a million URLs at a 0.1% false-positive rate: ~1.8 MB of bits
+BLOOM_CAPACITY = 1_000_000
+BLOOM_ERROR_RATE = 0.001
+
+TRACKING_PARAMS = re.compile(r"^(utm_\w+|gclid|fbclid|msclkid|mc_cid|mc_eid)$", re.IGNORECASE)
+SKIP_EXTENSIONS = {".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp", ".ico", ".pdf", ".zip", ".gz", ".tar",
+                   ".css", ".js", ".json", ".xml", ".mp3", ".mp4", ".webm", ".woff", ".woff2", ".ttf", ".exe"}
+
+QUEUED, DONE, FAILED = 0, 1, 2
+
+logger = logging.getLogger(__name__)
+
+
+def canonicalize(url, base=None):
+    """
+    One spelling per page: absolute, lowercase scheme and host, no default port, no
+    fragment, dot segments resolved, tracking parameters dropped and the query sorted.
+    Returns None for anything that isn't an http(s) URL.
+    """
+    try:
+        parts = urlsplit(urljoin(base, url) if base else url)
+        scheme = parts.scheme.lower()
+        host = (parts.hostname or "").lower()
+        port = parts.port
+    except ValueError:
+        return None
+    if scheme not in ("http", "https") or not host:
+        return None
+    netloc = host if port is None or (scheme, port) in (("http", 80), ("https", 443)) else f"{host}:{port}"
+    # Resolving against the root removes "." and ".." segments
+    path = urlsplit(urljoin(f"{scheme}://{netloc}/", parts.path or "/")).path
+    path = quote(path, safe="/%:@!$&'()*+,;=-._~")
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                             if not TRACKING_PARAMS.match(k)))
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+
+class Scope:
+    """A URL is in scope when it is on a seed's host, under the seed's directory, and looks like a page"""
+
+    def __init__(self, seeds):
+        self.prefixes = []
+        for seed in seeds:
+            parts = urlsplit(seed)
+            self.prefixes.append((parts.netloc, parts.path[:parts.path.rfind("/") + 1] or "/"))
+
+    def __contains__(self, url):
+        parts = urlsplit(url)
+        if posixpath.splitext(parts.path)[1].lower() in SKIP_EXTENSIONS:
+            return False
+        return any(parts.netloc == host and parts.path.startswith(prefix) for host, prefix in self.prefixes)
+
+
+class BloomFilter:
+    def __init__(self, capacity=BLOOM_CAPACITY, error_rate=BLOOM_ERROR_RATE):
+        self.size = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        # Double hashing: k positions from one 128-bit digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item):
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        return all(self.bits[position >> 3] & 1 << (position & 7) for position in self._positions(item))
+
+
+class Frontier:
+    """
+    Persistent crawl frontier in a SQLite file: a FIFO queue of (url, depth) and the set
+    of every URL ever seen. Membership is checked against an in-memory Bloom filter first,
+    so the disk is only read for the rare positives and memory stays bounded on
+    million-URL sites. Opening the file of an unfinished crawl resumes it when it was
+    started from the same seeds (or no seeds are given); `resume=True` resumes it
+    whatever the seeds, `resume=False` always starts over.
+    """
+
+    def __init__(self, path, seeds=(), max_pages=MAX_PAGES, max_depth=MAX_DEPTH, capacity=BLOOM_CAPACITY,
+                 resume=None):
+        self.db = sqlite3.connect(path)
+        self.db.execute("""CREATE TABLE IF NOT EXISTS urls (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, url TEXT UNIQUE NOT NULL, depth INTEGER, state INTEGER)""")
+        self.db.execute("CREATE INDEX IF NOT EXISTS urls_state ON urls (state, id)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.max_pages = max_pages
+        self.max_depth = max_depth
+        self.bloom = BloomFilter(capacity)
+        # URLs handed out by pop() and not yet finished, so concurrent workers get different pages
+        self.claimed = set()
+
+        seeds = [url for url in map(canonicalize, seeds) if url]
+        saved = self.db.execute("SELECT value FROM meta WHERE key = 'seeds'").fetchone()
+        saved = json.loads(saved[0]) if saved and self.count(QUEUED) else None
+        # An unfinished crawl of another site in the same file is discarded, not resumed
+        self.discarded = saved is not None and resume is None and bool(seeds) and set(seeds) != set(saved)
+        if self.discarded:
+            logger.warning(f"{path} holds an unfinished crawl from {saved[0]}; starting over from {seeds[0]}")
+        if saved is not None and resume is not False and not self.discarded:
+            # Resume: keep the original scope and rebuild the filter from disk
+            seeds = saved
+            for (url,) in self.db.execute("SELECT url FROM urls"):
+                self.bloom.add(url)
+            self.resumed = True
+        else:
+            # A finished (or new) crawl starts over
+            self.db.execute("DELETE FROM urls")
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES ('seeds', ?)", (json.dumps(seeds),))
+            self.resumed = False
+        self.scope = Scope(seeds)
+        for seed in seeds:
+            self.add(seed, 0)
+        self.db.commit()
+
+    def seen(self, url):
+        if url not in self.bloom:
+            return False
+        return self.db.execute("SELECT 1 FROM urls WHERE url = ?", (url,)).fetchone() is not None
+
+    def add(self, url, depth, base=None):
+        """Queue a URL unless it is out of scope, too deep or already seen; returns whether it was queued"""
+        url = canonicalize(url, base)
+        if url is None or depth > self.max_depth or url not in self.scope or self.seen(url):
+            return False
+        self.db.execute("INSERT OR IGNORE INTO urls (url, depth, state) VALUES (?, ?, ?)", (url, depth, QUEUED))
+        self.bloom.add(url)
+        return True
+
+    def pop(self):
+        """Next (url, depth) to crawl, or None when the queue is empty or the page limit is reached"""
+        if self.crawled() + len(self.claimed) >= self.max_pages:
+            return None
+        rows = self.db.execute("SELECT url, depth FROM urls WHERE state = ? ORDER BY id LIMIT ?",
+                               (QUEUED, len(self.claimed) + 1))
+        for url, depth in rows:
+            if url not in self.claimed:
+                self.claimed.add(url)
+                return url, depth
+        return None
+
+    def finish(self, url, success=True):
+        # A page stays queued until it is finished, so a crash or pause recrawls it on resume
+        self.claimed.discard(url)
+        self.db.execute("UPDATE urls SET state = ? WHERE url = ?", (DONE if success else FAILED, url))
+        self.db.commit()
+
+    def release(self, url):
+        """Put a popped URL back in the queue unfinished, e.g. when the server asked us to retry later"""
+        self.claimed.discard(url)
+
+    def count(self, state):
+        return self.db.execute("SELECT COUNT(*) FROM urls WHERE state = ?", (state,)).fetchone()[0]
+
+    def crawled(self):
+        return self.count(DONE) + self.count(FAILED)
+
+    def progress(self):
+        crawled = self.crawled()
+        return int(crawled / max(1, min(self.max_pages, crawled + self.count(QUEUED))) * 100)
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
@@ -0,0 +1,296 @@
+"""
+Multi-user HTTP query service over the index the desktop app builds in ./chroma_storage.
+
+    GEMINI_API_KEY=... python query_server.py --port 8000
+    curl -N localhost:8000/query -d '{"query": "How do I deploy?"}'
+
+    POST /query   {"query", "n_results": 5, "stream": true}
+                  NDJSON lines: {"sources"}, then {"text"} chunks, then {"done", "timings"}
+                  (one JSON object with "answer" when "stream" is false)
+    POST /search  {"query", "n_results": 5} -> {"documents", "metadatas"}
+    GET  /health  -> batching and latency stats
+
+One ONNX embedding session and one Chroma client serve every request. Query embeddings
+from concurrent requests are micro-batched: while a batch is being embedded and searched,
+new queries queue up and go out together in the next one.
+"""
+import os
+import sys
+import json
+import time
+import queue
+import logging
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+# The shared Gemini client lives at the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from gemini_provider import get_provider
+from chat_tracing import percentile
+from store import ChromaDBManager, answer_prompt
+
+logger = logging.getLogger(__name__)
+
+MODEL_NAME = "gemini-1.5-flash"
+N_RESULTS = 5
+MAX_RESULTS = 20
+# A batch takes whatever queued up while the previous one ran, up to MAX_BATCH queries. MAX_WAIT can hold
+# it open a little longer; it defaults to 0 so a lone user never waits for company.
+MAX_BATCH = 32
+MAX_WAIT = 0.0
+LATENCY_WINDOW = 1000
+
+
+class MicroBatcher:
+    """
+    Runs `handler(items) -> results` on one thread for batches of items submitted from
+    many threads. Whatever queues up while a batch is running goes into the next batch,
+    so batches grow with load and a lone request waits at most `max_wait`.
+    """
+
+    def __init__(self, handler, max_batch=MAX_BATCH, max_wait=MAX_WAIT):
+        self.handler = handler
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = queue.Queue()
+        self.batches = 0
+        self.items = 0
+        self.largest = 0
+        self.thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self.thread.start()
+
+    def submit(self, item):
+        """Blocks until the item's batch has run; re-raises the handler's exception"""
+        future = Future()
+        self.queue.put((item, future))
+        return future.result()
+
+    def close(self):
+        self.queue.put(None)
+        self.thread.join()
+
+    def _collect(self, first):
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            try:
+                entry = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if entry is None:
+                # Run this batch, then stop
+                self.queue.put(None)
+                break
+            batch.append(entry)
+        return batch
+
+    def _run(self):
+        while (first := self.queue.get()) is not None:
+            batch = self._collect(first)
+            self.batches += 1
+            self.items += len(batch)
+            self.largest = max(self.largest, len(batch))
+            try:
+                results = self.handler([item for item, _ in batch])
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+
+
+class QueryService:
+    def __init__(self, store, model=None, max_batch=MAX_BATCH, max_wait=MAX_WAIT):
+        self.store = store
+        self.model = model
+        self.batcher = MicroBatcher(self._search_batch, max_batch, max_wait)
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.served = 0
+        self.lock = threading.Lock()
+
+    def _search_batch(self, items):
+        results = self.store.search_batch([query for query, _ in items], max(n for _, n in items))
+        return [(documents[:n], metadatas[:n]) for (_, n), (documents, metadatas) in zip(items, results)]
+
+    def _record(self, start):
+        with self.lock:
+            self.served += 1
+            self.latencies.append(time.perf_counter() - start)
+
+    def search(self, query, n_results=N_RESULTS):
+        start = time.perf_counter()
+        documents, metadatas = self.batcher.submit((query, n_results))
+        self._record(start)
+        return documents, metadatas
+
+    def answer(self, query, n_results=N_RESULTS, stream=True):
+        """Yields {"sources"}, then {"text"} chunks, then {"done", "timings"}"""
+        start = time.perf_counter()
+        documents, metadatas = self.batcher.submit((query, n_results))
+        retrieval = time.perf_counter() - start
+        yield {"sources": [metadata.get("url") for metadata in metadatas if metadata]}
+
+        first_chunk = None
+        response = self.model.generate_content(answer_prompt(query, documents), stream=stream)
+        for chunk in (response if stream else [response]):
+            if first_chunk is None:
+                first_chunk = time.perf_counter() - start
+            if chunk.text:
+                yield {"text": chunk.text}
+        self._record(start)
+        yield {"done": True, "timings": {
+            "retrieval_ms": round(retrieval * 1000, 1),
+            "first_chunk_ms": round(first_chunk * 1000, 1) if first_chunk is not None else None,
+            "total_ms": round((time.perf_counter() - start) * 1000, 1),
+        }}
+
+    def stats(self):
+        with self.lock:
+            latencies = list(self.latencies)
+        batcher = self.batcher
+        return {
+            "served": self.served, "batches": batcher.batches, "largest_batch": batcher.largest,
+            "mean_batch": round(batcher.items / batcher.batches, 2) if batcher.batches else None,
+            "p50_ms": round(percentile(latencies, 50) * 1000, 1) if latencies else None,
+            "p99_ms": round(percentile(latencies, 99) * 1000, 1) if latencies else None,
+            "answers": self.model is not None,
+        }
+
+
+class QueryServer(ThreadingHTTPServer):
+    # The default listen backlog of 5 drops connections when many users arrive at once
+    request_queue_size = 256
+    daemon_threads = True
+
+    def __init__(self, address, service):
+        super().__init__(address, _Handler)
+        self.service = service
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; with Nagle on, each response waits ~40 ms on a delayed ACK
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    def _send_json(self, payload, status=200):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if urlparse(self.path).path == "/health":
+            self._send_json(self.server.service.stats())
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        service = self.server.service
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+            query = str(payload.get("query", "")).strip()
+            n_results = min(max(int(payload.get("n_results", N_RESULTS)), 1), MAX_RESULTS)
+        except (ValueError, TypeError, AttributeError):
+            self._send_json({"error": "expected a JSON object with a query"}, status=400)
+            return
+        if not query:
+            self._send_json({"error": "query is empty"}, status=400)
+            return
+
+        if path == "/search":
+            try:
+                documents, metadatas = service.search(query, n_results)
+            except Exception as e:
+                logger.exception("Search failed")
+                self._send_json({"error": f"search failed: {e}"}, status=500)
+                return
+            self._send_json({"documents": documents, "metadatas": metadatas})
+        elif path == "/query":
+            if service.model is None:
+                self._send_json({"error": "no Gemini API key configured; set GEMINI_API_KEY"}, status=503)
+            elif payload.get("stream", True):
+                self._stream_answer(service, query, n_results)
+            else:
+                self._answer(service, query, n_results)
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def _answer(self, service, query, n_results):
+        try:
+            events = list(service.answer(query, n_results, stream=False))
+        except Exception as e:
+            logger.exception("Query failed")
+            self._send_json({"error": f"query failed: {e}"}, status=500)
+            return
+        self._send_json({"answer": "".join(event.get("text", "") for event in events),
+                         "sources": events[0]["sources"], "timings": events[-1]["timings"]})
+
+    def _stream_answer(self, service, query, n_results):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for event in service.answer(query, n_results):
+                self._write_chunk((json.dumps(event) + "\n").encode())
+        except ConnectionError:
+            # The user went away; nothing left to send to
+            return
+        except Exception as e:
+            # Headers are already sent, so the error goes in the stream
+            logger.exception("Query failed")
+            self._write_chunk((json.dumps({"error": f"query failed: {e}"}) + "\n").encode())
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--path", default="./chroma_storage", help="Chroma directory written by app.py")
+    parser.add_argument("--collection", default="web_documents")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    parser.add_argument("--max-wait", type=float, default=MAX_WAIT, help="Seconds a batch waits for more queries")
+    parser.add_argument("--api-key", default=os.environ.get("GEMINI_API_KEY"))
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    store = ChromaDBManager(args.collection, args.path)
+    store.warm_up()
+    model = get_provider(args.api_key).model(MODEL_NAME) if args.api_key else None
+    if model is None:
+        logger.warning("GEMINI_API_KEY is not set; only /search is available")
+    server = QueryServer((args.host, args.port), QueryService(store, model, args.max_batch, args.max_wait))
+    logger.info("Serving %s documents on %s", store.collection.count(), server.url)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.service.batcher.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+import os
+import sys
+import copy
+import time
+import asyncio
+import ipaddress
+from collections import Counter
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+
+import psutil
+from crawl4ai import AsyncWebCrawler, BrowserConfig, CrawlerRunConfig
+from crawl4ai.markdown_generation_strategy import DefaultMarkdownGenerator
+
+# Percentiles are computed the same way as in the other apps' reports
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from chat_tracing import percentile
+
+# Playwright resource types that never make it into the markdown
+HEAVY_RESOURCE_TYPES = frozenset({"image", "media", "font", "texttrack", "manifest"})
+BROWSER_ARGS = ["--disable-gpu", "--disable-dev-shm-usage", "--no-sandbox"]
+LEAN_BROWSER_ARGS = BROWSER_ARGS + ["--blink-settings=imagesEnabled=false", "--disable-remote-fonts",
+                                    "--autoplay-policy=user-gesture-required"]
+
+
+def site_of(host):
+    """Registrable part of a host, roughly: the last two labels (IP addresses and single labels as-is)"""
+    host = (host or "").lower()
+    try:
+        ipaddress.ip_address(host)
+        return host
+    except ValueError:
+        return ".".join(host.split(".")[-2:])
+
+
+@dataclass(frozen=True)
+class RenderProfile:
+    """How much of each page the headless browser loads; see LEAN_PROFILE and FULL_PROFILE"""
+    name: str = "lean"
+    blocked_types: frozenset = HEAVY_RESOURCE_TYPES
+    block_third_party: bool = True
+    # Third-party domains that are still loaded, e.g. the CDN a site's JavaScript framework comes from
+    allowed_domains: tuple = ()
+    # Navigation timeout, and a hard cap on the whole render so one hung page cannot stall the crawl (0 = none)
+    page_timeout: float = 20.0
+    render_timeout: float = 45.0
+    # Pages per browser context before it is closed and replaced, which caps memory growth (0 = never)
+    recycle_after: int = 50
+    light_mode: bool = True
+
+    def browser_config(self):
+        return BrowserConfig(
+            headless=True,
+            light_mode=self.light_mode,
+            extra_args=LEAN_BROWSER_ARGS if "image" in self.blocked_types else BROWSER_ARGS,
+        )
+
+    def run_config(self):
+        return CrawlerRunConfig(
+            markdown_generator=DefaultMarkdownGenerator(),
+            page_timeout=int(self.page_timeout * 1000),
+            wait_for_images=False,
+        )
+
+    def block_reason(self, resource_type, url, site):
+        """Why a request is blocked ("image", "third-party", ...), or None to let it through"""
+        if resource_type == "document":
+            # Navigations and frames are never blocked, so redirects across domains still work
+            return None
+        if resource_type in self.blocked_types:
+            return resource_type
+        if self.block_third_party and site:
+            host = (urlsplit(url).hostname or "").lower()
+            if site_of(host) != site and not any(host == d or host.endswith("." + d) for d in self.allowed_domains):
+                return "third-party"
+        return None
+
+
+LEAN_PROFILE = RenderProfile()
+# What the crawler did before render profiles: everything loads, crawl4ai's 60s timeout, no recycling
+FULL_PROFILE = RenderProfile(name="full", blocked_types=frozenset(), block_third_party=False, page_timeout=60.0,
+                             render_timeout=0, recycle_after=0, light_mode=False)
+PROFILES = {profile.name: profile for profile in (LEAN_PROFILE, FULL_PROFILE)}
+
+
+def process_tree_rss():
+    """Resident memory of this process and its children, which include the browser"""
+    process = psutil.Process()
+    total = 0
+    for proc in [process] + process.children(recursive=True):
+        try:
+            total += proc.memory_info().rss
+        except psutil.Error:
+            pass
+    return total
+
+
+class RenderStats:
+    def __init__(self, profile):
+        self.profile = profile
+        self.render_times = []
+        self.requests = 0
+        self.bytes_downloaded = 0
+        self.blocked = Counter()
+        self.timeouts = 0
+        self.recycled = 0
+        self.peak_rss = 0
+
+    def sample_rss(self):
+        self.peak_rss = max(self.peak_rss, process_tree_rss())
+
+    def as_dict(self):
+        times = self.render_times
+        return {
+            "profile": self.profile.name, "pages": len(times), "requests": self.requests,
+            "bytes_downloaded": self.bytes_downloaded, "requests_blocked": dict(self.blocked),
+            "render_p50_ms": round(percentile(times, 50) * 1000, 1) if times else None,
+            "render_p95_ms": round(percentile(times, 95) * 1000, 1) if times else None,
+            "render_max_ms": round(max(times) * 1000, 1) if times else None,
+            "timeouts": self.timeouts, "contexts_recycled": self.recycled, "peak_rss_bytes": self.peak_rss,
+        }
+
+    def summary(self):
+        report = self.as_dict()
+        if not report["pages"]:
+            return f"Render profile {self.profile.name}: no pages rendered."
+        return (f"Render profile {self.profile.name}: {report['pages']} pages, "
+                f"{self.bytes_downloaded / 1e6:.1f} MB downloaded, {sum(self.blocked.values())} requests blocked, "
+                f"render p50 {report['render_p50_ms']:.0f} ms / p95 {report['render_p95_ms']:.0f} ms, "
+                f"{self.timeouts} timeouts, peak memory {self.peak_rss / 1e6:.0f} MB.")
+
+
+class Renderer:
+    """
+    One headless browser rendering pages under a RenderProfile. Each session_id keeps its
+    browser context between pages and gets a fresh one every `recycle_after` pages or after
+    a timeout. Requests are filtered by a route on each context and counted in `stats`.
+    """
+
+    def __init__(self, profile=LEAN_PROFILE):
+        self.profile = profile
+        self.stats = RenderStats(profile)
+        self.crawler = None
+        self.run_config = profile.run_config()
+        # arun() reads the session from its config (not from a session_id argument) and writes the
+        # URL into it, so every session gets a config of its own
+        self.configs = {}
+        self.uses = Counter()
+        # First-party site of the page each context is on, keyed by context
+        self.sites = {}
+
+    async def start(self):
+        self.crawler = AsyncWebCrawler(config=self.profile.browser_config())
+        await self.crawler.start()
+        self.crawler.crawler_strategy.set_hook("before_goto", self._before_goto)
+        self.stats.sample_rss()
+        return self
+
+    async def close(self):
+        await self.crawler.close()
+
+    async def _before_goto(self, page, context=None, url=None, **kwargs):
+        first_visit = context not in self.sites
+        self.sites[context] = site_of(urlsplit(url).hostname)
+        if first_visit:
+            context.on("requestfinished", self._on_request_finished)
+            if self.profile.blocked_types or self.profile.block_third_party:
+                await context.route("**/*", lambda route: self._route(route, context))
+        return page
+
+    async def _route(self, route, context):
+        request = route.request
+        reason = self.profile.block_reason(request.resource_type, request.url, self.sites.get(context))
+        if reason:
+            self.stats.blocked[reason] += 1
+            await route.abort("blockedbyclient")
+        else:
+            await route.continue_()
+
+    async def _on_request_finished(self, request):
+        self.stats.requests += 1
+        try:
+            sizes = await request.sizes()
+            self.stats.bytes_downloaded += sizes["responseBodySize"] + sizes["responseHeadersSize"]
+        except Exception:
+            pass
+
+    async def recycle(self, session_id):
+        """Close the session's context; its next page opens a new one"""
+        manager = self.crawler.crawler_strategy.browser_manager
+        if session_id in manager.sessions:
+            self.sites.pop(manager.sessions[session_id][0], None)
+            await manager.kill_session(session_id)
+            self.stats.recycled += 1
+        self.uses.pop(session_id, None)
+
+    async def render(self, url, session_id):
+        """crawler.arun() under the profile's timeouts; None when the page timed out"""
+        if session_id not in self.configs:
+            self.configs[session_id] = copy.copy(self.run_config)
+            self.configs[session_id].session_id = session_id
+        start = time.monotonic()
+        try:
+            result = await asyncio.wait_for(
+                self.crawler.arun(url=url, config=self.configs[session_id]),
+                self.profile.render_timeout or None,
+            )
+        except asyncio.TimeoutError:
+            self.stats.timeouts += 1
+            # The page may still be busy loading; don't reuse it
+            await self.recycle(session_id)
+            return None
+        finally:
+            self.stats.render_times.append(time.monotonic() - start)
+        self.uses[session_id] += 1
+        if self.profile.recycle_after and self.uses[session_id] >= self.profile.recycle_after:
+            self.stats.sample_rss()
+            await self.recycle(session_id)
+        elif len(self.stats.render_times) % 10 == 0:
+            self.stats.sample_rss()
+        return result
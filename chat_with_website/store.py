@@ -0,0 +1,55 @@
+import chromadb
+from chromadb.config import Settings
+from chromadb.utils import embedding_functions
+
+
+class ChromaDBManager:
+    def __init__(self, collection_name='web_documents', path="./chroma_storage"):
+        # One ONNX session per manager; keep the manager around rather than building one per query
+        self.embedding_function = embedding_functions.ONNXMiniLM_L6_V2()
+
+        self.client = chromadb.PersistentClient(path=path, settings=Settings(anonymized_telemetry=False))
+        self.collection = self.client.get_or_create_collection(
+            name=collection_name,
+            embedding_function=self.embedding_function
+        )
+
+    def add_documents(self, documents, metadata=None):
+        # Generate unique IDs for each document
+        ids = [f"doc_{hash(doc)}" for doc in documents]
+
+        # Add documents to the collection
+        self.collection.add(
+            documents=documents,
+            ids=ids,
+            metadatas=metadata
+        )
+
+    def search_documents(self, query, n_results=5):
+        results = self.collection.query(
+            query_texts=[query],
+            n_results=n_results
+        )
+        return results['documents'][0]
+
+    def warm_up(self):
+        # The first call loads the ONNX model from disk
+        self.embedding_function(["warm up"])
+
+    def search_batch(self, queries, n_results=5):
+        """
+        Search many queries with one embedding call and one index lookup.
+        Returns a (documents, metadatas) pair per query.
+        """
+        embeddings = self.embedding_function(queries)
+        results = self.collection.query(
+            query_embeddings=embeddings,
+            n_results=n_results,
+            include=['documents', 'metadatas']
+        )
+        return list(zip(results['documents'], results['metadatas']))
+
+
+def answer_prompt(query, context_docs):
+    context = "\n\n".join(context_docs)
+    return f"Context:\n{context}\n\nQuery: {query}\n\nProvide a precise answer based only on the context above."
@@ -0,0 +1,68 @@
+import random
+
+from dedupe import SimHashIndex, learn_boilerplate, prepare_documents, simhash, strip_boilerplate
+
+NAV = "Home | Docs | Blog | Pricing"
+COOKIES = "We use cookies to improve your experience."
+FOOTER = "Copyright 2024 Example Inc."
+
+
+def article(seed, words=300):
+    rng = random.Random(seed)
+    vocabulary = [f"word{i}" for i in range(2000)]
+    return " ".join(rng.choice(vocabulary) for _ in range(words))
+
+
+def page(body):
+    title = body.split()[0]
+    return f"{NAV}\n{COOKIES}\n\n# {title}\n\n{body}\n\n```\nprint({title!r})\n```\n\n{FOOTER}"
+
+
+def test_boilerplate_is_lines_repeated_across_pages():
+    pages = [page(article(i)) for i in range(5)]
+    boilerplate = learn_boilerplate(pages)
+    assert {NAV.lower(), COOKIES.lower(), FOOTER.lower()} <= boilerplate
+    # Structure lines such as code fences are never treated as boilerplate
+    assert "```" not in boilerplate
+    stripped = strip_boilerplate(pages[0], boilerplate)
+    assert NAV not in stripped and FOOTER not in stripped
+    assert "```\nprint(" in stripped and stripped.endswith(")\n```")
+    assert "\n\n\n" not in stripped
+
+
+def test_boilerplate_needs_min_pages():
+    assert learn_boilerplate([page(article(1)), page(article(2))]) == set()
+
+
+def test_simhash_of_a_small_edit_is_close():
+    text = article(1)
+    edited = text.replace("word", "term", 1)
+    unrelated = article(2)
+    assert bin(simhash(text) ^ simhash(edited)).count("1") <= 7
+    assert bin(simhash(text) ^ simhash(unrelated)).count("1") > 7
+
+
+def test_simhash_index_finds_near_duplicates_only():
+    index = SimHashIndex()
+    index.add("a", 0)
+    assert index.find(0b1111111) == "a"
+    assert index.find(0b11111111) is None
+
+
+def test_prepare_documents_skips_near_duplicates():
+    base = article(1)
+    pages = [
+        ("https://example.com/a", page(base)),
+        ("https://example.com/b", page(article(2))),
+        ("https://example.com/a?print=1", page(base.replace("word", "term", 1))),
+        ("https://example.com/c", page(article(3))),
+        ("https://example.com/empty", f"{NAV}\n{COOKIES}\n\n{FOOTER}"),
+    ]
+    documents, metadatas, report = prepare_documents(pages)
+    assert [m["url"] for m in metadatas] == ["https://example.com/a", "https://example.com/b", "https://example.com/c"]
+    assert metadatas[0]["duplicate_urls"] == "https://example.com/a?print=1"
+    assert "duplicate_urls" not in metadatas[1]
+    assert all(NAV not in document for document in documents)
+    assert (report.pages, report.indexed, report.duplicates, report.empty) == (5, 3, 1, 1)
+    assert report.embeddings_saved == 2
+    assert 0 < report.bytes_out < report.bytes_in
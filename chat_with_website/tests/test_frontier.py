@@ -0,0 +1,127 @@
+import pytest
+
+from frontier import BloomFilter, Frontier, Scope, canonicalize, DONE, QUEUED
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("HTTP://Example.COM:80/a/./b/../c?b=2&a=1#frag", "http://example.com/a/c?a=1&b=2"),
+    ("https://example.com:443", "https://example.com/"),
+    ("https://example.com:8443/x", "https://example.com:8443/x"),
+    ("https://example.com/page?utm_source=x&id=3&fbclid=y", "https://example.com/page?id=3"),
+    ("https://example.com/a b", "https://example.com/a%20b"),
+    ("mailto:someone@example.com", None),
+    ("javascript:void(0)", None),
+    ("https://[bad", None),
+])
+def test_canonicalize(url, expected):
+    assert canonicalize(url) == expected
+
+
+def test_canonicalize_resolves_relative_links():
+    assert canonicalize("../b?x=1", base="https://example.com/docs/a/") == "https://example.com/docs/b?x=1"
+    assert canonicalize("#top", base="https://example.com/docs/") == "https://example.com/docs/"
+
+
+def test_scope_is_seed_host_and_directory():
+    scope = Scope(["https://example.com/docs/index.html"])
+    assert "https://example.com/docs/guide" in scope
+    assert "https://example.com/blog/post" not in scope
+    assert "https://other.com/docs/guide" not in scope
+    assert "https://example.com/docs/logo.png" not in scope
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    urls = [f"https://example.com/{i}" for i in range(1000)]
+    for url in urls:
+        bloom.add(url)
+    assert all(url in bloom for url in urls)
+    false_positives = sum(f"https://other.com/{i}" in bloom for i in range(10_000))
+    assert false_positives < 300
+
+
+def make_frontier(tmp_path, seeds=("https://site-a.com/",), **kwargs):
+    kwargs.setdefault("capacity", 10_000)
+    return Frontier(str(tmp_path / "frontier.sqlite3"), seeds=seeds, **kwargs)
+
+
+def test_add_dedupes_and_respects_scope_and_depth(tmp_path):
+    frontier = make_frontier(tmp_path, max_depth=2)
+    assert frontier.add("/a?utm_source=x", 1, base="https://site-a.com/")
+    assert not frontier.add("https://SITE-A.com/a#section", 1)
+    assert not frontier.add("https://site-b.com/a", 1)
+    assert not frontier.add("https://site-a.com/deep", 3)
+    assert frontier.count(QUEUED) == 2  # the seed and /a
+    frontier.close()
+
+
+def test_pop_is_fifo_and_claims_urls(tmp_path):
+    frontier = make_frontier(tmp_path)
+    frontier.add("https://site-a.com/1", 1)
+    frontier.add("https://site-a.com/2", 1)
+    assert frontier.pop() == ("https://site-a.com/", 0)
+    assert frontier.pop() == ("https://site-a.com/1", 1)
+    frontier.release("https://site-a.com/1")
+    assert frontier.pop() == ("https://site-a.com/1", 1)
+    frontier.finish("https://site-a.com/")
+    assert frontier.count(DONE) == 1
+    frontier.close()
+
+
+def test_pop_stops_at_max_pages(tmp_path):
+    frontier = make_frontier(tmp_path, max_pages=2)
+    for i in range(5):
+        frontier.add(f"https://site-a.com/{i}", 1)
+    assert frontier.pop() and frontier.pop()
+    assert frontier.pop() is None
+    frontier.close()
+
+
+def paused_crawl(tmp_path):
+    frontier = make_frontier(tmp_path)
+    frontier.add("https://site-a.com/next", 1)
+    url, _ = frontier.pop()
+    frontier.finish(url)
+    frontier.close()
+
+
+def test_unfinished_crawl_resumes_with_the_same_seeds(tmp_path):
+    paused_crawl(tmp_path)
+    frontier = make_frontier(tmp_path)
+    assert frontier.resumed
+    assert frontier.pop() == ("https://site-a.com/next", 1)
+    assert frontier.seen("https://site-a.com/")
+    frontier.close()
+
+
+def test_unfinished_crawl_of_another_site_is_not_resumed(tmp_path):
+    paused_crawl(tmp_path)
+    frontier = make_frontier(tmp_path, seeds=["https://site-b.com/"])
+    assert not frontier.resumed
+    assert frontier.discarded
+    assert "https://site-b.com/x" in frontier.scope
+    assert "https://site-a.com/next" not in frontier.scope
+    assert frontier.pop() == ("https://site-b.com/", 0)
+    frontier.close()
+
+
+def test_resume_can_be_forced_or_refused(tmp_path):
+    paused_crawl(tmp_path)
+    frontier = make_frontier(tmp_path, seeds=["https://site-b.com/"], resume=True)
+    assert frontier.resumed and not frontier.discarded
+    frontier.close()
+    frontier = make_frontier(tmp_path, resume=False)
+    assert not frontier.resumed
+    assert frontier.count(QUEUED) == 1
+    frontier.close()
+
+
+def test_finished_crawl_starts_over(tmp_path):
+    frontier = make_frontier(tmp_path)
+    url, _ = frontier.pop()
+    frontier.finish(url)
+    frontier.close()
+    frontier = make_frontier(tmp_path)
+    assert not frontier.resumed
+    assert frontier.pop() == ("https://site-a.com/", 0)
+    frontier.close()
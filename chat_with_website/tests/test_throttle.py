@@ -0,0 +1,128 @@
+import asyncio
+
+import pytest
+
+import throttle
+from throttle import BACKOFF, LATENCY_BACKOFF, HostThrottle, parse_crawl_delay, parse_retry_after
+
+
+ROBOTS = """
+# comments and blank lines are ignored
+User-agent: *
+Crawl-delay: 2
+
+User-agent: chat-with-website
+User-agent: otherbot
+Crawl-delay: 0.5   # fractional, which RobotFileParser drops
+Disallow: /private
+"""
+
+
+def test_crawl_delay_for_our_agent():
+    assert parse_crawl_delay(ROBOTS.splitlines(), "chat-with-website/1.0") == 0.5
+
+
+def test_crawl_delay_falls_back_to_star_group():
+    assert parse_crawl_delay(ROBOTS.splitlines(), "somebot") == 2.0
+
+
+def test_crawl_delay_missing_or_invalid():
+    assert parse_crawl_delay(["User-agent: *", "Disallow: /"], "somebot") is None
+    assert parse_crawl_delay(["User-agent: *", "Crawl-delay: soon"], "somebot") is None
+    assert parse_crawl_delay([], "somebot") is None
+
+
+def test_retry_after_seconds_and_dates():
+    assert parse_retry_after("5") == 5.0
+    assert parse_retry_after("-3") == 0.0
+    assert parse_retry_after("99999") == throttle.MAX_RETRY_AFTER
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:10 GMT", now=1445412480) == 10.0
+    assert parse_retry_after("later") is None
+    assert parse_retry_after(None) is None
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(throttle.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_crawl_delay_caps_the_rate(clock):
+    host = HostThrottle("example.com", crawl_delay=2.0)
+    assert host.max_rate == 0.5
+    assert host.rate == 0.5
+    for _ in range(10):
+        host.record(0.1, 200)
+    assert host.rate == 0.5
+
+
+def test_slow_start_then_multiplicative_decrease_on_429(clock):
+    host = HostThrottle("example.com", initial_rate=2.0)
+    for _ in range(3):
+        host.record(0.1, 200)
+    assert host.rate == 5.0
+    host.record(0.1, 429)
+    assert host.rate == pytest.approx(5.0 * BACKOFF)
+    assert not host.slow_start
+    assert host.throttled == 1
+    # Outside slow start, a healthy response adds ADDITIVE_INCREASE / rate
+    rate = host.rate
+    host.record(0.1, 200)
+    assert host.rate == pytest.approx(rate + throttle.ADDITIVE_INCREASE / rate)
+
+
+def test_one_decrease_per_round_trip(clock):
+    host = HostThrottle("example.com", initial_rate=10.0)
+    host.record(0.5, 200)
+    rate = host.rate
+    host.record(0.5, 503)
+    host.record(0.5, 503)
+    assert host.rate == pytest.approx(rate * BACKOFF)
+    clock[0] += 1.0
+    host.record(0.5, None)
+    assert host.rate == pytest.approx(rate * BACKOFF * BACKOFF)
+    assert (host.throttled, host.errors) == (2, 1)
+
+
+def test_rising_latency_backs_off(clock):
+    host = HostThrottle("example.com", initial_rate=10.0)
+    host.record(0.1, 200)
+    rate = host.rate
+    clock[0] += 1.0
+    for _ in range(10):
+        host.record(2.0, 200)
+        if host.rate < rate:
+            break
+    assert host.rate == pytest.approx(rate * LATENCY_BACKOFF)
+
+
+def test_retry_after_blocks_the_host(clock):
+    host = HostThrottle("example.com")
+    host.record(0.1, 429, retry_after=30)
+    assert host.blocked_until == 1030.0
+    assert host.status()["blocked_for_s"] == 30.0
+
+
+def test_window_is_rate_times_latency():
+    host = HostThrottle("example.com", initial_rate=10.0)
+    assert host.window() == 1
+    host.latency = 0.45
+    assert host.window() == 5
+    host.latency = 100.0
+    assert host.window() == throttle.MAX_CONCURRENCY
+
+
+def test_acquire_waits_for_the_window():
+    async def scenario():
+        host = HostThrottle("example.com", initial_rate=50.0)
+        await host.acquire()
+        # No latency measured yet, so the window is one request
+        second = asyncio.create_task(host.acquire())
+        await asyncio.sleep(0.05)
+        assert not second.done()
+        await host.release(0.01, 200)
+        await asyncio.wait_for(second, 1)
+        assert host.inflight == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,244 @@
+import math
+import time
+import asyncio
+import urllib.request
+from urllib.error import HTTPError
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+from email.utils import parsedate_to_datetime
+
+USER_AGENT = "chat-with-website"
+# Requests per second: every host starts slow and gains 1 req/s per response (exponential growth) until the
+# first congestion signal
+INITIAL_RATE = 2.0
+MIN_RATE = 0.2
+MAX_RATE = 50.0
+# Concurrent requests per host, whatever the rate allows
+MAX_CONCURRENCY = 16
+# AIMD: +2 req/s per second of healthy responses; cut by 30% on pushback (CUBIC's factor, which
+# recovers faster than halving), and back off gently when latency climbs
+ADDITIVE_INCREASE = 2.0
+BACKOFF = 0.7
+LATENCY_BACKOFF = 0.8
+# Latency is "climbing" once its moving average is this far above the best seen for the host
+LATENCY_TOLERANCE = 2.0
+LATENCY_ALPHA = 0.2
+# The best-seen latency creeps up slowly so a host that got permanently slower is not punished forever
+BASE_LATENCY_DRIFT = 0.01
+THROTTLE_STATUSES = {429, 503}
+MAX_RETRY_AFTER = 300.0
+ROBOTS_TIMEOUT = 10
+
+
+def parse_retry_after(value, now=None):
+    """Seconds to wait from a Retry-After header (delta-seconds or an HTTP date), or None"""
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - (now or time.time())
+        except (TypeError, ValueError):
+            return None
+    return min(max(seconds, 0.0), MAX_RETRY_AFTER)
+
+
+def parse_crawl_delay(lines, user_agent):
+    """
+    Crawl-delay for `user_agent` from robots.txt lines, falling back to the `*` group.
+    RobotFileParser ignores fractional values such as "Crawl-delay: 0.5", so it is read here.
+    """
+    agent = user_agent.split("/")[0].lower()
+    delays, group, in_agents = {}, [], False
+    for line in lines:
+        key, _, value = line.split("#", 1)[0].partition(":")
+        key, value = key.strip().lower(), value.strip()
+        if key == "user-agent":
+            group = group if in_agents else []
+            group.append(value.lower())
+            in_agents = True
+        elif key:
+            in_agents = False
+            if key == "crawl-delay":
+                try:
+                    for name in group:
+                        delays.setdefault(name, float(value))
+                except ValueError:
+                    pass
+    matches = [delay for name, delay in delays.items() if name != "*" and name in agent]
+    return matches[0] if matches else delays.get("*")
+
+
+class HostThrottle:
+    """
+    AIMD rate control for one host, like TCP congestion control with request rate in
+    place of the window. Healthy responses raise the rate; 429/503, errors and rising
+    latency lower it, at most once per round trip so one burst counts as one signal.
+    Requests are paced to the rate, and in-flight requests are capped at rate x latency.
+    """
+
+    def __init__(self, host, crawl_delay=None, initial_rate=INITIAL_RATE, min_rate=MIN_RATE, max_rate=MAX_RATE):
+        self.host = host
+        self.crawl_delay = crawl_delay
+        # Crawl-delay is the site's own ceiling on our rate
+        self.max_rate = min(max_rate, 1 / crawl_delay) if crawl_delay else max_rate
+        self.min_rate = min(min_rate, self.max_rate)
+        self.rate = min(initial_rate, self.max_rate)
+        self.slow_start = True
+        self.latency = None
+        self.base_latency = None
+        self.inflight = 0
+        self.next_slot = 0.0
+        self.blocked_until = 0.0
+        self.last_decrease = 0.0
+        self.requests = 0
+        self.throttled = 0
+        self.errors = 0
+        self.condition = asyncio.Condition()
+
+    def window(self):
+        if self.latency is None:
+            return 1
+        return max(1, min(MAX_CONCURRENCY, math.ceil(self.rate * self.latency)))
+
+    async def acquire(self):
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.inflight < self.window())
+            self.inflight += 1
+            now = time.monotonic()
+            start = max(now, self.next_slot, self.blocked_until)
+            self.next_slot = start + 1 / self.rate
+        await asyncio.sleep(start - now)
+        # A Retry-After that arrived in the meantime still applies
+        while (delay := self.blocked_until - time.monotonic()) > 0:
+            await asyncio.sleep(delay)
+
+    async def release(self, latency, status=None, retry_after=None):
+        """Record a finished request; `status` None means it failed without a response"""
+        async with self.condition:
+            self.inflight -= 1
+            self.record(latency, status, retry_after)
+            self.condition.notify_all()
+
+    def record(self, latency, status=None, retry_after=None):
+        now = time.monotonic()
+        self.requests += 1
+        if retry_after:
+            self.blocked_until = max(self.blocked_until, now + retry_after)
+        if status is None or status in THROTTLE_STATUSES or status >= 500:
+            if status in THROTTLE_STATUSES:
+                self.throttled += 1
+            else:
+                self.errors += 1
+            self._decrease(now, BACKOFF)
+            return
+
+        self.latency = latency if self.latency is None else (1 - LATENCY_ALPHA) * self.latency + LATENCY_ALPHA * latency
+        if self.base_latency is None:
+            self.base_latency = self.latency
+        self.base_latency = min(self.latency, self.base_latency * (1 + BASE_LATENCY_DRIFT))
+        if self.latency > self.base_latency * LATENCY_TOLERANCE:
+            self._decrease(now, LATENCY_BACKOFF)
+        elif self.slow_start:
+            self.rate = min(self.max_rate, self.rate + 1)
+        else:
+            # About one response per 1/rate seconds, so this adds ADDITIVE_INCREASE per second
+            self.rate = min(self.max_rate, self.rate + ADDITIVE_INCREASE / self.rate)
+
+    def _decrease(self, now, factor):
+        if now - self.last_decrease < (self.latency or 1 / self.rate):
+            return
+        self.rate = max(self.min_rate, self.rate * factor)
+        self.slow_start = False
+        self.last_decrease = now
+
+    def status(self):
+        return {
+            "rate": round(self.rate, 2), "max_rate": round(self.max_rate, 2), "inflight": self.inflight,
+            "latency_ms": round(self.latency * 1000, 1) if self.latency is not None else None,
+            "blocked_for_s": round(max(0.0, self.blocked_until - time.monotonic()), 2),
+            "crawl_delay": self.crawl_delay, "requests": self.requests,
+            "throttled": self.throttled, "errors": self.errors,
+        }
+
+
+class Throttle:
+    """
+    Per-host throttles for a crawl, with robots.txt rules. Use from one event loop:
+
+        if await throttle.acquire(url):
+            ...fetch...
+            await throttle.release(url, latency, status, retry_after)
+    """
+
+    def __init__(self, user_agent=USER_AGENT, respect_robots=True, **host_options):
+        self.user_agent = user_agent
+        self.respect_robots = respect_robots
+        self.host_options = host_options
+        self.hosts = {}
+        self.robots = {}
+        self.disallowed = 0
+        self._locks = {}
+
+    def _load_robots(self, origin):
+        """(parser, crawl delay) for a site"""
+        parser = RobotFileParser(origin + "/robots.txt")
+        lines = []
+        request = urllib.request.Request(parser.url, headers={"User-Agent": self.user_agent})
+        try:
+            with urllib.request.urlopen(request, timeout=ROBOTS_TIMEOUT) as response:
+                lines = response.read().decode("utf-8", "replace").splitlines()
+            parser.parse(lines)
+        except HTTPError as e:
+            # Same reading as RobotFileParser.read(): auth errors forbid everything, other errors allow it
+            if e.code in (401, 403):
+                parser.disallow_all = True
+            else:
+                parser.allow_all = True
+        except (OSError, ValueError):
+            parser.allow_all = True
+        crawl_delay = parse_crawl_delay(lines, self.user_agent)
+        request_rate = parser.request_rate(self.user_agent)
+        if crawl_delay is None and request_rate:
+            crawl_delay = request_rate.seconds / request_rate.requests
+        return parser, crawl_delay
+
+    async def host(self, url):
+        """The throttle for a URL's host, reading robots.txt on first contact"""
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        if origin not in self.hosts:
+            async with self._locks.setdefault(origin, asyncio.Lock()):
+                if origin not in self.hosts:
+                    crawl_delay = None
+                    if self.respect_robots:
+                        self.robots[origin], crawl_delay = await asyncio.to_thread(self._load_robots, origin)
+                    self.hosts[origin] = HostThrottle(parts.netloc, crawl_delay, **self.host_options)
+        return self.hosts[origin]
+
+    async def acquire(self, url):
+        """Wait for the host's next slot; False when robots.txt disallows the URL"""
+        host = await self.host(url)
+        parts = urlsplit(url)
+        parser = self.robots.get(f"{parts.scheme}://{parts.netloc}")
+        if parser is not None and not parser.can_fetch(self.user_agent, url):
+            self.disallowed += 1
+            return False
+        await host.acquire()
+        return True
+
+    async def release(self, url, latency, status=None, retry_after=None):
+        await (await self.host(url)).release(latency, status, parse_retry_after(retry_after)
+                                             if isinstance(retry_after, str) else retry_after)
+
+    def status(self):
+        return {host.host: host.status() for host in self.hosts.values()}
+
+    def summary(self):
+        lines = [f"{host.host}: {host.rate:.1f} req/s, {host.throttled} throttled, {host.errors} errors"
+                 + (f", crawl-delay {host.crawl_delay:g}s" if host.crawl_delay else "")
+                 for host in self.hosts.values()]
+        if self.disallowed:
+            lines.append(f"{self.disallowed} URLs skipped by robots.txt")
+        return "\n".join(lines)
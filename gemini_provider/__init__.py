@@ -0,0 +1,10 @@
+"""Shared Gemini client used by blog_generator, chat_with_website and llm_chatbot"""
+from .provider import (
+    GeminiProvider, ProviderModel, CallRecord, get_provider, as_langchain_llm, is_retryable,
+)
+from .fake import FakeGeminiModel
+
+__all__ = [
+    "GeminiProvider", "ProviderModel", "CallRecord", "get_provider", "as_langchain_llm", "is_retryable",
+    "FakeGeminiModel",
+]
@@ -0,0 +1,79 @@
+import os
+import re
+import time
+import random
+from types import SimpleNamespace
+
+LATENCY = float(os.getenv("GEMINI_FAKE_LATENCY", "0.2"))
+TOKENS_PER_SEC = float(os.getenv("GEMINI_FAKE_TOKENS_PER_SEC", "200"))
+REPLY_TOKENS = int(os.getenv("GEMINI_FAKE_REPLY_TOKENS", "300"))
+CHUNK_TOKENS = 8
+
+WORDS = ["model", "latency", "cache", "prompt", "token", "stream", "batch", "index", "context", "quality",
+         "content", "reader", "search", "keyword", "draft", "outline", "section", "insight", "topic", "result"]
+
+
+def _text(contents):
+    if isinstance(contents, str):
+        return contents
+    return " ".join(_text(part) for part in contents) if isinstance(contents, (list, tuple)) else str(contents)
+
+
+class FakeGeminiModel:
+    """
+    Offline stand-in for `genai.GenerativeModel` (GEMINI_BACKEND=fake): deterministic text
+    per prompt after a fixed latency, produced at a fixed tokens/sec, with usage metadata.
+    Replies are a numbered list when the prompt asks for one, so title parsing works too.
+    """
+
+    def __init__(self, model_name, latency=LATENCY, tokens_per_sec=TOKENS_PER_SEC, reply_tokens=REPLY_TOKENS, **kwargs):
+        self.model_name = model_name
+        self.latency = latency
+        self.tokens_per_sec = tokens_per_sec
+        self.reply_tokens = reply_tokens
+
+    def _reply(self, prompt, generation_config):
+        limit = (generation_config or {}).get("max_output_tokens") or self.reply_tokens
+        rng = random.Random(prompt)
+        if re.search(r"\bnumbered\b", prompt, re.IGNORECASE):
+            lines = [f"{i}. The {rng.choice(WORDS)} guide to {rng.choice(WORDS)} and {rng.choice(WORDS)}" for i in range(1, 11)]
+            return "\n".join(lines).split(" ")[:limit]
+        return [rng.choice(WORDS) for _ in range(min(limit, self.reply_tokens))]
+
+    def _usage(self, prompt, tokens):
+        return SimpleNamespace(prompt_token_count=len(prompt) // 4, candidates_token_count=tokens)
+
+    def generate_content(self, contents, stream=False, generation_config=None, **kwargs):
+        prompt = _text(contents)
+        words = self._reply(prompt, generation_config)
+        time.sleep(self.latency)
+        if stream:
+            return FakeStream(words, self.tokens_per_sec, self._usage(prompt, len(words)))
+        time.sleep(len(words) / self.tokens_per_sec)
+        return SimpleNamespace(text=" ".join(words), usage_metadata=self._usage(prompt, len(words)))
+
+
+class FakeStream:
+    def __init__(self, words, tokens_per_sec, usage):
+        self.words = words
+        self.tokens_per_sec = tokens_per_sec
+        self.usage_metadata = None
+        self._usage = usage
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+    def __iter__(self):
+        for i in range(0, len(self.words), CHUNK_TOKENS):
+            if self.closed:
+                return
+            chunk = self.words[i:i + CHUNK_TOKENS]
+            time.sleep(len(chunk) / self.tokens_per_sec)
+            yield SimpleNamespace(text=" ".join(chunk) + " ")
+        # Like the SDK, usage is known once the stream is complete
+        self.usage_metadata = self._usage
+
+    @property
+    def text(self):
+        return " ".join(self.words)
@@ -0,0 +1,281 @@
+import os
+import time
+import random
+import logging
+import threading
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# "genai" uses the Google SDK; "fake" is the offline backend in fake.py
+BACKEND = os.getenv("GEMINI_BACKEND", "genai")
+TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "120"))
+# Named apart from the llm_chatbot scheduler's GEMINI_MAX_RETRIES, so the two never stack
+MAX_RETRIES = int(os.getenv("GEMINI_PROVIDER_MAX_RETRIES", "2"))
+# Point the SDK at another server, e.g. benchmarks/fake_llm_server.py (uses the REST transport)
+API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")
+RECORD_LIMIT = 1000
+
+# Gemini SDK / HTTP errors that are worth retrying
+RETRYABLE_CODES = {408, 429, 500, 502, 503, 504}
+RETRYABLE_ERRORS = {"ResourceExhausted", "ServiceUnavailable", "DeadlineExceeded", "InternalServerError",
+                    "TooManyRequests", "GatewayTimeout", "TimeoutError", "ConnectionError"}
+
+
+def percentile(values, pct):
+    """
+    The pct-th percentile, interpolated linearly between the closest ranks. Matches
+    chat_tracing.percentile, kept here so the provider has no dependency on the tracer.
+    """
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    lower = int(rank)
+    if rank == lower:
+        return ordered[lower]
+    return ordered[lower] + (ordered[lower + 1] - ordered[lower]) * (rank - lower)
+
+
+def is_retryable(error):
+    """True for rate-limit, overload and transient transport errors, from any SDK or HTTP client"""
+    for attr in ("code", "status_code", "status"):
+        value = getattr(error, attr, None)
+        if callable(value):
+            try:
+                value = value()
+            except Exception:
+                value = None
+        if isinstance(value, int) and value in RETRYABLE_CODES:
+            return True
+    return any(cls.__name__ in RETRYABLE_ERRORS for cls in type(error).__mro__)
+
+
+class CallRecord:
+    def __init__(self, model, stream):
+        self.model = model
+        self.stream = stream
+        self.started = time.time()
+        self.latency = None
+        self.first_chunk = None
+        self.prompt_tokens = None
+        self.output_tokens = None
+        self.attempts = 0
+        self.error = None
+
+    def set_usage(self, usage):
+        if usage is not None:
+            self.prompt_tokens = getattr(usage, "prompt_token_count", None)
+            self.output_tokens = getattr(usage, "candidates_token_count", None)
+
+
+class RecordedStream:
+    """Wraps a streaming response to record time to first chunk and totals; other attributes pass through"""
+
+    def __init__(self, response, record, start, provider):
+        self._response = response
+        self._record = record
+        self._start = start
+        self._provider = provider
+
+    def __iter__(self):
+        chunk = None
+        try:
+            for chunk in self._response:
+                if self._record.first_chunk is None:
+                    self._record.first_chunk = time.perf_counter() - self._start
+                yield chunk
+        except Exception as e:
+            self._record.error = type(e).__name__
+            raise
+        finally:
+            # Runs when the stream ends, fails or the caller stops iterating
+            self._record.latency = time.perf_counter() - self._start
+            self._record.set_usage(getattr(self._response, "usage_metadata", None) or getattr(chunk, "usage_metadata", None))
+            self._provider.record(self._record)
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+
+class ProviderModel:
+    """
+    Drop-in for `genai.GenerativeModel`: same `generate_content` call, plus a request
+    timeout, retries of transient errors with full-jitter backoff, and a CallRecord per call.
+    """
+
+    def __init__(self, provider, model, model_name, max_retries):
+        self.provider = provider
+        self.model = model
+        self.model_name = model_name
+        self.max_retries = max_retries
+
+    def generate_content(self, contents, stream=False, generation_config=None, **kwargs):
+        if self.provider.request_options:
+            kwargs.setdefault("request_options", self.provider.request_options)
+        record = CallRecord(self.model_name, stream)
+        start = time.perf_counter()
+        for attempt in range(self.max_retries + 1):
+            record.attempts = attempt + 1
+            try:
+                # Streaming requests fail here too, before the first chunk, so they are retried the same way
+                response = self.model.generate_content(contents, stream=stream, generation_config=generation_config,
+                                                       **kwargs)
+                break
+            except Exception as e:
+                if attempt == self.max_retries or not is_retryable(e):
+                    record.error = type(e).__name__
+                    record.latency = time.perf_counter() - start
+                    self.provider.record(record)
+                    raise
+                delay = random.uniform(0, min(30.0, 2.0 * 2 ** attempt))
+                logger.info(f"{self.model_name}: {type(e).__name__}, retrying in {delay:.1f}s")
+                time.sleep(delay)
+        if stream:
+            return RecordedStream(response, record, start, self.provider)
+        record.latency = time.perf_counter() - start
+        record.set_usage(getattr(response, "usage_metadata", None))
+        self.provider.record(record)
+        return response
+
+
+class GeminiProvider:
+    """
+    One Gemini client per process. The SDK is configured once per API key (configuring
+    it again drops its cached clients and their connections), model objects are cached
+    and reused, and every call goes through a ProviderModel. `model_factory(name, **kwargs)`
+    replaces the backend, e.g. with a client for the benchmarks' fake server.
+    """
+
+    def __init__(self, backend=BACKEND, timeout=TIMEOUT, max_retries=MAX_RETRIES, api_endpoint=API_ENDPOINT,
+                 model_factory=None):
+        self.backend = backend
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.api_endpoint = api_endpoint
+        self.model_factory = model_factory
+        self.api_key = None
+        self.models = {}
+        self.records = deque(maxlen=RECORD_LIMIT)
+        self.lock = threading.Lock()
+
+    @property
+    def request_options(self):
+        # Only the real SDK understands request_options
+        if self.model_factory is None and self.backend == "genai" and self.timeout:
+            return {"timeout": self.timeout}
+        return None
+
+    def configure(self, api_key):
+        """Set the API key; a no-op when it hasn't changed, so callers can pass it on every request"""
+        with self.lock:
+            if api_key == self.api_key:
+                return
+            if self.model_factory is None and self.backend == "genai":
+                import google.generativeai as genai
+
+                if self.api_endpoint:
+                    genai.configure(api_key=api_key, transport="rest", client_options={"api_endpoint": self.api_endpoint})
+                else:
+                    genai.configure(api_key=api_key)
+            self.api_key = api_key
+            self.models.clear()
+
+    def _create(self, name, **kwargs):
+        if self.model_factory is not None:
+            return self.model_factory(name, **kwargs)
+        if self.backend == "fake":
+            from .fake import FakeGeminiModel
+
+            return FakeGeminiModel(name, **kwargs)
+        import google.generativeai as genai
+
+        return genai.GenerativeModel(name, **kwargs)
+
+    def model(self, name, max_retries=None, **kwargs):
+        """
+        Cached model for `name` and constructor kwargs (generation_config, system_instruction, ...).
+        Callers with their own retry policy pass max_retries=0.
+        """
+        retries = self.max_retries if max_retries is None else max_retries
+        key = (name, retries, repr(sorted(kwargs.items())))
+        with self.lock:
+            if key not in self.models:
+                self.models[key] = ProviderModel(self, self._create(name, **kwargs), name, retries)
+            return self.models[key]
+
+    def record(self, record):
+        with self.lock:
+            self.records.append(record)
+        logger.debug(f"{record.model}: {record.latency:.3f}s, {record.attempts} attempt(s), "
+                     f"{record.prompt_tokens} prompt / {record.output_tokens} output tokens, error={record.error}")
+
+    def stats(self):
+        """Per-model call counts, errors, latency percentiles and token totals over the recent calls"""
+        with self.lock:
+            records = list(self.records)
+        stats = {}
+        for name in sorted({r.model for r in records}):
+            calls = [r for r in records if r.model == name]
+            latencies = [r.latency for r in calls]
+            first_chunks = [r.first_chunk for r in calls if r.first_chunk is not None]
+            stats[name] = {
+                "calls": len(calls),
+                "errors": sum(r.error is not None for r in calls),
+                "retries": sum(r.attempts - 1 for r in calls),
+                "latency_p50_ms": round(percentile(latencies, 50) * 1000, 1),
+                "latency_p95_ms": round(percentile(latencies, 95) * 1000, 1),
+                "first_chunk_mean_ms": round(sum(first_chunks) / len(first_chunks) * 1000, 1) if first_chunks else None,
+                "prompt_tokens": sum(r.prompt_tokens or 0 for r in calls),
+                "output_tokens": sum(r.output_tokens or 0 for r in calls),
+            }
+        return stats
+
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_provider(api_key=None):
+    """The process-wide provider, so every window, worker and chat shares models and connections"""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = GeminiProvider()
+    if api_key:
+        _provider.configure(api_key)
+    return _provider
+
+
+def as_langchain_llm(model):
+    """Wrap a ProviderModel as a LangChain LLM, for chains such as ConversationChain"""
+    from langchain_core.language_models.llms import LLM
+    from langchain_core.outputs import Generation, LLMResult
+
+    class ProviderLLM(LLM):
+        @property
+        def _llm_type(self):
+            return "gemini-provider"
+
+        def _call(self, prompt, stop=None, run_manager=None, **kwargs):
+            generation_config = {"stop_sequences": stop} if stop else None
+            return model.generate_content(prompt, generation_config=generation_config).text
+
+        def _generate(self, prompts, stop=None, run_manager=None, **kwargs):
+            # Streamed, so callbacks see the first token arrive; usage is known once the stream ends
+            generation_config = {"stop_sequences": stop} if stop else None
+            generations = []
+            for prompt in prompts:
+                response = model.generate_content(prompt, stream=True, generation_config=generation_config)
+                parts = []
+                chunk = None
+                for chunk in response:
+                    parts.append(chunk.text)
+                    if run_manager:
+                        run_manager.on_llm_new_token(chunk.text)
+                usage = getattr(response, "usage_metadata", None) or getattr(chunk, "usage_metadata", None)
+                generations.append([Generation(text="".join(parts), generation_info={
+                    "prompt_tokens": getattr(usage, "prompt_token_count", None),
+                    "completion_tokens": getattr(usage, "candidates_token_count", None),
+                })])
+            return LLMResult(generations=generations)
+
+    return ProviderLLM()
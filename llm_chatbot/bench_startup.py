@@ -0,0 +1,123 @@
+"""
+Startup benchmark for the chatbot.
+
+Reports a `python -X importtime` breakdown for `import main` and the wall-clock
+time from process spawn to the first served HTTP request and first chat reply.
+The served app uses fake_llm.FakeLLM, so no API key or network access is needed.
+
+    uv run bench_startup.py [--json results.json]
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import subprocess
+import urllib.request
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def import_time_breakdown(module="main", top=15):
+    """Run `python -X importtime -c 'import <module>'` and aggregate cumulative time per top-level package"""
+    env = dict(os.environ, GOOGLE_API_KEY="")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=HERE, env=env, capture_output=True, text=True,
+    )
+    packages = {}
+    total_us = 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        # Only count outermost imports so nested modules aren't counted twice
+        if len(name) - len(name.lstrip()) > 1:
+            continue
+        package = name.strip().split(".")[0]
+        packages[package] = packages.get(package, 0) + int(cumulative_us)
+        total_us += int(cumulative_us)
+    ranked = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    return {
+        "module": module,
+        "returncode": proc.returncode,
+        "total_ms": round(total_us / 1000, 2),
+        "top_packages_ms": {name: round(us / 1000, 2) for name, us in ranked},
+    }
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def serve(port):
+    """Child process: build the app with a fake LLM and serve it"""
+    sys.path.insert(0, HERE)
+    from fake_llm import FakeLLM
+    from main import GeminiChatbot, create_app
+
+    chatbot = GeminiChatbot(conversation=FakeLLM(latency=0))
+    demo = create_app(chatbot, warm_up=False)
+    demo.launch(server_name="127.0.0.1", server_port=port, prevent_thread_lock=True, share=False)
+    # Report the first chat reply once the server is listening
+    chatbot.get_response("hello", [])
+    print("FIRST_REPLY", flush=True)
+    while True:
+        time.sleep(1)
+
+
+def time_to_first_request(timeout=120):
+    port = free_port()
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, __file__, "--serve", str(port)],
+        cwd=HERE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+        # The first reply is traced like any turn; don't leave a trace file behind
+        env={**os.environ, "CHAT_TRACE_FILE": ""},
+    )
+    result = {"first_request_s": None, "first_reply_s": None}
+    try:
+        while time.perf_counter() - start < timeout:
+            if proc.poll() is not None:
+                result["error"] = f"server exited with code {proc.returncode}"
+                break
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1) as response:
+                    if response.status == 200:
+                        result["first_request_s"] = round(time.perf_counter() - start, 3)
+                        break
+            except OSError:
+                time.sleep(0.05)
+        if result["first_request_s"] is not None:
+            for line in proc.stdout:
+                if line.strip() == "FIRST_REPLY":
+                    result["first_reply_s"] = round(time.perf_counter() - start, 3)
+                    break
+    finally:
+        proc.kill()
+        proc.wait()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve)
+        return
+
+    results = {"import": import_time_breakdown(), "startup": time_to_first_request()}
+    print(json.dumps(results, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import time
+import random
+import threading
+
+
+class FakeUpstreamError(Exception):
+    """Mimics a Gemini API error carrying an HTTP status code (429, 503, ...)."""
+
+    def __init__(self, code, message=None):
+        super().__init__(message or f"Fake upstream error {code}")
+        self.code = code
+
+
+class FakeLLM:
+    """
+    Offline stand-in for the Gemini conversation chain. It exposes the same
+    `predict(input=...)` call as ConversationChain and can inject latency and
+    rate-limit/overload errors so the scheduler can be exercised without an API key.
+    """
+
+    def __init__(self, latency=0.05, jitter=0.0, error_rate=0.0, error_codes=(429, 503),
+                 errors=None, reply="This is a fake response to: {input}", seed=None):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_codes = tuple(error_codes)
+        # A fixed sequence of status codes (None = success) consumed before random errors apply
+        self.errors = list(errors or [])
+        self.reply = reply
+        self.random = random.Random(seed)
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def predict(self, input, callbacks=None):
+        with self.lock:
+            self.calls += 1
+            forced = self.errors.pop(0) if self.errors else None
+            delay = self.latency + self.random.uniform(0, self.jitter)
+            fail = forced is not None or self.random.random() < self.error_rate
+            code = forced if forced is not None else self.random.choice(self.error_codes)
+        time.sleep(delay)
+        if fail:
+            raise FakeUpstreamError(code)
+        return self.reply.format(input=input)
+
+    invoke = predict
+
+
+if __name__ == "__main__":
+    # Fire a burst through the scheduler and print what happened.
+    from concurrent.futures import wait
+    from scheduler import UpstreamScheduler, SchedulerConfig
+
+    llm = FakeLLM(latency=0.02, error_rate=0.3, seed=42)
+    scheduler = UpstreamScheduler(SchedulerConfig(
+        requests_per_minute=600, max_retries=5, base_delay=0.05, max_delay=0.5,
+        breaker_failure_threshold=20, workers=4,
+    ))
+    start = time.monotonic()
+    futures = [scheduler.submit(llm.predict, input=f"message {i}") for i in range(50)]
+    wait(futures)
+    elapsed = time.monotonic() - start
+    failed = sum(1 for f in futures if f.exception() is not None)
+    print(f"50 calls in {elapsed:.2f}s, {failed} failed, {llm.calls} upstream attempts")
+    print(scheduler.stats)
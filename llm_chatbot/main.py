@@ -1,37 +1,78 @@
 import os
-import gradio as gr
-import google.generativeai as genai
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain.chains import ConversationChain
-from langchain.memory import ConversationBufferMemory
-from langchain.prompts import PromptTemplate
-from dotenv import load_dotenv
+import sys
+import uuid
 import logging
+import threading
+from scheduler import UpstreamScheduler, CircuitOpenError, SchedulerOverloadedError, estimate_tokens
+
+# gradio, langchain and the Google SDKs are imported lazily inside the functions
+# that need them so importing this module stays fast and needs no API key.
+
+# The shared Gemini client lives at the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from chat_tracing import Tracer, callback_handler
 
-# Set up logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Load environment variables
-load_dotenv()
+def setup_logging():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
-# Configure API key
-try:
-    GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
-    if not GOOGLE_API_KEY:
-        raise ValueError("Missing GOOGLE_API_KEY environment variable")
-    genai.configure(api_key=GOOGLE_API_KEY)
-except Exception as e:
-    logger.error(f"API Configuration Error: {e}")
-    raise
+def load_api_key():
+    """Load environment variables and return the Gemini API key"""
+    from dotenv import load_dotenv
+    
+    # Load environment variables
+    load_dotenv()
+    
+    # Configure API key
+    try:
+        api_key = os.getenv("GOOGLE_API_KEY")
+        if not api_key and os.getenv("GEMINI_BACKEND") == "fake":
+            # The provider's offline backend accepts any key
+            return "fake"
+        if not api_key:
+            raise ValueError("Missing GOOGLE_API_KEY environment variable")
+        return api_key
+    except Exception as e:
+        logger.error(f"API Configuration Error: {e}")
+        raise
 
 class GeminiChatbot:
-    def __init__(self):
+    def __init__(self, conversation=None, scheduler=None, api_key=None, tracer=None):
         self.conversation_history = []
-        self.setup_model()
+        self.api_key = api_key
+        # Every upstream call goes through the scheduler (rate limits, retries, circuit breaker)
+        self.scheduler = scheduler or UpstreamScheduler()
+        # Each turn is traced stage by stage to CHAT_TRACE_FILE; see chat_tracing
+        self.tracer = tracer or Tracer.from_env("llm_chatbot")
+        self.session_id = uuid.uuid4().hex
+        # Allows an offline stand-in such as fake_llm.FakeLLM; otherwise built on first use
+        self._conversation = conversation
+        self._setup_lock = threading.Lock()
+    
+    @property
+    def conversation(self):
+        if self._conversation is None:
+            with self._setup_lock:
+                if self._conversation is None:
+                    self.setup_model()
+        return self._conversation
+    
+    def warm_up(self):
+        """Build the model in a background thread so the first message doesn't pay for it"""
+        thread = threading.Thread(target=lambda: self.conversation, name="model-warm-up", daemon=True)
+        thread.start()
+        return thread
         
     def setup_model(self):
         try:
+            from gemini_provider import get_provider, as_langchain_llm
+            from langchain.chains import ConversationChain
+            from langchain.memory import ConversationBufferMemory
+            from langchain.prompts import PromptTemplate
+            
+            api_key = self.api_key or load_api_key()
+            
             # Template for our chat prompt
             template = """
             You are a helpful, respectful and honest assistant. Always answer as helpfully as possible, while being safe.
@@ -52,17 +93,16 @@ class GeminiChatbot:
             # Set up memory for conversation history
             memory = ConversationBufferMemory(return_messages=True)
             
-            # Initialize the Gemini model
-            llm = ChatGoogleGenerativeAI(
-                model="gemini-2.0-flash",
-                temperature=0.7,
-                top_p=0.95,
-                google_api_key=GOOGLE_API_KEY,
-                convert_system_message_to_human=True
+            # Initialize the Gemini model through the shared provider; the scheduler owns retries
+            model = get_provider(api_key).model(
+                "gemini-2.0-flash",
+                max_retries=0,
+                generation_config={"temperature": 0.7, "top_p": 0.95}
             )
+            llm = as_langchain_llm(model)
             
             # Create conversation chain
-            self.conversation = ConversationChain(
+            self._conversation = ConversationChain(
                 llm=llm,
                 memory=memory,
                 prompt=prompt,
@@ -75,27 +115,47 @@ class GeminiChatbot:
             logger.error(f"Model Setup Error: {e}")
             raise
     
+    def _predict(self, user_message, turn):
+        # One attempt; the scheduler calls this again after a retryable error
+        handler = callback_handler(turn)
+        attempts = turn.root.attributes.get("attempts", 0) + 1
+        turn.set(attempts=attempts)
+        if attempts == 1:
+            # Time spent waiting for the scheduler's rate limits and workers
+            turn.add("queue", turn.start, handler.called)
+        try:
+            return self.conversation.predict(input=user_message, callbacks=[handler])
+        finally:
+            handler.close()
+    
     def get_response(self, user_message, history):
         try:
             if not user_message.strip():
                 return "Please enter a message to continue the conversation."
             
-            # Get response from the model
-            response = self.conversation.predict(input=user_message)
+            with self.tracer.turn(self.session_id) as turn:
+                # Budget the prompt plus the conversation memory against tokens/min
+                memory = getattr(self.conversation, "memory", None)
+                tokens = estimate_tokens(user_message) + estimate_tokens(getattr(memory, "buffer_as_str", ""))
+                
+                # Get response from the model through the upstream scheduler
+                response = self.scheduler.call(self._predict, user_message, turn, tokens=tokens)
             
             # Update history
             history.append((user_message, response))
             
             return response
+        except (CircuitOpenError, SchedulerOverloadedError) as e:
+            logger.warning(f"Upstream unavailable: {e}")
+            return "The assistant is receiving too many requests right now. Please wait a few seconds and try again."
         except Exception as e:
             logger.error(f"Response Generation Error: {e}")
             return f"I'm having trouble processing your request. Please try again later. (Error: {type(e).__name__})"
 
-# Initialize the chatbot
-chatbot = GeminiChatbot()
-
 # Create Gradio interface
-def launch_interface():
+def launch_interface(chatbot):
+    import gradio as gr
+    
     with gr.Blocks(theme=gr.themes.Soft(primary_hue="blue")) as demo:
         gr.Markdown("""
         # 🤖 Gemini AI Chatbot
@@ -149,9 +209,19 @@ def launch_interface():
         
     return demo
 
+def create_app(chatbot=None, warm_up=True):
+    """App factory: build the chatbot and Gradio interface without touching the network"""
+    if chatbot is None:
+        chatbot = GeminiChatbot(api_key=load_api_key())
+    demo = launch_interface(chatbot)
+    if warm_up:
+        chatbot.warm_up()
+    return demo
+
 if __name__ == "__main__":
+    setup_logging()
     try:
-        demo = launch_interface()
+        demo = create_app()
         demo.launch(share=True)
     except Exception as e:
         logger.critical(f"Application Error: {e}")
\ No newline at end of file
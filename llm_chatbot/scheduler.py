@@ -0,0 +1,293 @@
+import os
+import sys
+import time
+import heapq
+import random
+import itertools
+import threading
+import logging
+from concurrent.futures import Future
+from dataclasses import dataclass
+
+# Retry classification is shared with the other apps through the provider at the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from gemini_provider import is_retryable
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 5
+PRIORITY_LOW = 10
+
+
+class CircuitOpenError(Exception):
+    """Raised when the circuit breaker rejects a call without sending it upstream."""
+
+
+class SchedulerOverloadedError(Exception):
+    """Raised when a queued call could not be started before its deadline."""
+
+
+def estimate_tokens(text):
+    """Rough token estimate (~4 characters per token) used for the tokens/min budget."""
+    if not text:
+        return 0
+    return len(text) // 4 + 1
+
+
+@dataclass
+class SchedulerConfig:
+    requests_per_minute: float = 15.0
+    tokens_per_minute: float = 1_000_000.0
+    max_retries: int = 4
+    base_delay: float = 1.0
+    max_delay: float = 30.0
+    breaker_failure_threshold: int = 5
+    breaker_reset_timeout: float = 30.0
+    workers: int = 2
+    queue_timeout: float = 120.0
+
+    @classmethod
+    def from_env(cls, prefix="GEMINI_"):
+        """Build a config from environment variables, e.g. GEMINI_REQUESTS_PER_MINUTE=60."""
+        config = cls()
+        for name in cls.__dataclass_fields__:
+            raw = os.getenv(f"{prefix}{name.upper()}")
+            if raw:
+                setattr(config, name, type(getattr(config, name))(raw))
+        return config
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `rate_per_minute`."""
+
+    def __init__(self, rate_per_minute, capacity=None, clock=time.monotonic):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self.clock = clock
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, amount=1):
+        """Take `amount` tokens if available; otherwise return the seconds to wait."""
+        # Requests larger than the bucket would never fit, so cap them at a full bucket.
+        amount = min(amount, self.capacity)
+        with self.lock:
+            self._refill()
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return 0.0
+            return (amount - self.tokens) / self.rate
+
+    def release(self, amount=1):
+        """Give back tokens taken by try_acquire() that went unused."""
+        with self.lock:
+            self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures, then lets a single probe through after a cooldown."""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.lock = threading.Lock()
+
+    def is_open(self):
+        """True while the breaker is open and still cooling down."""
+        with self.lock:
+            return self.state == self.OPEN and self.clock() - self.opened_at < self.reset_timeout
+
+    def allow(self):
+        with self.lock:
+            if self.state == self.OPEN:
+                if self.clock() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self.probe_in_flight = False
+            if self.state == self.HALF_OPEN:
+                if self.probe_in_flight:
+                    return False
+                self.probe_in_flight = True
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.probe_in_flight = False
+
+    def release_probe(self):
+        """Hand back a half-open probe whose call ended without telling us anything about the upstream."""
+        with self.lock:
+            self.probe_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.probe_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"Circuit breaker opened after {self.failures} failures")
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+
+
+class UpstreamScheduler:
+    """
+    Serializes upstream LLM calls through request/token rate limits, a priority
+    queue, jittered exponential retries and a circuit breaker. A retry goes back on
+    the queue once its backoff has passed, so a worker never sits out a backoff
+    while other calls are waiting. `wait(condition, timeout)` is how an idle worker
+    waits for that, or for a new call (timeout None).
+    """
+
+    def __init__(self, config=None, clock=time.monotonic, sleep=time.sleep, wait=threading.Condition.wait):
+        self.config = config or SchedulerConfig.from_env()
+        self.clock = clock
+        self.sleep = sleep
+        self.wait = wait
+        self.request_bucket = TokenBucket(self.config.requests_per_minute, clock=clock)
+        self.token_bucket = TokenBucket(self.config.tokens_per_minute, clock=clock)
+        self.breaker = CircuitBreaker(
+            self.config.breaker_failure_threshold,
+            self.config.breaker_reset_timeout,
+            clock=clock,
+        )
+        self.queue = []
+        self.delayed = []  # (ready_at, item) for retries still backing off
+        self.counter = itertools.count()
+        self.condition = threading.Condition()
+        self.stats = {"submitted": 0, "succeeded": 0, "failed": 0, "retries": 0, "rejected": 0}
+        self.stats_lock = threading.Lock()
+        self.running = True
+        self.workers = [
+            threading.Thread(target=self._worker, name=f"upstream-scheduler-{i}", daemon=True)
+            for i in range(max(1, self.config.workers))
+        ]
+        for worker in self.workers:
+            worker.start()
+
+    def _count(self, name):
+        with self.stats_lock:
+            self.stats[name] += 1
+
+    def submit(self, fn, *args, priority=PRIORITY_NORMAL, tokens=0, **kwargs):
+        """Queue `fn(*args, **kwargs)` and return a Future for its result."""
+        future = Future()
+        if self.breaker.is_open():
+            self._count("rejected")
+            future.set_exception(CircuitOpenError("Upstream circuit is open; try again shortly"))
+            return future
+        deadline = self.clock() + self.config.queue_timeout
+        with self.condition:
+            heapq.heappush(self.queue, (priority, next(self.counter), deadline, tokens, 0, fn, args, kwargs, future))
+            self.condition.notify()
+        self._count("submitted")
+        return future
+
+    def call(self, fn, *args, priority=PRIORITY_NORMAL, tokens=0, **kwargs):
+        """Blocking wrapper around submit()."""
+        return self.submit(fn, *args, priority=priority, tokens=tokens, **kwargs).result()
+
+    def shutdown(self):
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+
+    def _next_item(self):
+        with self.condition:
+            while self.running:
+                now = self.clock()
+                while self.delayed and self.delayed[0][0] <= now:
+                    heapq.heappush(self.queue, heapq.heappop(self.delayed)[1])
+                if self.queue:
+                    return heapq.heappop(self.queue)
+                self.wait(self.condition, self.delayed[0][0] - now if self.delayed else None)
+            return None
+
+    def _retry_later(self, item, delay):
+        # The retry keeps its priority and place in line, but only becomes runnable after `delay`
+        priority, seq, deadline, tokens, attempt, fn, args, kwargs, future = item
+        with self.condition:
+            heapq.heappush(self.delayed, (self.clock() + delay, (priority, seq, deadline, tokens, attempt + 1,
+                                                                 fn, args, kwargs, future)))
+            self.condition.notify()
+
+    def _wait_for_capacity(self, tokens, deadline):
+        while True:
+            if self.clock() > deadline:
+                raise SchedulerOverloadedError("Timed out waiting for upstream capacity")
+            wait = self.request_bucket.try_acquire(1)
+            if wait == 0:
+                wait = self.token_bucket.try_acquire(tokens) if tokens else 0.0
+                if wait == 0:
+                    return
+                # Give back the request slot while we wait on the token budget.
+                self.request_bucket.release(1)
+            self.sleep(min(wait, max(0.0, deadline - self.clock())) or 0.01)
+
+    def _backoff(self, attempt):
+        # "Full jitter" exponential backoff keeps retrying clients from synchronizing.
+        return random.uniform(0, min(self.config.max_delay, self.config.base_delay * (2 ** attempt)))
+
+    def _execute(self, deadline, tokens, fn, args, kwargs):
+        """One attempt at the call; retryable errors are left to the caller to reschedule."""
+        # Wait for capacity first: a half-open breaker hands out its single probe in allow(),
+        # and a probe given out to a call that then times out in the queue would never be returned.
+        self._wait_for_capacity(tokens, deadline)
+        if not self.breaker.allow():
+            raise CircuitOpenError("Upstream circuit is open; try again shortly")
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            if is_retryable(e):
+                self.breaker.record_failure()
+            else:
+                # A bad request says nothing about the upstream's health either way
+                self.breaker.release_probe()
+            raise
+        self.breaker.record_success()
+        return result
+
+    def _worker(self):
+        while True:
+            item = self._next_item()
+            if item is None:
+                return
+            _, _, deadline, tokens, attempt, fn, args, kwargs, future = item
+            # A rescheduled retry is already running
+            if attempt == 0 and not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = self._execute(deadline, tokens, fn, args, kwargs)
+            except Exception as e:
+                remaining = deadline - self.clock()
+                if is_retryable(e) and attempt < self.config.max_retries and remaining > 0:
+                    # Never back off past the call's deadline
+                    delay = min(self._backoff(attempt), remaining)
+                    self._count("retries")
+                    logger.warning(f"Retryable upstream error ({type(e).__name__}); "
+                                   f"retry {attempt + 1} in {delay:.2f}s")
+                    self._retry_later(item, delay)
+                    continue
+                self._count("failed")
+                future.set_exception(e)
+            else:
+                self._count("succeeded")
+                future.set_result(result)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The app imports its modules as top-level siblings (`from scheduler import ...`)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
@@ -0,0 +1,202 @@
+import threading
+
+import pytest
+
+from scheduler import (
+    CircuitBreaker, CircuitOpenError, SchedulerConfig, SchedulerOverloadedError, TokenBucket, UpstreamScheduler,
+)
+
+
+class FakeClock:
+    """A clock that only moves when something sleeps on it"""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        with self.lock:
+            return self.now
+
+    def sleep(self, seconds):
+        with self.lock:
+            self.sleeps.append(seconds)
+            self.now += seconds
+
+    def wait(self, condition, timeout):
+        # Nothing is backing off, so only a new call can wake the worker
+        if timeout is None:
+            condition.wait()
+        else:
+            self.sleep(timeout)
+
+    def advance(self, seconds):
+        with self.lock:
+            self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def make_scheduler(clock, **config):
+    config.setdefault("workers", 1)
+    return UpstreamScheduler(SchedulerConfig(**config), clock=clock, sleep=clock.sleep, wait=clock.wait)
+
+
+def fail(error):
+    def call():
+        raise error
+    return call
+
+
+def test_token_bucket_waits_for_refill(clock):
+    bucket = TokenBucket(60, clock=clock)
+    assert bucket.try_acquire(60) == 0.0
+    assert bucket.try_acquire(1) == pytest.approx(1.0)
+    clock.advance(1)
+    assert bucket.try_acquire(1) == 0.0
+
+
+def test_token_bucket_release_never_overfills(clock):
+    bucket = TokenBucket(60, clock=clock)
+    bucket.release(5)
+    assert bucket.tokens == 60
+
+
+def test_breaker_opens_after_threshold_and_lets_one_probe_through(clock):
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+    clock.advance(10)
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow()  # only one probe at a time
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
+
+
+def test_failed_probe_reopens_breaker(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+    breaker.record_failure()
+    clock.advance(10)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+
+def test_retries_transient_errors_then_succeeds(clock):
+    scheduler = make_scheduler(clock, requests_per_minute=600)
+    outcomes = [TimeoutError(), ConnectionError(), "ok"]
+
+    def flaky():
+        outcome = outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return outcome
+
+    assert scheduler.call(flaky) == "ok"
+    assert scheduler.stats["retries"] == 2
+    assert scheduler.stats["succeeded"] == 1
+    scheduler.shutdown()
+
+
+def test_non_retryable_error_is_not_retried_and_keeps_breaker_closed(clock):
+    scheduler = make_scheduler(clock, requests_per_minute=600, breaker_failure_threshold=1)
+    with pytest.raises(ValueError):
+        scheduler.call(fail(ValueError("bad request")))
+    assert scheduler.stats["retries"] == 0
+    assert scheduler.breaker.state == CircuitBreaker.CLOSED
+    scheduler.shutdown()
+
+
+def test_non_retryable_error_hands_back_the_probe_without_closing_the_breaker(clock):
+    scheduler = make_scheduler(clock, requests_per_minute=600, breaker_failure_threshold=1, breaker_reset_timeout=10,
+                               max_retries=0)
+    with pytest.raises(TimeoutError):
+        scheduler.call(fail(TimeoutError()))
+    clock.advance(10)
+    with pytest.raises(ValueError):
+        scheduler.call(fail(ValueError("bad request")))
+    assert scheduler.breaker.state == CircuitBreaker.HALF_OPEN
+    assert scheduler.call(lambda: "probe") == "probe"
+    assert scheduler.breaker.state == CircuitBreaker.CLOSED
+    scheduler.shutdown()
+
+
+def test_backoff_does_not_hold_up_other_calls(clock):
+    scheduler = make_scheduler(clock, requests_per_minute=600, breaker_failure_threshold=100)
+    scheduler._backoff = lambda attempt: 5.0
+    gate = threading.Event()
+    calls = []
+
+    def flaky():
+        calls.append("flaky")
+        if calls.count("flaky") == 1:
+            raise TimeoutError()
+        return "flaky"
+
+    # Hold the only worker until both calls are queued
+    scheduler.submit(gate.wait)
+    first = scheduler.submit(flaky)
+    second = scheduler.submit(lambda: calls.append("other") or "other")
+    gate.set()
+    assert first.result() == "flaky"
+    assert second.result() == "other"
+    assert calls == ["flaky", "other", "flaky"]
+    assert scheduler.stats["retries"] == 1
+    scheduler.shutdown()
+
+
+def test_open_breaker_rejects_without_calling_upstream(clock):
+    scheduler = make_scheduler(clock, requests_per_minute=600, breaker_failure_threshold=1, max_retries=0)
+    with pytest.raises(TimeoutError):
+        scheduler.call(fail(TimeoutError()))
+    calls = []
+    with pytest.raises(CircuitOpenError):
+        scheduler.call(calls.append, 1)
+    assert calls == []
+    assert scheduler.stats["rejected"] == 1
+    scheduler.shutdown()
+
+
+def test_probe_is_not_lost_when_waiting_for_capacity_times_out(clock):
+    # One request per minute, so a call right after the breaker cools down has to wait for capacity
+    scheduler = make_scheduler(clock, requests_per_minute=1, breaker_failure_threshold=1, breaker_reset_timeout=10,
+                               max_retries=0, queue_timeout=5)
+    with pytest.raises(TimeoutError):
+        scheduler.call(fail(TimeoutError()))
+    clock.advance(11)
+    with pytest.raises(SchedulerOverloadedError):
+        scheduler.call(lambda: "never sent")
+    clock.advance(60)
+    assert scheduler.call(lambda: "probe") == "probe"
+    assert scheduler.breaker.state == CircuitBreaker.CLOSED
+    scheduler.shutdown()
+
+
+def test_retry_backoff_never_sleeps_past_the_deadline(clock):
+    scheduler = make_scheduler(clock, requests_per_minute=600, base_delay=100, max_delay=100, max_retries=10,
+                               queue_timeout=3, breaker_failure_threshold=100)
+    start = clock()
+    with pytest.raises(TimeoutError):
+        scheduler.call(fail(TimeoutError()))
+    assert clock() - start <= 3 + 1e-9
+    scheduler.shutdown()
+
+
+def test_stats_are_consistent_across_workers(clock):
+    scheduler = make_scheduler(clock, requests_per_minute=100_000, workers=4)
+    futures = [scheduler.submit(lambda i=i: i) for i in range(200)]
+    assert sorted(future.result() for future in futures) == list(range(200))
+    assert scheduler.stats["submitted"] == 200
+    assert scheduler.stats["succeeded"] == 200
+    scheduler.shutdown()
@@ -0,0 +1,146 @@
+"""
+Load test for the request scheduler against the local fake Ollama server.
+
+Simulates N concurrent chat users, each sending several streaming /api/chat
+requests, with and without FairScheduler in front of the server. The fake
+server is limited to --num-parallel concurrent generations, like a CPU-bound
+Ollama with OLLAMA_NUM_PARALLEL set. Reports TTFT and end-to-end p50/p99 latency
+over all requests, with requests rejected by admission control counted as failures
+("failed" when a percentile lands on one), the same percentiles over the served
+requests only, and goodput: requests served within --slo seconds, per second.
+Compare the two modes at a load where nothing is rejected before reading anything
+into tail latency; with rejections, goodput is the fair comparison.
+
+    python bench_load.py --users 1,10,50 --json load.json
+"""
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import threading
+import http.client
+from urllib.parse import urlparse
+from scheduler import FairScheduler, QueueFullError, QueueTimeoutError
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "benchmarks"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from fake_llm_server import FakeLLMServer, FakeLLMConfig  # noqa: E402
+from chat_tracing import percentile  # noqa: E402
+
+
+def stream_chat(url, message, start):
+    """One streaming /api/chat request; returns the time to first token measured from `start`"""
+    parsed = urlparse(url)
+    connection = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=600)
+    body = json.dumps({"model": "gemma3:1b", "messages": [{"role": "user", "content": message}], "stream": True})
+    ttft = None
+    try:
+        connection.request("POST", "/api/chat", body, {"Content-Type": "application/json"})
+        response = connection.getresponse()
+        for line in response:
+            if ttft is None:
+                ttft = time.perf_counter() - start
+            if json.loads(line).get("done"):
+                break
+        # Drain the chunked terminator so the server sees a clean close
+        response.read()
+    finally:
+        connection.close()
+    return ttft
+
+
+def run_users(url, users, requests_per_user, scheduler, slo):
+    ttfts, totals, rejected = [], [], []
+    lock = threading.Lock()
+
+    def user(index):
+        for n in range(requests_per_user):
+            # Latency is measured as the user sees it, including time spent queued
+            start = time.perf_counter()
+            try:
+                if scheduler is None:
+                    ttft = stream_chat(url, f"user {index} message {n}", start)
+                else:
+                    with scheduler.slot(f"user-{index}"):
+                        ttft = stream_chat(url, f"user {index} message {n}", start)
+            except (QueueFullError, QueueTimeoutError):
+                with lock:
+                    rejected.append(index)
+                continue
+            total = time.perf_counter() - start
+            with lock:
+                ttfts.append(ttft)
+                totals.append(total)
+
+    threads = [threading.Thread(target=user, args=(i,)) for i in range(users)]
+    wall_start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - wall_start
+
+    def summary(values, pct, failures):
+        # A rejected request never got an answer: it sorts after every served one
+        value = percentile(values + [math.inf] * failures, pct)
+        return None if value is None or value == math.inf else round(value, 3)
+
+    return {
+        "users": users,
+        "requests": users * requests_per_user,
+        "completed": len(totals),
+        "rejected": len(rejected),
+        "ttft_p50_s": summary(ttfts, 50, len(rejected)),
+        "ttft_p99_s": summary(ttfts, 99, len(rejected)),
+        "latency_p50_s": summary(totals, 50, len(rejected)),
+        "latency_p99_s": summary(totals, 99, len(rejected)),
+        "served_ttft_p99_s": summary(ttfts, 99, 0),
+        "served_latency_p99_s": summary(totals, 99, 0),
+        "requests_per_sec": round(len(totals) / wall, 3),
+        "goodput_per_sec": round(sum(total <= slo for total in totals) / wall, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", default="1,10,50")
+    parser.add_argument("--requests-per-user", type=int, default=3)
+    parser.add_argument("--num-parallel", type=int, default=2, help="Concurrent generations the server runs")
+    parser.add_argument("--max-queue", type=int, default=32)
+    parser.add_argument("--queue-timeout", type=float, default=60.0)
+    parser.add_argument("--tokens-per-sec", type=float, default=100.0)
+    parser.add_argument("--reply-tokens", type=int, default=32)
+    parser.add_argument("--slo", type=float, default=10.0, help="Latency (s) within which a request counts as goodput")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    config = FakeLLMConfig(max_parallel=args.num_parallel, tokens_per_sec=args.tokens_per_sec,
+                           reply_tokens=args.reply_tokens)
+    results = {"num_parallel": args.num_parallel, "unscheduled": [], "scheduled": []}
+    with FakeLLMServer(config) as server:
+        for users in map(int, args.users.split(",")):
+            results["unscheduled"].append(run_users(server.url, users, args.requests_per_user, None, args.slo))
+            scheduler = FairScheduler(max_concurrency=args.num_parallel, max_queue=args.max_queue,
+                                      queue_timeout=args.queue_timeout)
+            results["scheduled"].append(run_users(server.url, users, args.requests_per_user, scheduler, args.slo))
+
+    def cell(value):
+        return "failed" if value is None else value
+
+    print(f"{'mode':12} {'users':>5} {'done':>5} {'rejected':>8} {'ttft p50':>9} {'ttft p99':>9} "
+          f"{'lat p50':>8} {'lat p99':>8} {'served p99':>10} {'req/s':>7} {'goodput/s':>9}")
+    for mode in ("unscheduled", "scheduled"):
+        for row in results[mode]:
+            print(f"{mode:12} {row['users']:>5} {row['completed']:>5} {row['rejected']:>8} {cell(row['ttft_p50_s'])!s:>9} "
+                  f"{cell(row['ttft_p99_s'])!s:>9} {cell(row['latency_p50_s'])!s:>8} {cell(row['latency_p99_s'])!s:>8} "
+                  f"{row['served_latency_p99_s']!s:>10} {row['requests_per_sec']:>7} {row['goodput_per_sec']:>9}")
+    print(f"Rejected requests count as failures in the p50/p99 columns; goodput is requests served within {args.slo:g}s")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
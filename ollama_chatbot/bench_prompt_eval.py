@@ -0,0 +1,129 @@
+"""
+Prompt-evaluation cost per turn: flat completion prompt vs. chat API with a stable prefix,
+and chat API with the history windowed to a token budget.
+
+For each mode, plays a conversation of --turns turns against Ollama and records
+Ollama's own `prompt_eval_count` and `prompt_eval_duration` for every turn, plus
+the estimated size of the prompt that was sent.
+
+    python bench_prompt_eval.py --model gemma3:1b --turns 20 --json prompt_eval.json
+    python bench_prompt_eval.py --fake      # against the local fake server in ../benchmarks
+"""
+import os
+import sys
+import json
+import argparse
+import urllib.request
+from langchain_core.messages import AIMessage, HumanMessage
+from chains import COMPLETION_TEMPLATE, DEFAULT_SYSTEM_PROMPT, KEEP_ALIVE, format_history
+from history import HistoryManager, estimate_tokens
+
+QUESTIONS = [
+    "What is a vector database?",
+    "How does it differ from a relational database?",
+    "Give me an example use case.",
+    "What are the main performance trade-offs?",
+    "How would I benchmark one?",
+]
+
+
+def post(host, path, payload):
+    request = urllib.request.Request(
+        f"{host}{path}", data=json.dumps(payload).encode(),
+        headers={"Content-Type": "application/json"}, method="POST",
+    )
+    with urllib.request.urlopen(request, timeout=600) as response:
+        return json.load(response)
+
+
+def run_completion(host, model, turns, num_predict):
+    """Old path: re-render the whole conversation into one prompt for /api/generate"""
+    history, rows = [], []
+    for turn in range(turns):
+        question = QUESTIONS[turn % len(QUESTIONS)]
+        history.append(HumanMessage(content=question))
+        prompt = COMPLETION_TEMPLATE.format(
+            system_prompt=DEFAULT_SYSTEM_PROMPT, history=format_history(history), input=question
+        )
+        data = post(host, "/api/generate", {
+            "model": model, "prompt": prompt, "stream": False, "options": {"num_predict": num_predict},
+        })
+        history.append(AIMessage(content=data.get("response", "")))
+        rows.append(row(turn, data, estimate_tokens(prompt)))
+    return rows
+
+
+ROLES = {"human": "user", "ai": "assistant", "system": "system"}
+
+
+def run_chat(host, model, turns, num_predict, history_manager=None):
+    """New path: append-only message list on /api/chat with keep_alive, optionally windowed"""
+    history, rows = [], []
+    for turn in range(turns):
+        history.append(HumanMessage(content=QUESTIONS[turn % len(QUESTIONS)]))
+        window = history_manager.window(history) if history_manager else history
+        messages = [{"role": "system", "content": DEFAULT_SYSTEM_PROMPT}]
+        messages += [{"role": ROLES[message.type], "content": message.content} for message in window]
+        data = post(host, "/api/chat", {
+            "model": model, "messages": messages, "stream": False, "keep_alive": KEEP_ALIVE,
+            "options": {"num_predict": num_predict},
+        })
+        history.append(AIMessage(content=data.get("message", {}).get("content", "")))
+        rows.append(row(turn, data, sum(estimate_tokens(message["content"]) for message in messages)))
+    return rows
+
+
+def row(turn, data, prompt_tokens):
+    return {
+        "turn": turn + 1,
+        "prompt_tokens": prompt_tokens,
+        "prompt_eval_count": data.get("prompt_eval_count", 0),
+        "prompt_eval_ms": round(data.get("prompt_eval_duration", 0) / 1e6, 2),
+        "total_ms": round(data.get("total_duration", 0) / 1e6, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=os.getenv("OLLAMA_HOST", "http://127.0.0.1:11434"))
+    parser.add_argument("--model", default="gemma3:1b")
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--num-predict", type=int, default=64)
+    parser.add_argument("--history-budget", type=int, default=512, help="Token budget of the windowed chat mode")
+    parser.add_argument("--fake", action="store_true", help="Run against the fake Ollama server")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    server = None
+    if args.fake:
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "benchmarks"))
+        from fake_llm_server import FakeLLMServer
+
+        server = FakeLLMServer().start()
+        args.host = server.url
+    host = args.host if args.host.startswith("http") else f"http://{args.host}"
+
+    try:
+        results = {
+            "model": args.model,
+            "completion": run_completion(host, args.model, args.turns, args.num_predict),
+            "chat": run_chat(host, args.model, args.turns, args.num_predict),
+            "windowed": run_chat(host, args.model, args.turns, args.num_predict,
+                                 HistoryManager(budget=args.history_budget)),
+        }
+    finally:
+        if server:
+            server.stop()
+
+    modes = ("completion", "chat", "windowed")
+    print(f"{'turn':>4} " + " ".join(f"{mode + ' sent':>15} {mode + ' eval':>15} {mode + ' ms':>13}" for mode in modes))
+    for rows in zip(*(results[mode] for mode in modes)):
+        print(f"{rows[0]['turn']:>4} " + " ".join(
+            f"{r['prompt_tokens']:>15} {r['prompt_eval_count']:>15} {r['prompt_eval_ms']:>13}" for r in rows))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Script rerun time of the Streamlit app at growing conversation lengths.
+
+Uses Streamlit's AppTest harness to run main.py headlessly with 10, 100 and 1,000
+messages already in session state, and reports the median rerun time. Run it
+once with the default page size and once with paging disabled to see the
+difference:
+
+    python bench_render.py
+    CHAT_PAGE_SIZE=100000 python bench_render.py   # render the full history (old behaviour)
+"""
+import os
+import json
+import time
+import argparse
+import tempfile
+import statistics
+from streamlit.testing.v1 import AppTest
+from sessions import Conversation
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def make_conversation(n, directory):
+    conversation = Conversation(os.path.join(directory, f"bench-{n}.jsonl"))
+    for i in range(n):
+        if i % 2 == 0:
+            conversation.add_user(f"Question {i}: how do I tune **setting {i}** for better throughput?")
+        else:
+            conversation.add_assistant(f"Answer {i}: adjust the value, then measure.\n\n- step one\n- step two\n\n`config_{i} = 42`")
+    return conversation
+
+
+def time_reruns(n_messages, runs, directory):
+    app = AppTest.from_file(os.path.join(HERE, "main.py"), default_timeout=60)
+    app.session_state["session_id"] = f"bench-{n_messages}"
+    app.session_state["conversation"] = make_conversation(n_messages, directory)
+    app.run()
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        app.run()
+        samples.append(time.perf_counter() - start)
+    return {
+        "messages": n_messages,
+        "rendered": len(app.chat_message),
+        "rerun_median_ms": round(statistics.median(samples) * 1000, 2),
+        "rerun_max_ms": round(max(samples) * 1000, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,100,1000")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        results = {
+            "page_size": os.getenv("CHAT_PAGE_SIZE", "default"),
+            "results": [time_reruns(int(n), args.runs, directory) for n in args.sizes.split(",")],
+        }
+    for row in results["results"]:
+        print(f"{row['messages']:>6} messages  {row['rendered']:>5} rendered  "
+              f"median {row['rerun_median_ms']:>8} ms  max {row['rerun_max_ms']:>8} ms")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
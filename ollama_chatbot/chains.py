@@ -0,0 +1,149 @@
+import os
+from langchain.prompts import PromptTemplate
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.output_parsers import StrOutputParser
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+
+DEFAULT_SYSTEM_PROMPT = """You are a helpful, respectful and honest assistant. Always answer as helpfully as possible, while being safe.
+Your answers should not include harmful, unethical, racist, sexist, toxic, dangerous, or illegal content.
+Please ensure that your responses are socially unbiased and positive in nature.
+If a question does not make any sense, or is not factually coherent, explain why instead of answering something incorrect.
+If you don't know the answer to a question, please don't share false information."""
+
+# How long Ollama keeps the model (and its KV cache) loaded between turns
+KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+
+CHAT_MODE = "chat"
+COMPLETION_MODE = "completion"
+
+SUMMARY_PROMPT = """Summarize the conversation below in a few sentences, for your own reference later in the chat.
+Keep names, facts, decisions and open questions; leave out pleasantries.
+
+{previous}{transcript}"""
+
+RAG_TEMPLATE = """Answer using the numbered passages from the user's documents below where they are relevant, and cite them like [1].
+If they don't contain the answer, say so and answer from your own knowledge.
+
+{passages}
+
+Question: {input}"""
+
+COMPLETION_TEMPLATE = """
+    {system_prompt}
+
+    Current conversation:
+    {history}
+    Human: {input}
+    AI Assistant:"""
+
+
+def client_kwargs():
+    """httpx settings for every Ollama client: long generations, a quick connect timeout and a keep-alive pool"""
+    import httpx
+
+    return {
+        "timeout": httpx.Timeout(300.0, connect=5.0),
+        "limits": httpx.Limits(max_connections=32, max_keepalive_connections=16, keepalive_expiry=300),
+    }
+
+
+def create_client(host=None):
+    """Pooled keep-alive HTTP client for direct Ollama calls (warm-up, model listing, embeddings)"""
+    from ollama import Client
+
+    # host=None lets the client read OLLAMA_HOST like the Ollama CLI does
+    return Client(host=host, **client_kwargs())
+
+
+def warm_up_model(client, model_name, keep_alive=KEEP_ALIVE):
+    """Load the model into memory with an empty request so the first message doesn't pay the load time"""
+    client.generate(model=model_name, prompt="", keep_alive=keep_alive)
+
+
+def format_history(messages):
+    """Flatten LangChain messages into the text transcript used by the completion prompt"""
+    def speaker(msg):
+        if isinstance(msg, SystemMessage):
+            return "Context"
+        return "Human" if isinstance(msg, HumanMessage) else "AI Assistant"
+    return "\n".join([f"{speaker(msg)}: {msg.content}" for msg in messages])
+
+
+def history_before_input(inputs):
+    """History without the trailing human turn that duplicates the current input"""
+    history = list(inputs["history"])
+    if history and isinstance(history[-1], HumanMessage) and history[-1].content == inputs["input"]:
+        history = history[:-1]
+    return history
+
+
+def with_context(inputs):
+    """The user's input, preceded by the retrieved passages when there are any"""
+    # Only the current turn carries passages; the history keeps the bare questions
+    if not inputs.get("context"):
+        return inputs["input"]
+    return RAG_TEMPLATE.format(passages=inputs["context"], input=inputs["input"])
+
+
+def build_summarizer(model_name, host=None, max_tokens=200, keep_alive=KEEP_ALIVE):
+    """summarize(previous_summary, messages) -> new summary, for HistoryManager"""
+    from langchain_ollama import ChatOllama
+
+    llm = ChatOllama(model=model_name, temperature=0.2, num_predict=max_tokens, keep_alive=keep_alive,
+                     base_url=host, client_kwargs=client_kwargs())
+
+    def summarize(previous, messages):
+        previous = f"Summary so far: {previous}\n\n" if previous else ""
+        return llm.invoke(SUMMARY_PROMPT.format(previous=previous, transcript=format_history(messages))).content
+
+    return summarize
+
+
+def build_completion_chain(model_name, temperature=0.7, system_prompt=DEFAULT_SYSTEM_PROMPT, host=None):
+    """Legacy path: the whole conversation is re-rendered into one flat prompt every turn"""
+    from langchain_ollama import OllamaLLM
+
+    prompt = PromptTemplate(
+        input_variables=["history", "input"],
+        template=COMPLETION_TEMPLATE.replace("{system_prompt}", system_prompt.replace("{", "{{").replace("}", "}}")),
+    )
+    llm = OllamaLLM(model=model_name, temperature=temperature, base_url=host, client_kwargs=client_kwargs())
+    return (
+        {"history": lambda x: format_history(x["history"]), "input": with_context}
+        | prompt
+        | llm
+        | StrOutputParser()
+    )
+
+
+def build_chat_chain(model_name, temperature=0.7, system_prompt=DEFAULT_SYSTEM_PROMPT, keep_alive=KEEP_ALIVE,
+                     host=None):
+    """
+    Chat-API path: the system prompt and earlier turns are sent as an append-only
+    message list, so every request shares its prefix with the previous one and
+    Ollama reuses the cached KV state instead of re-evaluating the conversation.
+    """
+    from langchain_ollama import ChatOllama
+
+    prompt = ChatPromptTemplate.from_messages([
+        # A message object (not a template) so braces in the system prompt are kept verbatim
+        SystemMessage(content=system_prompt),
+        MessagesPlaceholder("history"),
+        ("human", "{input}"),
+    ])
+    llm = ChatOllama(model=model_name, temperature=temperature, keep_alive=keep_alive, base_url=host,
+                     client_kwargs=client_kwargs())
+    return (
+        {"history": history_before_input, "input": with_context}
+        | prompt
+        | llm
+        | StrOutputParser()
+    )
+
+
+def build_chain(model_name, temperature=0.7, system_prompt=None, mode=CHAT_MODE, host=None):
+    if system_prompt is None:
+        system_prompt = DEFAULT_SYSTEM_PROMPT
+    if mode == COMPLETION_MODE:
+        return build_completion_chain(model_name, temperature, system_prompt, host=host)
+    return build_chat_chain(model_name, temperature, system_prompt, host=host)
@@ -0,0 +1,125 @@
+import os
+import re
+import logging
+import threading
+from langchain_core.messages import HumanMessage, SystemMessage
+
+logger = logging.getLogger(__name__)
+
+# Tokens of conversation history sent with each request; keep it well below the model's num_ctx
+HISTORY_TOKEN_BUDGET = int(os.getenv("CHAT_HISTORY_TOKENS", "1536"))
+
+_WORD_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text):
+    """
+    Tokenizer-free estimate of BPE tokens: every word or punctuation mark is at least one
+    token and long words split into ~4-character pieces. Errs on the high side for English.
+    """
+    return sum(max(1, (len(piece) + 3) // 4) for piece in _WORD_PATTERN.findall(text or ""))
+
+
+class HistoryManager:
+    """
+    Keeps the history sent to the model within a token budget. On overflow the oldest
+    turns are dropped down to `low_water` of the budget in one step, so the kept prefix
+    stays the same (and stays in Ollama's KV cache) for several turns instead of
+    shifting every turn. With `summarize(previous_summary, dropped_messages)` set, the
+    dropped turns are folded into a rolling summary on a background thread.
+    """
+
+    def __init__(self, budget=HISTORY_TOKEN_BUDGET, low_water=0.6, summarize=None, count_tokens=estimate_tokens):
+        self.budget = budget
+        self.low_water = low_water
+        self.summarize = summarize
+        self.count_tokens = count_tokens
+        self.lock = threading.Lock()
+        self.worker = None
+        self.generation = 0
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.start = 0          # index of the oldest message still in the window
+            self.summarized = 0     # messages already folded into the summary
+            self.summary = ""
+            self.counts = []        # (hash of content, tokens) per message, so each is counted once
+            self.generation += 1
+
+    def _sync(self, messages):
+        # History can shrink (a message dropped after an error) or be replaced at the tail. Messages
+        # before the window only change with a reset(), so only the window is compared: older ones
+        # may have been spilled to disk (see sessions.Conversation) and are not read again.
+        del self.counts[len(messages):]
+        for i in range(min(self.start, len(self.counts)), len(messages)):
+            if i < len(self.counts) and self.counts[i][0] == hash(messages[i].content):
+                continue
+            del self.counts[i:]
+            self.counts.extend((hash(m.content), self.count_tokens(m.content)) for m in messages[i:])
+            break
+        if self.start >= len(messages):
+            self.start = self.summarized = 0
+            self.summary = ""
+
+    def _summary_message(self):
+        return SystemMessage(content=f"Summary of the earlier conversation: {self.summary}")
+
+    def window(self, messages):
+        """The messages to send: an optional summary followed by the most recent turns"""
+        with self.lock:
+            self._sync(messages)
+            summary_tokens = self.count_tokens(self.summary) if self.summary else 0
+            total = summary_tokens + sum(tokens for _, tokens in self.counts[self.start:])
+            if total > self.budget:
+                target = self.budget * self.low_water
+                last = len(messages) - 1
+                while self.start < last and total > target:
+                    total -= self.counts[self.start][1]
+                    self.start += 1
+                # Start the window on a human turn
+                while self.start < last and not isinstance(messages[self.start], HumanMessage):
+                    total -= self.counts[self.start][1]
+                    self.start += 1
+            if self.summarize is not None and self.summarized < self.start:
+                self._start_summary(messages)
+            window = list(messages[self.start:])
+            if self.summary:
+                window.insert(0, self._summary_message())
+            return window
+
+    def _start_summary(self, messages):
+        if self.worker is not None and self.worker.is_alive():
+            return  # picked up by a later call once the running summary is done
+        previous, dropped = self.summary, list(messages[self.summarized:self.start])
+        upto, generation, summarize = self.start, self.generation, self.summarize
+
+        def run():
+            try:
+                summary = summarize(previous, dropped)
+            except Exception as e:
+                logger.warning(f"History summary failed: {e}")
+                return
+            with self.lock:
+                # Ignore results for a conversation that has been reset meanwhile
+                if generation == self.generation:
+                    self.summary = summary.strip()
+                    self.summarized = upto
+
+        self.worker = threading.Thread(target=run, name="history-summary", daemon=True)
+        self.worker.start()
+
+    def settled(self):
+        """Number of leading messages that will not be read again: out of the window and, when summarizing, summarized"""
+        with self.lock:
+            return self.start if self.summarize is None else min(self.start, self.summarized)
+
+    def stats(self):
+        with self.lock:
+            return {
+                "window_tokens": sum(tokens for _, tokens in self.counts[self.start:])
+                + (self.count_tokens(self.summary) if self.summary else 0),
+                "total_tokens": sum(tokens for _, tokens in self.counts),
+                "dropped_messages": self.start,
+                "summarized_messages": self.summarized,
+            }
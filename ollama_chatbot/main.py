@@ -1,10 +1,23 @@
 import os
+import sys
+import time
+import uuid
+import logging
+import threading
 import streamlit as st
-from langchain.prompts import PromptTemplate
-from langchain_core.messages import AIMessage, HumanMessage
-from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnablePassthrough
-from langchain_ollama import OllamaLLM
+from streamlit.errors import StreamlitAPIException
+from chains import build_chain, build_summarizer, create_client, warm_up_model, CHAT_MODE, DEFAULT_SYSTEM_PROMPT
+from history import HistoryManager, HISTORY_TOKEN_BUDGET
+from models import list_local_models, ModelRouter, ModelStats
+from scheduler import FairScheduler, QueueFullError, QueueTimeoutError
+from sessions import create_registry
+from rag import DocumentIndex, IngestWorker, SUPPORTED_TYPES, DEFAULT_NAMESPACE, format_passages
+
+# Turn tracing is shared with llm_chatbot and lives at the repository root
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from chat_tracing import Tracer, callback_handler
+
+logger = logging.getLogger(__name__)
 
 # Set page configuration
 st.set_page_config(
@@ -13,34 +26,17 @@ st.set_page_config(
     layout="wide",
 )
 
+# Number of most recent messages rendered per page of history
+PAGE_SIZE = int(os.getenv("CHAT_PAGE_SIZE", "20"))
+
+AVATARS = {"user": "👨‍💻", "assistant": "🤖"}
+
+# Used when Ollama can't be reached to list the installed models
+DEFAULT_MODEL = "gemma3:1b"
+
 # Custom CSS for a more beautiful interface
 st.markdown("""
 <style>
-    .chat-message {
-        padding: 1.5rem;
-        border-radius: 0.8rem;
-        margin-bottom: 1rem;
-        display: flex;
-        box-shadow: 0 2px 5px rgba(0,0,0,0.1);
-    }
-    .chat-message.user {
-        background-color: #e6f7ff;
-        border-left: 5px solid #1890ff;
-    }
-    .chat-message.bot {
-        background-color: #f6f6f6;
-        border-left: 5px solid #722ed1;
-    }
-    .chat-message .avatar {
-        width: 45px;
-        height: 45px;
-        border-radius: 50%;
-        object-fit: cover;
-        margin-right: 1rem;
-    }
-    .chat-message .message {
-        flex-grow: 1;
-    }
     .stButton button {
         background-color: #1890ff;
         color: white;
@@ -70,87 +66,367 @@ st.markdown("""
 
 def initialize_session_state():
     """Initialize session state variables"""
-    if "messages" not in st.session_state:
-        st.session_state.messages = []
+    # Identifies this browser session to the shared request scheduler
+    if "session_id" not in st.session_state:
+        st.session_state.session_id = uuid.uuid4().hex
     
-    if "chain" not in st.session_state:
-        st.session_state.chain = None
-        
-    if "chat_history" not in st.session_state:
-        st.session_state.chat_history = []
+    # The chat, stored once: rendered as messages and sent to the model as LangChain history
+    if "conversation" not in st.session_state:
+        st.session_state.conversation = get_session_registry().open(st.session_state.session_id)
+    
+    # Decides which part of the history fits in the prompt
+    if "history_manager" not in st.session_state:
+        st.session_state.history_manager = HistoryManager()
         
     if "model_name" not in st.session_state:
-        st.session_state.model_name = "gemma3:1b"
-
-def initialize_chain(model_name, temperature=0.7, system_prompt=None):
-    """Initialize the conversation chain with the selected model using the updated LangChain API"""
-    # Default system prompt
-    if system_prompt is None:
-        system_prompt = """You are a helpful, respectful and honest assistant. Always answer as helpfully as possible, while being safe.
-Your answers should not include harmful, unethical, racist, sexist, toxic, dangerous, or illegal content.
-Please ensure that your responses are socially unbiased and positive in nature.
-If a question does not make any sense, or is not factually coherent, explain why instead of answering something incorrect.
-If you don't know the answer to a question, please don't share false information."""
-    
-    # Create the prompt template with system message
-    template = f"""
-    {system_prompt}
-    
-    Current conversation:
-    {{history}}
-    Human: {{input}}
-    AI Assistant:"""
-    
-    prompt = PromptTemplate(
-        input_variables=["history", "input"], 
-        template=template
-    )
-    
-    # Initialize the language model
+        st.session_state.model_name = DEFAULT_MODEL
+    
+    # Temperature and system prompt the session's chain was built with
+    if "chain_config" not in st.session_state:
+        st.session_state.chain_config = {}
+    
+    # Partial response of a generation that is still streaming (None when idle)
+    if "pending_response" not in st.session_state:
+        st.session_state.pending_response = None
+    
+    if "last_metrics" not in st.session_state:
+        st.session_state.last_metrics = None
+    
+    # How many of the most recent messages are rendered
+    if "visible_messages" not in st.session_state:
+        st.session_state.visible_messages = PAGE_SIZE
+
+@st.cache_resource(show_spinner=False)
+def get_ollama_client():
+    """Process-wide pooled HTTP client to Ollama"""
+    return create_client()
+
+@st.cache_resource(show_spinner=False)
+def get_chain(model_name, temperature=0.7, system_prompt=None, mode=CHAT_MODE):
+    """Chains are stateless, so one instance per parameter set is shared by all sessions"""
+    return build_chain(model_name, temperature=temperature, system_prompt=system_prompt, mode=mode)
+
+@st.cache_resource(show_spinner=False)
+def get_warm_ups():
+    """Warm-up thread per model, shared by all sessions, with the lock that guards it"""
+    return {}, threading.Lock()
+
+def warm_up(model_name):
+    """Load the model into Ollama in the background, once per process and model; a failed warm-up is retried on the next rerun"""
+    threads, lock = get_warm_ups()
+    
+    def load():
+        try:
+            warm_up_model(get_ollama_client(), model_name)
+            logger.info(f"Model {model_name} loaded")
+        except Exception as e:
+            logger.warning(f"Warm-up of {model_name} failed: {e}")
+            with lock:
+                threads.pop(model_name, None)
+    
+    with lock:
+        if model_name not in threads:
+            threads[model_name] = threading.Thread(target=load, name=f"warm-up-{model_name}", daemon=True)
+            threads[model_name].start()
+        return threads[model_name]
+
+@st.cache_resource(show_spinner=False)
+def get_scheduler():
+    """Process-wide fair queue in front of Ollama, sized by OLLAMA_NUM_PARALLEL"""
+    return FairScheduler.from_env()
+
+@st.cache_resource(show_spinner=False)
+def get_session_registry():
+    """Every session's conversation, unloaded to disk when idle or over CHAT_MEMORY_BUDGET_MB"""
+    return create_registry()
+
+def touch_session():
+    """Mark this session active, loading its conversation back if it was unloaded"""
+    get_session_registry().touch(st.session_state.session_id, st.session_state.conversation)
+
+@st.cache_data(ttl=60, show_spinner=False)
+def discover_models():
+    """Chat models installed in the local Ollama, refreshed at most once a minute"""
     try:
-        llm = OllamaLLM(model=model_name, temperature=temperature)
-        
-        # Create a function to format conversation history
-        def format_history(messages):
-            return "\n".join([f"{'Human' if isinstance(msg, HumanMessage) else 'AI Assistant'}: {msg.content}" 
-                             for msg in messages])
-        
-        # Create the chain with the updated LangChain API
-        chain = (
-            {"history": lambda x: format_history(x["history"]), "input": lambda x: x["input"]}
-            | prompt
-            | llm
-            | StrOutputParser()
-        )
-        
-        return chain
+        return list_local_models(get_ollama_client())
+    except Exception as e:
+        logger.warning(f"Model discovery failed: {e}")
+        return []
+
+@st.cache_resource(show_spinner=False)
+def get_model_stats():
+    """Per-model latency and tokens/sec, shared by all sessions"""
+    return ModelStats()
+
+@st.cache_resource(show_spinner=False)
+def get_tracer():
+    """Writes a trace of every turn to CHAT_TRACE_FILE; `python -m chat_tracing` summarizes it"""
+    return Tracer.from_env("ollama_chatbot")
+
+@st.cache_resource(show_spinner=False)
+def get_document_index():
+    """On-disk vector index of uploaded documents, shared by all sessions and split into namespaces"""
+    return DocumentIndex(get_ollama_client(), scheduler=get_scheduler())
+
+@st.cache_resource(show_spinner=False)
+def get_ingest_worker():
+    """Background thread that chunks, embeds and indexes uploaded files"""
+    return IngestWorker(get_document_index())
+
+@st.cache_resource(show_spinner=False)
+def get_summarizer(model_name):
+    """Folds turns that no longer fit the history budget into a short summary"""
+    return build_summarizer(model_name)
+
+def session_summarizer(model_name):
+    """Summarizer for this session that waits its turn in the shared Ollama queue"""
+    summarizer = get_summarizer(model_name)
+    scheduler = get_scheduler()
+    # Runs on a background thread, so session state is captured up front
+    queue_id = f"{st.session_state.session_id}:summary"
+    
+    def summarize(previous, messages):
+        with scheduler.slot(queue_id):
+            return summarizer(previous, messages)
+    return summarize
+
+def initialize_chain(model_name, temperature=0.7, system_prompt=None, mode=CHAT_MODE):
+    """Initialize the conversation chain with the selected model using Ollama's chat API"""
+    # Chat mode sends an append-only message list with keep_alive, so Ollama reuses the
+    # cached prefix and prompt evaluation per turn stays roughly constant as the chat grows.
+    try:
+        return get_chain(model_name, temperature=temperature, system_prompt=system_prompt, mode=mode)
     except Exception as e:
         st.error(f"Error initializing model: {e}")
         return None
 
+def render_message(message):
+    """Render a single chat message"""
+    with st.chat_message(message["role"], avatar=AVATARS.get(message["role"])):
+        st.markdown(message["content"])
+        render_sources(message.get("sources"))
+
+def render_sources(passages):
+    """Passages the answer was grounded on, collapsed under the message"""
+    if not passages:
+        return
+    with st.expander(f"Sources ({len(passages)})"):
+        for i, passage in enumerate(passages, 1):
+            st.markdown(f"**[{i}] {passage['source']}**")
+            st.caption(passage["text"][:500] + ("…" if len(passage["text"]) > 500 else ""))
+
+def rerun_chat_panel():
+    """Rerun only the chat panel, or the whole app during a full run, where Streamlit refuses a fragment rerun"""
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        st.rerun()
+
 def display_messages():
-    """Display the conversation messages"""
-    for idx, message in enumerate(st.session_state.messages):
-        if message["role"] == "user":
-            with st.container():
-                st.markdown(f"""
-                <div class="chat-message user">
-                    <div class="avatar">👨‍💻</div>
-                    <div class="message">{message["content"]}</div>
-                </div>
-                """, unsafe_allow_html=True)
-        else:
-            with st.container():
-                st.markdown(f"""
-                <div class="chat-message bot">
-                    <div class="avatar">🤖</div>
-                    <div class="message">{message["content"]}</div>
-                </div>
-                """, unsafe_allow_html=True)
+    """Display the most recent page(s) of the conversation"""
+    conversation = st.session_state.conversation
+    visible = st.session_state.visible_messages
+    # Older history is paged in on demand, so a rerun renders (and reads back) at most `visible` messages
+    hidden = len(conversation) - visible
+    if hidden > 0:
+        if st.button(f"Show earlier messages ({hidden} hidden)", key="show_earlier"):
+            st.session_state.visible_messages += PAGE_SIZE
+            rerun_chat_panel()
+    for message in conversation.messages(max(0, hidden)):
+        render_message(message)
+
+def format_metrics(metrics):
+    ttft = f"{metrics['ttft']:.2f} s" if metrics["ttft"] is not None else "-"
+    text = f"TTFT {ttft} · {metrics['tokens_per_sec']:.1f} tokens/sec · {metrics['tokens']} tokens"
+    if metrics.get("queue_wait", 0) >= 0.1:
+        text += f" · queued {metrics['queue_wait']:.1f} s"
+    return text
+
+def display_metrics():
+    """Show TTFT and tokens/sec of the last response"""
+    metrics = st.session_state.last_metrics
+    if not metrics:
+        st.caption("Send a message to see response metrics")
+        return
+    if metrics.get("model"):
+        st.caption(f"Answered by **{metrics['model']}**")
+    ttft = f"{metrics['ttft']:.2f} s" if metrics["ttft"] is not None else "-"
+    col1, col2 = st.columns(2)
+    col1.metric("Time to first token", ttft)
+    col2.metric("Tokens/sec", f"{metrics['tokens_per_sec']:.1f}")
+    st.caption(f"{metrics['tokens']} tokens in {metrics['elapsed']:.2f} s"
+               + (f", {metrics['queue_wait']:.1f} s in queue" if metrics.get("queue_wait", 0) >= 0.1 else "")
+               + (" (stopped)" if metrics.get("stopped") else ""))
+
+def stream_response(chain, user_input, placeholder, metrics_placeholder, passages=None, turn=None):
+    """Stream the model response into the placeholder, updating live metrics and the turn's trace"""
+    if turn is None:
+        turn = get_tracer().turn(st.session_state.session_id)
+    st.session_state.pending_response = ""
+    st.session_state.last_metrics = {"ttft": None, "tokens": 0, "elapsed": 0.0, "tokens_per_sec": 0.0}
+    
+    def show_queue_position(position):
+        ahead = f"{position} request(s) ahead of you" if position else "you're next"
+        placeholder.markdown(f"⏳ Waiting for the model… {ahead}")
+    
+    # Wait for a free generation slot; all sessions share Ollama fairly
+    queued_at = time.perf_counter()
+    with get_scheduler().slot(st.session_state.session_id, on_wait=show_queue_position):
+        start = time.perf_counter()
+        first_token = None
+        tokens = 0
+        last_paint = 0.0
+        st.session_state.last_metrics["queue_wait"] = start - queued_at
+        turn.add("queue", queued_at, start)
+        with turn.span("format_history") as span:
+            history = st.session_state.history_manager.window(st.session_state.conversation.history)
+            context = format_passages(passages) if passages else ""
+            span.set(messages=len(history))
+        stream = chain.stream(
+            {"input": user_input, "context": context, "history": history},
+            config={"callbacks": [callback_handler(turn)]},
+        )
+        try:
+            for chunk in stream:
+                now = time.perf_counter()
+                if first_token is None:
+                    first_token = now - start
+                tokens += 1
+                st.session_state.pending_response += chunk
+                st.session_state.last_metrics.update({
+                    "ttft": first_token,
+                    "tokens": tokens,
+                    "elapsed": now - start,
+                    "tokens_per_sec": tokens / max(now - start - first_token, 1e-6),
+                })
+                # Repaint at most ~20 times per second; each paint is a websocket delta
+                if now - last_paint > 0.05:
+                    placeholder.markdown(st.session_state.pending_response + " ▌")
+                    metrics_placeholder.caption(format_metrics(st.session_state.last_metrics))
+                    last_paint = now
+        finally:
+            # Closing the generator closes the HTTP stream, which makes Ollama abort the
+            # request when the run is interrupted by the Stop button or another widget
+            stream.close()
+    response = st.session_state.pending_response
+    st.session_state.pending_response = None
+    return response
+
+def select_chain(prompt):
+    """Pick the chain for this message, routing by prompt difficulty when enabled"""
+    if st.session_state.get("auto_route"):
+        router = ModelRouter(
+            st.session_state.route_small_model,
+            st.session_state.route_large_model,
+            max_simple_chars=st.session_state.route_max_chars,
+        )
+        model_name = router.route(prompt)
+    else:
+        model_name = st.session_state.model_name
+    # Chains are shared through get_chain(), so sessions only keep their configuration
+    return initialize_chain(model_name, **st.session_state.chain_config), model_name
+
+def retrieve_passages(prompt):
+    """Top-k passages from the indexed documents when answering from documents is on"""
+    if not st.session_state.get("use_documents"):
+        return []
+    try:
+        return get_document_index().search(document_namespace(), prompt, k=st.session_state.get("rag_top_k", 4))
+    except Exception as e:
+        st.warning(f"Document search failed, answering without documents: {e}")
+        return []
+
+def document_namespace():
+    """Namespace this session indexes files into and searches"""
+    return st.session_state.get("rag_namespace", "").strip() or DEFAULT_NAMESPACE
+
+def documents_sidebar():
+    """Upload and index documents, and choose whether answers use them"""
+    st.header("Documents")
+    uploads = st.file_uploader("Upload documents", type=SUPPORTED_TYPES, accept_multiple_files=True)
+    use_documents = st.toggle("Answer from documents", key="use_documents",
+                              help="Retrieve the most relevant passages and add them to each question")
+    # The index (and chromadb) is only loaded once documents are actually used
+    if not uploads and not use_documents:
+        return
+    try:
+        worker = get_ingest_worker()
+    except Exception as e:
+        st.warning(f"Document index unavailable: {e}")
+        return
+    st.text_input("Namespace", value=DEFAULT_NAMESPACE, key="rag_namespace",
+                  help="Files are indexed into and searched from this namespace. Everyone using the same "
+                       "name shares its files; pick a name of your own to keep yours apart.")
+    namespace = document_namespace()
+    if uploads and st.button("Index uploaded files"):
+        for upload in uploads:
+            worker.submit(namespace, upload.name, upload.getvalue())
+    for name, status in worker.status(namespace).items():
+        st.caption(f"📄 {name}: {status}")
+    if worker.busy(namespace):
+        # Indexing runs in the background; the status refreshes on the next rerun
+        st.button("🔄 Refresh indexing status")
+    if use_documents:
+        st.slider("Passages per answer", min_value=1, max_value=10, value=4, key="rag_top_k")
+        st.caption(f"{get_document_index().count(namespace)} passages indexed")
+
+def session_memory_sidebar():
+    """Memory held by this session's conversation, and by all sessions on this server"""
+    stats = st.session_state.conversation.stats()
+    st.caption(f"Conversation: {stats['messages']} messages, {stats['resident_bytes'] / 1024:.0f} KB in memory, "
+               f"{stats['on_disk']} messages ({stats['disk_bytes'] / 1024:.0f} KB) on disk")
+    with st.expander("Server memory"):
+        report = get_session_registry().report()
+        st.caption(f"{report['sessions']} sessions · {report['resident_bytes'] / 2**20:.1f} of "
+                   f"{report['memory_budget'] / 2**20:.0f} MB conversation budget · "
+                   f"{report['disk_bytes'] / 2**20:.1f} MB on disk · process RSS {report['process_rss'] / 2**20:.0f} MB · "
+                   f"{report['unloads']} unloads, {report['expired']} expired")
+        st.dataframe(report["per_session"], hide_index=True)
+
+def memory_stats_sidebar():
+    """Prompt history window and conversation memory"""
+    history_stats = st.session_state.history_manager.stats()
+    st.caption(f"Prompt history: ~{history_stats['window_tokens']} of {history_stats['total_tokens']} tokens · "
+               f"{history_stats['dropped_messages']} messages dropped, "
+               f"{history_stats['summarized_messages']} summarized")
+    session_memory_sidebar()
+
+def metrics_sidebar():
+    """Metrics of the last answer, Ollama load and per-model performance"""
+    st.header("Response Metrics")
+    display_metrics()
+    
+    scheduler = get_scheduler()
+    st.caption(f"Ollama load: {scheduler.running}/{scheduler.max_concurrency} generating, "
+               f"{scheduler.queued()} waiting")
+    
+    # Latency and throughput per model, to tune routing with data
+    model_summary = get_model_stats().summary()
+    if model_summary:
+        st.header("Model Performance")
+        st.dataframe(model_summary, hide_index=True)
+
+def finalize_interrupted_response():
+    """Keep the partial answer of a generation that was stopped mid-stream"""
+    partial = st.session_state.pending_response
+    if partial is None:
+        return
+    st.session_state.pending_response = None
+    if st.session_state.last_metrics:
+        st.session_state.last_metrics["stopped"] = True
+    # An empty answer also takes its question out of the history, which keeps it alternating human/AI
+    st.session_state.conversation.add_assistant(partial, stopped=True)
 
 def main():
     # Initialize session state
     initialize_session_state()
+    touch_session()
+    
+    # Start loading the model before the first message arrives
+    warm_up(st.session_state.model_name)
+    
+    # A rerun while streaming means the user pressed Stop (or touched another widget)
+    finalize_interrupted_response()
     
     # App title and description
     st.title("🤖 LangChain Ollama Chatbot")
@@ -160,9 +436,16 @@ def main():
     with st.sidebar:
         st.header("Model Configuration")
         
-        # Model selection
-        model_options = ["gemma3:1b"]
-        selected_model = st.selectbox("Choose a model", model_options, index=0)
+        # Model selection from the models installed in Ollama
+        model_options = [model["name"] for model in discover_models()] or [DEFAULT_MODEL]
+        current = st.session_state.model_name
+        selected_model = st.selectbox(
+            "Choose a model", model_options,
+            index=model_options.index(current) if current in model_options else 0
+        )
+        if st.button("🔄 Refresh model list"):
+            discover_models.clear()
+            st.rerun()
         
         # Temperature slider
         temperature = st.slider("Temperature", min_value=0.0, max_value=1.0, value=0.7, step=0.1)
@@ -170,11 +453,7 @@ def main():
         # System prompt
         system_prompt = st.text_area(
             "System Prompt", 
-            value="""You are a helpful, respectful and honest assistant. Always answer as helpfully as possible, while being safe.
-Your answers should not include harmful, unethical, racist, sexist, toxic, dangerous, or illegal content.
-Please ensure that your responses are socially unbiased and positive in nature.
-If a question does not make any sense, or is not factually coherent, explain why instead of answering something incorrect.
-If you don't know the answer to a question, please don't share false information.""",
+            value=DEFAULT_SYSTEM_PROMPT,
             height=200
         )
         
@@ -183,64 +462,110 @@ If you don't know the answer to a question, please don't share false information
             # Check if the selected model is different from the current one
             if selected_model != st.session_state.model_name:
                 st.session_state.model_name = selected_model
+                warm_up(selected_model)
                 
             # Initialize the conversation chain
-            st.session_state.chain = initialize_chain(
-                model_name=selected_model,
-                temperature=temperature,
-                system_prompt=system_prompt
-            )
+            st.session_state.chain_config = {"temperature": temperature, "system_prompt": system_prompt}
+            initialize_chain(model_name=selected_model, **st.session_state.chain_config)
             
             # Clear the conversation history
-            st.session_state.messages = []
-            st.session_state.chat_history = []
+            st.session_state.conversation.clear()
+            st.session_state.history_manager.reset()
+            st.session_state.visible_messages = PAGE_SIZE
             st.success(f"Chat initialized with {selected_model} model")
             st.rerun()
-    
-    # Initialize the conversation chain if it doesn't exist
-    if st.session_state.chain is None:
-        st.session_state.chain = initialize_chain(
-            model_name=st.session_state.model_name,
-            temperature=temperature,
-            system_prompt=system_prompt
+        
+        # Optional per-message routing between a small and a large model
+        st.header("Routing")
+        if st.toggle("Route each message by difficulty", key="auto_route",
+                     help="Short, simple prompts go to the small model; long or hard ones to the large model"):
+            small_model = st.selectbox("Model for simple prompts", model_options, index=0, key="route_small_model")
+            large_model = st.selectbox("Model for hard prompts", model_options,
+                                       index=len(model_options) - 1, key="route_large_model")
+            st.slider("Max characters of a simple prompt", min_value=50, max_value=2000, value=280, step=10,
+                      key="route_max_chars")
+            warm_up(small_model)
+            warm_up(large_model)
+        
+        # Token budget for the history sent with each message
+        st.header("Memory")
+        history_manager = st.session_state.history_manager
+        history_manager.budget = st.number_input(
+            "History token budget", min_value=256, max_value=32768, value=HISTORY_TOKEN_BUDGET, step=256,
+            help="Older turns are dropped from the prompt once the history exceeds this"
         )
+        summarize = st.toggle("Summarize dropped turns", value=True,
+                              help="Keep a rolling summary of turns that no longer fit, built in the background")
+        history_manager.summarize = session_summarizer(st.session_state.model_name) if summarize else None
+        # The stats are drawn by the chat panel, so they refresh after every turn without rerunning the page
+        memory_slot = st.empty()
+        
+        documents_sidebar()
+        
+        metrics_slot = st.empty()
+    
+    # Settings of the conversation chain until the chat is reset with new ones
+    if not st.session_state.chain_config:
+        st.session_state.chain_config = {"temperature": temperature, "system_prompt": system_prompt}
+    
+    # The chat runs in a fragment, so sending a message reruns only the chat panel
+    chat_panel([(memory_slot, memory_stats_sidebar), (metrics_slot, metrics_sidebar)])
+
+@st.fragment
+def chat_panel(sidebar_slots):
+    """Conversation history, chat input and the streaming response"""
+    touch_session()
+    finalize_interrupted_response()
+    
+    # Elements (not widgets) can be redrawn outside the fragment; st.empty replaces the previous ones
+    for slot, draw in sidebar_slots:
+        with slot.container():
+            draw()
     
     # Display the conversation
     display_messages()
     
-    # Chat input
-    if "user_input" not in st.session_state:
-        st.session_state.user_input = ""
-    
-    # Create a form for chat input
-    with st.form(key="chat_form", clear_on_submit=True):
-        user_input = st.text_input("Your message:", key="user_input_field", placeholder="Type your message here...")
-        submit_button = st.form_submit_button("Send")
+    user_input = st.chat_input("Type your message here...")
     
     # When the user submits a message
-    if submit_button and user_input:
-        # Add the user message to the session state
-        st.session_state.messages.append({"role": "user", "content": user_input})
+    if user_input:
+        # Add the user message to the conversation
+        conversation = st.session_state.conversation
+        conversation.add_user(user_input)
+        
+        render_message({"role": "user", "content": user_input})
         
-        # Add to the langchain format history
-        st.session_state.chat_history.append(HumanMessage(content=user_input))
+        # Clicking Stop reruns the panel, which interrupts the stream below
+        st.button("⏹ Stop generating")
+        with st.chat_message("assistant", avatar=AVATARS["assistant"]):
+            placeholder = st.empty()
+            metrics_placeholder = st.empty()
         
         try:
-            # Get response from the model using the updated LangChain API
-            response = st.session_state.chain.invoke({
-                "input": user_input,
-                "history": st.session_state.chat_history
-            })
-            
-            # Add the model response to the session state
-            st.session_state.messages.append({"role": "assistant", "content": response})
+            chain, model_name = select_chain(user_input)
+            with get_tracer().turn(st.session_state.session_id) as turn:
+                with turn.span("retrieval"):
+                    passages = retrieve_passages(user_input)
+                
+                # Stream the response from the model token by token
+                response = stream_response(chain, user_input, placeholder, metrics_placeholder, passages, turn)
+            st.session_state.last_metrics["model"] = model_name
+            get_model_stats().record(model_name, st.session_state.last_metrics)
             
-            # Add to the langchain format history
-            st.session_state.chat_history.append(AIMessage(content=response))
+            # Add the model response to the conversation, spilling turns the prompt no longer needs
+            conversation.add_assistant(response, passages)
+            conversation.compact(st.session_state.history_manager.settled())
             
-            # Rerun to display the new messages
-            st.rerun()
+            # Rerun the panel to refresh the sidebar stats and drop the Stop button
+            rerun_chat_panel()
+        except (QueueFullError, QueueTimeoutError) as e:
+            # Not admitted: drop the unanswered message so it can simply be sent again
+            st.session_state.pending_response = None
+            conversation.pop()
+            placeholder.empty()
+            st.warning(str(e))
         except Exception as e:
+            st.session_state.pending_response = None
             st.error(f"Error getting response: {e}")
 
 if __name__ == "__main__":
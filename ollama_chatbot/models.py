@@ -0,0 +1,94 @@
+import os
+import re
+import sys
+import threading
+from collections import deque
+
+# Percentiles are computed the same way as in the trace report
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+from chat_tracing import percentile
+
+# Prompts containing these are sent to the large model regardless of length
+HARD_PROMPT_PATTERNS = [
+    r"```", r"\bstep[- ]by[- ]step\b", r"\bexplain\b", r"\bwhy\b", r"\banaly[sz]e\b", r"\bcompare\b",
+    r"\bprove\b", r"\bderive\b", r"\bdebug\b", r"\brefactor\b", r"\bwrite (a|an|the)? ?(code|function|script|program|essay)\b",
+    r"\btrade-?offs?\b", r"\bpros and cons\b",
+]
+
+
+def parse_parameter_size(value):
+    """'1B' -> 1.0, '270M' -> 0.27, '4.3B' -> 4.3 (billions of parameters)"""
+    match = re.match(r"([\d.]+)\s*([KMBT]?)", str(value or "").upper())
+    if not match:
+        return None
+    scale = {"K": 1e-6, "M": 1e-3, "B": 1.0, "T": 1e3, "": 1e-9}[match.group(2)]
+    return float(match.group(1)) * scale
+
+
+def list_local_models(client):
+    """Chat models installed in Ollama (from the tags endpoint), smallest first"""
+    response = client.list()
+    models = []
+    for model in response["models"]:
+        name = model.get("model") or model.get("name")
+        details = model.get("details") or {}
+        families = details.get("families") or [details.get("family") or ""]
+        # Embedding-only models can't chat
+        if "embed" in name or any("bert" in (family or "") for family in families):
+            continue
+        models.append({
+            "name": name,
+            "parameters_b": parse_parameter_size(details.get("parameter_size")),
+            "quantization": details.get("quantization_level"),
+            "size_bytes": model.get("size") or 0,
+        })
+    models.sort(key=lambda m: (m["parameters_b"] or 0, m["size_bytes"]))
+    return models
+
+
+class ModelStats:
+    """Process-wide latency and throughput per model, used to tune routing"""
+
+    def __init__(self, window=200):
+        self.window = window
+        self.samples = {}
+        self.lock = threading.Lock()
+
+    def record(self, model, metrics):
+        with self.lock:
+            self.samples.setdefault(model, deque(maxlen=self.window)).append(metrics)
+
+    def summary(self):
+        rows = []
+        with self.lock:
+            items = [(model, list(samples)) for model, samples in self.samples.items()]
+        for model, samples in items:
+            ttfts = [s["ttft"] for s in samples if s.get("ttft") is not None]
+            rows.append({
+                "model": model,
+                "responses": len(samples),
+                "median TTFT (s)": round(percentile(ttfts, 50), 2) if ttfts else None,
+                "mean latency (s)": round(sum(s["elapsed"] for s in samples) / len(samples), 2),
+                "mean tokens/sec": round(sum(s["tokens_per_sec"] for s in samples) / len(samples), 1),
+            })
+        return rows
+
+
+class ModelRouter:
+    """Sends short, simple prompts to a small model and long or hard ones to a large model"""
+
+    def __init__(self, small_model, large_model, max_simple_chars=280):
+        self.small_model = small_model
+        self.large_model = large_model
+        self.max_simple_chars = max_simple_chars
+        self.hard_patterns = [re.compile(pattern, re.IGNORECASE) for pattern in HARD_PROMPT_PATTERNS]
+
+    def classify(self, prompt):
+        if len(prompt) > self.max_simple_chars:
+            return "hard"
+        if prompt.count("?") > 1 or any(pattern.search(prompt) for pattern in self.hard_patterns):
+            return "hard"
+        return "simple"
+
+    def route(self, prompt):
+        return self.large_model if self.classify(prompt) == "hard" else self.small_model
@@ -0,0 +1,221 @@
+import io
+import os
+import re
+import queue
+import hashlib
+import logging
+import threading
+from contextlib import nullcontext
+
+logger = logging.getLogger(__name__)
+
+# Local embedding model served by Ollama (`ollama pull nomic-embed-text`)
+EMBED_MODEL = os.getenv("OLLAMA_EMBED_MODEL", "nomic-embed-text")
+INDEX_DIR = os.getenv("RAG_INDEX_DIR", "./rag_index")
+CHUNK_CHARS = int(os.getenv("RAG_CHUNK_CHARS", "1200"))
+CHUNK_OVERLAP = int(os.getenv("RAG_CHUNK_OVERLAP", "200"))
+EMBED_BATCH = int(os.getenv("RAG_EMBED_BATCH", "32"))
+# Namespace files are indexed into and searched from unless the user picks another one
+DEFAULT_NAMESPACE = os.getenv("RAG_NAMESPACE", "shared")
+
+SUPPORTED_TYPES = ["txt", "md", "pdf"]
+
+# Scheduler queue shared by all ingest batches, so chat requests interleave with indexing
+INGEST_QUEUE_ID = "document-ingest"
+
+
+def file_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def iter_text(name, data):
+    """Yield the text of an uploaded file piece by piece (a page at a time for PDFs)"""
+    if name.lower().endswith(".pdf"):
+        from pypdf import PdfReader
+
+        for page in PdfReader(io.BytesIO(data)).pages:
+            yield page.extract_text() or ""
+    else:
+        yield data.decode("utf-8", errors="replace")
+
+
+def check_chunking(size, overlap):
+    # Otherwise a long paragraph would never shrink below `size`
+    if not 0 <= overlap < size:
+        raise ValueError(f"The chunk overlap ({overlap}, RAG_CHUNK_OVERLAP) must be at least 0 and smaller "
+                         f"than the chunk size ({size}, RAG_CHUNK_CHARS)")
+
+
+def chunk_text(pieces, size=CHUNK_CHARS, overlap=CHUNK_OVERLAP):
+    """Split streamed text into ~`size`-character chunks on paragraph boundaries, with overlap"""
+    check_chunking(size, overlap)
+    buffer = ""
+    for piece in pieces:
+        for paragraph in re.split(r"\n\s*\n", piece):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            if len(paragraph) > size:
+                # A paragraph longer than a chunk is cut on its own
+                if buffer:
+                    yield buffer
+                    buffer = ""
+                while len(paragraph) > size:
+                    yield paragraph[:size]
+                    paragraph = paragraph[size - overlap:]
+            if buffer and len(buffer) + len(paragraph) + 2 > size:
+                yield buffer
+                buffer = buffer[-overlap:] if overlap else ""
+            buffer = f"{buffer}\n\n{paragraph}" if buffer else paragraph
+    if buffer:
+        yield buffer
+
+
+def batched(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class DocumentIndex:
+    """
+    Persistent on-disk vector index of uploaded documents, embedded locally through Ollama.
+    Files are indexed into a namespace, and searches only see the files of one namespace.
+    """
+
+    def __init__(self, client, path=INDEX_DIR, embed_model=EMBED_MODEL, scheduler=None,
+                 chunk_chars=CHUNK_CHARS, chunk_overlap=CHUNK_OVERLAP):
+        import chromadb
+
+        check_chunking(chunk_chars, chunk_overlap)
+        self.chunk_chars = chunk_chars
+        self.chunk_overlap = chunk_overlap
+        self.client = client
+        self.embed_model = embed_model
+        self.scheduler = scheduler
+        self.store = chromadb.PersistentClient(path=path)
+        # One collection per embedding model, since vector sizes differ between models
+        self.collection = self.store.get_or_create_collection(
+            name="docs-" + re.sub(r"[^a-zA-Z0-9_-]", "-", embed_model),
+            metadata={"hnsw:space": "cosine"},
+            embedding_function=None,
+        )
+
+    def embed(self, texts, queue_id=None):
+        slot = self.scheduler.slot(queue_id) if self.scheduler and queue_id else nullcontext()
+        with slot:
+            return self.client.embed(model=self.embed_model, input=texts)["embeddings"]
+
+    def is_indexed(self, namespace, digest):
+        # Only the first chunk of a fully indexed file is marked complete
+        where = {"$and": [{"namespace": namespace}, {"file_hash": digest}, {"complete": True}]}
+        return bool(self.collection.get(where=where, limit=1, include=[])["ids"])
+
+    def add_file(self, namespace, name, data, on_progress=None):
+        """Index a file; returns the number of chunks, or None when this exact content is already indexed"""
+        digest = file_hash(data)
+        if self.is_indexed(namespace, digest):
+            return None
+        metadata = {"namespace": namespace, "source": name, "file_hash": digest}
+        added = 0
+        chunks = chunk_text(iter_text(name, data), self.chunk_chars, self.chunk_overlap)
+        for batch in batched(chunks, EMBED_BATCH):
+            embeddings = self.embed(batch, queue_id=INGEST_QUEUE_ID)
+            # Upsert with content-derived ids, so an interrupted ingest is simply redone
+            self.collection.upsert(
+                ids=[f"{namespace}:{digest}:{added + i}" for i in range(len(batch))],
+                embeddings=embeddings,
+                documents=batch,
+                metadatas=[{**metadata, "chunk": added + i} for i in range(len(batch))],
+            )
+            added += len(batch)
+            if on_progress:
+                on_progress(added)
+        if added:
+            self.collection.update(ids=[f"{namespace}:{digest}:0"],
+                                   metadatas=[{**metadata, "chunk": 0, "complete": True}])
+        # A new version of a file replaces the old one once it is fully indexed
+        self.collection.delete(where={"$and": [{"namespace": namespace}, {"source": name},
+                                               {"file_hash": {"$ne": digest}}]})
+        return added
+
+    def search(self, namespace, query, k=4):
+        """The namespace's top-k passages for the query as dicts with `text`, `source` and `distance`"""
+        if not self.count(namespace):
+            return []
+        results = self.collection.query(query_embeddings=self.embed([query]), n_results=k,
+                                        where={"namespace": namespace},
+                                        include=["documents", "metadatas", "distances"])
+        return [
+            {"text": text, "source": metadata["source"], "distance": distance}
+            for text, metadata, distance in zip(results["documents"][0], results["metadatas"][0],
+                                                results["distances"][0])
+        ]
+
+    def count(self, namespace):
+        return len(self.collection.get(where={"namespace": namespace}, include=[])["ids"])
+
+    def sources(self, namespace):
+        """The namespace's indexed file names with their chunk counts"""
+        counts = {}
+        for metadata in self.collection.get(where={"namespace": namespace}, include=["metadatas"])["metadatas"]:
+            counts[metadata["source"]] = counts.get(metadata["source"], 0) + 1
+        return counts
+
+
+def format_passages(passages):
+    return "\n\n".join(f"[{i}] ({p['source']})\n{p['text']}" for i, p in enumerate(passages, 1))
+
+
+class IngestWorker:
+    """Indexes uploaded files one at a time on a background thread, tracking status per namespace and file"""
+
+    def __init__(self, index):
+        self.index = index
+        self.queue = queue.Queue()
+        self.jobs = {}  # namespace -> {file name -> status text}
+        self.pending = {}  # namespace -> files queued or being indexed
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self._run, name="document-ingest", daemon=True)
+        self.thread.start()
+
+    def submit(self, namespace, name, data):
+        with self.lock:
+            self.pending[namespace] = self.pending.get(namespace, 0) + 1
+        self._set(namespace, name, "queued")
+        self.queue.put((namespace, name, data))
+
+    def busy(self, namespace):
+        with self.lock:
+            return self.pending.get(namespace, 0) > 0
+
+    def status(self, namespace):
+        with self.lock:
+            return dict(self.jobs.get(namespace, {}))
+
+    def _set(self, namespace, name, status):
+        with self.lock:
+            self.jobs.setdefault(namespace, {})[name] = status
+
+    def _run(self):
+        while True:
+            namespace, name, data = self.queue.get()
+            try:
+                self._set(namespace, name, "indexing")
+                added = self.index.add_file(namespace, name, data,
+                                            on_progress=lambda n: self._set(namespace, name, f"indexing ({n} chunks)"))
+                self._set(namespace, name, "unchanged, skipped" if added is None else f"indexed ({added} chunks)")
+            except Exception as e:
+                logger.warning(f"Indexing {name} failed: {e}")
+                self._set(namespace, name, f"failed: {e}")
+            finally:
+                with self.lock:
+                    self.pending[namespace] -= 1
+                    if not self.pending[namespace]:
+                        del self.pending[namespace]
+                self.queue.task_done()
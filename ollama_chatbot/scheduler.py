@@ -0,0 +1,150 @@
+import os
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+
+class QueueFullError(Exception):
+    """Raised when admission control rejects a request instead of queueing it."""
+
+
+class QueueTimeoutError(Exception):
+    """Raised when a request waited longer than the queue timeout for a free slot."""
+
+
+class _Ticket:
+    __slots__ = ("session_id", "enqueued_at", "granted")
+
+    def __init__(self, session_id):
+        self.session_id = session_id
+        self.enqueued_at = time.monotonic()
+        self.granted = False
+
+
+class FairScheduler:
+    """
+    Process-wide gate in front of Ollama. At most `max_concurrency` generations run
+    at once (match it to OLLAMA_NUM_PARALLEL); waiting requests are served round-robin
+    across sessions so one busy user can't starve the others.
+    """
+
+    def __init__(self, max_concurrency=1, max_queue=32, max_queued_per_session=1, queue_timeout=120.0):
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max_queue
+        self.max_queued_per_session = max_queued_per_session
+        self.queue_timeout = queue_timeout
+        self.running = 0
+        self.waiting = {}        # session_id -> deque of tickets
+        self.rotation = deque()  # sessions with waiting tickets, in round-robin order
+        self.condition = threading.Condition()
+        self.stats = {"admitted": 0, "rejected": 0, "timed_out": 0}
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_concurrency=int(os.getenv("OLLAMA_NUM_PARALLEL", "1")),
+            max_queue=int(os.getenv("OLLAMA_MAX_QUEUE", "32")),
+            queue_timeout=float(os.getenv("OLLAMA_QUEUE_TIMEOUT", "120")),
+        )
+
+    def queued(self):
+        with self.condition:
+            return sum(len(tickets) for tickets in self.waiting.values())
+
+    def _position(self, ticket):
+        """Number of requests that will be served before this ticket under round-robin"""
+        queues = {sid: list(self.waiting[sid]) for sid in self.rotation}
+        order = list(self.rotation)
+        ahead = 0
+        while order:
+            sid = order.pop(0)
+            current = queues[sid].pop(0)
+            if current is ticket:
+                return ahead
+            ahead += 1
+            if queues[sid]:
+                order.append(sid)
+        return ahead
+
+    def _dispatch(self):
+        while self.running < self.max_concurrency and self.rotation:
+            sid = self.rotation.popleft()
+            ticket = self.waiting[sid].popleft()
+            ticket.granted = True
+            self.running += 1
+            if self.waiting[sid]:
+                self.rotation.append(sid)
+            else:
+                del self.waiting[sid]
+        self.condition.notify_all()
+
+    def _remove(self, ticket):
+        tickets = self.waiting.get(ticket.session_id)
+        if tickets and ticket in tickets:
+            tickets.remove(ticket)
+            if not tickets:
+                del self.waiting[ticket.session_id]
+                self.rotation.remove(ticket.session_id)
+
+    def acquire(self, session_id, timeout=None, on_wait=None):
+        """
+        Block until a slot is free. `on_wait(position)` is called from the caller's
+        thread whenever the queue position changes, for progress feedback.
+        """
+        timeout = self.queue_timeout if timeout is None else timeout
+        with self.condition:
+            if len(self.waiting.get(session_id, ())) >= self.max_queued_per_session:
+                self.stats["rejected"] += 1
+                raise QueueFullError("You already have a request waiting for the model")
+            if self.running >= self.max_concurrency and sum(map(len, self.waiting.values())) >= self.max_queue:
+                self.stats["rejected"] += 1
+                raise QueueFullError("The model is at capacity; please try again in a moment")
+            ticket = _Ticket(session_id)
+            if session_id not in self.waiting:
+                self.waiting[session_id] = deque()
+                self.rotation.append(session_id)
+            self.waiting[session_id].append(ticket)
+            self._dispatch()
+            deadline = ticket.enqueued_at + timeout
+            last_position = None
+            try:
+                while not ticket.granted:
+                    position = self._position(ticket)
+                    if on_wait is not None and position != last_position:
+                        last_position = position
+                        # Called without the lock so the callback can take its time
+                        self.condition.release()
+                        try:
+                            on_wait(position)
+                        finally:
+                            self.condition.acquire()
+                        continue
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.stats["timed_out"] += 1
+                        raise QueueTimeoutError(f"Waited more than {timeout:.0f}s for the model")
+                    self.condition.wait(min(remaining, 0.5))
+            except BaseException:
+                # Timeout, or the Streamlit run was interrupted while waiting
+                if ticket.granted:
+                    self.running -= 1
+                    self._dispatch()
+                else:
+                    self._remove(ticket)
+                raise
+            self.stats["admitted"] += 1
+        return ticket
+
+    def release(self):
+        with self.condition:
+            self.running -= 1
+            self._dispatch()
+
+    @contextmanager
+    def slot(self, session_id, timeout=None, on_wait=None):
+        self.acquire(session_id, timeout=timeout, on_wait=on_wait)
+        try:
+            yield
+        finally:
+            self.release()
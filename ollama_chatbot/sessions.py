@@ -0,0 +1,379 @@
+import os
+import sys
+import json
+import time
+import atexit
+import shutil
+import tempfile
+import threading
+from array import array
+from collections import Counter
+from collections.abc import Sequence
+from langchain_core.messages import AIMessage, HumanMessage
+
+# Parent directory of the per-process folder that spilled conversations are written to
+SPILL_DIR = os.getenv("CHAT_SPILL_DIR") or tempfile.gettempdir()
+# Messages a session keeps in memory; past this, older ones that are out of the prompt window go to disk
+SPILL_AFTER = int(os.getenv("CHAT_SPILL_AFTER", "200"))
+# Seconds without a rerun before a session is unloaded to disk, and before it is dropped altogether
+IDLE_TIMEOUT = float(os.getenv("CHAT_SESSION_IDLE", "900"))
+EXPIRE_AFTER = float(os.getenv("CHAT_SESSION_EXPIRE", "86400"))
+# Conversation memory across all sessions; the least recently active are unloaded beyond it
+MEMORY_BUDGET = int(float(os.getenv("CHAT_MEMORY_BUDGET_MB", "256")) * 2 ** 20)
+
+USER = "user"
+ASSISTANT = "assistant"
+# Row flags
+STOPPED = 1         # the generation was stopped; shown with a marker
+NOT_IN_PROMPT = 2   # shown in the chat but never sent to the model
+# Approximate size of a row tuple and its list slot, on top of the text
+ROW_OVERHEAD = 120
+PASSAGE_OVERHEAD = 250
+
+
+def process_rss():
+    """Resident memory of this process in bytes"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        import resource
+
+        # Peak rather than current RSS, in KB on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+class HistoryView(Sequence):
+    """A Conversation as the LangChain messages sent to the model, built on access"""
+
+    def __init__(self, conversation):
+        self.conversation = conversation
+
+    def __len__(self):
+        return len(self.conversation.prompt_rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return self.conversation.prompt_messages(start, stop)[::step]
+            return self.conversation.prompt_messages(start, stop)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("history index out of range")
+        return self.conversation.prompt_messages(index, index + 1)[0]
+
+
+class Conversation:
+    """
+    One session's chat, stored once as compact rows (role, text, passage keys, flags).
+    The dicts the chat panel renders and the LangChain messages sent to the model are
+    both built from the rows on demand, and passages cited by several answers are kept
+    once. Rows can be spilled to an append-only JSONL file: the oldest ones, once they
+    are out of the prompt window, or all of them when the session is unloaded. Rows on
+    disk are read back when they are accessed.
+    """
+
+    def __init__(self, path, spill_after=SPILL_AFTER):
+        self.path = path
+        self.spill_after = spill_after
+        self.lock = threading.RLock()
+        self.last_active = time.monotonic()
+        self.history = HistoryView(self)
+        self._reset()
+
+    def _reset(self):
+        self.rows = []                  # rows from index `base` on; earlier rows are only on disk
+        self.base = 0
+        self.offsets = array("q")       # file offset of every row written to disk so far
+        self.disk_bytes = 0
+        self.prompt_rows = array("l")   # row index of each message sent to the model
+        self.passages = {}              # (source, text) -> passage, shared by the rows citing it
+        self.passage_refs = Counter()
+        self.resident_bytes = 0
+        self.unloaded = False
+
+    def __len__(self):
+        return self.base + len(self.rows)
+
+    # -- rows ---------------------------------------------------------------------------
+
+    def _intern(self, passages):
+        keys = []
+        for passage in passages or ():
+            key = (passage["source"], passage["text"])
+            stored = self.passages.get(key)
+            if stored is None:
+                stored = self.passages[key] = {"source": passage["source"], "text": passage["text"]}
+                self.resident_bytes += PASSAGE_OVERHEAD + sys.getsizeof(passage["text"])
+            # Rows reference the stored strings, so the caller's copies can be freed
+            key = (stored["source"], stored["text"])
+            self.passage_refs[key] += 1
+            keys.append(key)
+        return tuple(keys)
+
+    def _release(self, keys):
+        for key in keys:
+            self.passage_refs[key] -= 1
+            if not self.passage_refs[key]:
+                del self.passage_refs[key]
+                self.resident_bytes -= PASSAGE_OVERHEAD + sys.getsizeof(self.passages.pop(key)["text"])
+
+    @staticmethod
+    def _row_size(row):
+        return ROW_OVERHEAD + sys.getsizeof(row[1]) + 8 * len(row[2])
+
+    def _append(self, role, content, passages=None, flags=0):
+        with self.lock:
+            if self.unloaded:
+                self._load()
+            row = (role, content, self._intern(passages), flags)
+            self.rows.append(row)
+            self.resident_bytes += self._row_size(row)
+            if not flags & NOT_IN_PROMPT:
+                self.prompt_rows.append(len(self) - 1)
+            return len(self) - 1
+
+    def add_user(self, content):
+        return self._append(USER, content)
+
+    def add_assistant(self, content, passages=None, stopped=False):
+        """An answer stopped before any output is shown, but like its question never sent to the model"""
+        with self.lock:
+            if self.unloaded:
+                self._load()
+            if stopped and not content:
+                last = len(self) - 1
+                if self.prompt_rows and self.prompt_rows[-1] == last and last >= self.base:
+                    role, text, keys, flags = self.rows[last - self.base]
+                    if role == USER:
+                        self.rows[last - self.base] = (role, text, keys, flags | NOT_IN_PROMPT)
+                        self.prompt_rows.pop()
+                return self._append(ASSISTANT, "", flags=STOPPED | NOT_IN_PROMPT)
+            return self._append(ASSISTANT, content, passages, STOPPED if stopped else 0)
+
+    def pop(self):
+        """Remove the last row, e.g. a question that was never admitted to the model"""
+        with self.lock:
+            index = len(self) - 1
+            if index < 0:
+                return
+            if self.prompt_rows and self.prompt_rows[-1] == index:
+                self.prompt_rows.pop()
+            if index < len(self.offsets):
+                os.truncate(self.path, self.offsets[index])
+                self.disk_bytes = self.offsets.pop()
+            if index >= self.base:
+                row = self.rows.pop()
+                self.resident_bytes -= self._row_size(row)
+                self._release(row[2])
+            else:
+                self.base = index
+
+    def _read(self, indices):
+        """Rows at the given (sorted) indices from the spill file, with their passages inline"""
+        rows = {}
+        with open(self.path, "rb") as f:
+            for index in indices:
+                f.seek(self.offsets[index])
+                record = json.loads(f.readline())
+                rows[index] = (record["role"], record["content"], record["sources"], record["flags"])
+        return rows
+
+    def _rows(self, indices):
+        """(role, content, passages, flags) for each index, from memory or disk"""
+        with self.lock:
+            on_disk = self._read([i for i in indices if i < self.base]) if indices and indices[0] < self.base else {}
+            result = []
+            for index in indices:
+                if index in on_disk:
+                    result.append(on_disk[index])
+                else:
+                    role, content, keys, flags = self.rows[index - self.base]
+                    result.append((role, content, [self.passages[key] for key in keys], flags))
+            return result
+
+    def messages(self, start=0, stop=None):
+        """Rows start..stop as the dicts the chat panel renders"""
+        stop = len(self) if stop is None else min(stop, len(self))
+        messages = []
+        for role, content, passages, flags in self._rows(list(range(max(0, start), stop))):
+            if flags & STOPPED:
+                content = content + " *(stopped)*" if content else "*(stopped before any output)*"
+            messages.append({"role": role, "content": content, "sources": passages})
+        return messages
+
+    def prompt_messages(self, start, stop):
+        """Messages start..stop of the history sent to the model, as LangChain messages"""
+        rows = self._rows(list(self.prompt_rows[start:stop]))
+        return [HumanMessage(content=content) if role == USER else AIMessage(content=content)
+                for role, content, _, _ in rows]
+
+    # -- spilling -----------------------------------------------------------------------
+
+    def _record(self, row):
+        role, content, keys, flags = row
+        return {"role": role, "content": content, "flags": flags, "sources": [self.passages[key] for key in keys]}
+
+    def _spill(self, upto):
+        """Write rows up to `upto` to disk and drop them from memory"""
+        if upto <= self.base:
+            return
+        written = len(self.offsets)
+        if upto > written:
+            with open(self.path, "ab") as f:
+                for index in range(written, upto):
+                    line = (json.dumps(self._record(self.rows[index - self.base])) + "\n").encode()
+                    f.write(line)
+                    self.offsets.append(self.disk_bytes)
+                    self.disk_bytes += len(line)
+        dropped = self.rows[:upto - self.base]
+        del self.rows[:upto - self.base]
+        for row in dropped:
+            self.resident_bytes -= self._row_size(row)
+            self._release(row[2])
+        self.base = upto
+
+    def compact(self, settled):
+        """
+        Spill the oldest rows once more than `spill_after` are in memory. Only rows before the
+        first of the `settled` history messages the model will still see (HistoryManager.settled())
+        are spilled, and the most recent half of `spill_after` rows always stays in memory.
+        """
+        with self.lock:
+            if len(self.rows) <= self.spill_after:
+                return
+            cold = self.prompt_rows[settled] if settled < len(self.prompt_rows) else len(self)
+            self._spill(min(cold, len(self) - self.spill_after // 2))
+
+    def unload(self):
+        """Move every row to disk; the next touch() loads the most recent ones back"""
+        with self.lock:
+            self._spill(len(self))
+            self.unloaded = True
+
+    def _load(self):
+        """Read the most recent rows of an unloaded conversation back into memory"""
+        self.unloaded = False
+        start = max(0, len(self) - self.spill_after // 2)
+        if start >= self.base:
+            return
+        records = self._read(list(range(start, self.base)))
+        rows = [(role, content, self._intern(passages), flags)
+                for role, content, passages, flags in (records[i] for i in range(start, self.base))]
+        self.resident_bytes += sum(self._row_size(row) for row in rows)
+        self.rows[:0] = rows
+        self.base = start
+
+    def touch(self):
+        with self.lock:
+            self.last_active = time.monotonic()
+            if self.unloaded:
+                self._load()
+
+    def clear(self):
+        with self.lock:
+            if self.offsets:
+                os.remove(self.path)
+            self._reset()
+
+    def stats(self):
+        with self.lock:
+            return {
+                "messages": len(self), "in_memory": len(self.rows), "on_disk": len(self.offsets),
+                "passages": len(self.passages), "resident_bytes": self.resident_bytes,
+                "disk_bytes": self.disk_bytes, "unloaded": self.unloaded,
+            }
+
+
+class SessionRegistry:
+    """
+    The Conversation of every session in this process, with idle unloading and a memory
+    budget. A session idle for `idle_timeout` is unloaded to disk (the Conversation stays
+    registered, holding only file offsets) and its recent rows come back on its next
+    touch(). While the resident conversations exceed `memory_budget`, the least recently
+    active are unloaded first. Sessions idle for `expire_after` are cleared and forgotten.
+    """
+
+    def __init__(self, directory=None, idle_timeout=IDLE_TIMEOUT, expire_after=EXPIRE_AFTER,
+                 memory_budget=MEMORY_BUDGET, spill_after=SPILL_AFTER):
+        # A folder per process, so several servers can share SPILL_DIR
+        self.directory = directory or tempfile.mkdtemp(prefix="ollama-chat-sessions-", dir=SPILL_DIR)
+        os.makedirs(self.directory, exist_ok=True)
+        self.idle_timeout = idle_timeout
+        self.expire_after = expire_after
+        self.memory_budget = memory_budget
+        self.spill_after = spill_after
+        self.sessions = {}
+        self.lock = threading.Lock()
+        self.unloads = 0
+        self.expired = 0
+
+    def close(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def open(self, session_id):
+        """A new, empty Conversation for the session"""
+        return Conversation(os.path.join(self.directory, f"{session_id}.jsonl"), self.spill_after)
+
+    def touch(self, session_id, conversation):
+        """Mark the session active, registering it if it is new or had expired, and apply the limits to the others"""
+        with self.lock:
+            self.sessions[session_id] = conversation
+        conversation.touch()
+        self.sweep(exclude=session_id)
+
+    def sweep(self, exclude=None, now=None):
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            sessions = sorted(self.sessions.items(), key=lambda item: item[1].last_active)
+        for session_id, conversation in sessions:
+            if session_id == exclude:
+                continue
+            idle = now - conversation.last_active
+            if idle > self.expire_after:
+                conversation.clear()
+                with self.lock:
+                    if self.sessions.get(session_id) is conversation:
+                        del self.sessions[session_id]
+                self.expired += 1
+            elif idle > self.idle_timeout and not conversation.unloaded:
+                conversation.unload()
+                self.unloads += 1
+        resident = sum(conversation.resident_bytes for _, conversation in sessions)
+        for session_id, conversation in sessions:
+            if resident <= self.memory_budget:
+                break
+            if session_id == exclude or conversation.unloaded:
+                continue
+            resident -= conversation.resident_bytes
+            conversation.unload()
+            self.unloads += 1
+
+    def report(self):
+        """Memory per session, largest first, with process totals"""
+        now = time.monotonic()
+        with self.lock:
+            sessions = list(self.sessions.items())
+        rows = [{"session": session_id[:8], **conversation.stats(), "idle_s": round(now - conversation.last_active)}
+                for session_id, conversation in sessions]
+        rows.sort(key=lambda row: row["resident_bytes"], reverse=True)
+        return {
+            "sessions": len(rows),
+            "resident_bytes": sum(row["resident_bytes"] for row in rows),
+            "disk_bytes": sum(row["disk_bytes"] for row in rows),
+            "memory_budget": self.memory_budget,
+            "unloads": self.unloads,
+            "expired": self.expired,
+            "process_rss": process_rss(),
+            "per_session": rows,
+        }
+
+
+def create_registry(**kwargs):
+    """A registry whose spill folder is removed when the process exits"""
+    registry = SessionRegistry(**kwargs)
+    atexit.register(registry.close)
+    return registry
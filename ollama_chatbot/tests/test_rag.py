@@ -0,0 +1,79 @@
+import pytest
+
+from rag import DocumentIndex, IngestWorker, chunk_text
+
+
+def test_chunk_text_packs_paragraphs_up_to_size():
+    chunks = list(chunk_text(["one\n\ntwo\n\nthree"], size=9, overlap=0))
+    assert chunks == ["one\n\ntwo", "three"]
+
+
+def test_chunk_text_cuts_long_paragraphs_with_overlap():
+    chunks = list(chunk_text(["abcdefghij"], size=4, overlap=1))
+    assert chunks == ["abcd", "defg", "ghij"]
+
+
+@pytest.mark.parametrize("overlap", [-1, 4, 10])
+def test_chunk_text_rejects_overlap_not_below_size(overlap):
+    with pytest.raises(ValueError):
+        list(chunk_text(["abcdefghij"], size=4, overlap=overlap))
+
+
+class FakeEmbedClient:
+    """Embeds a text as the counts of a few marker words"""
+
+    words = ("apple", "boat", "cloud")
+
+    def embed(self, model, input):
+        return {"embeddings": [[text.count(word) + 0.01 for word in self.words] for text in input]}
+
+
+@pytest.fixture
+def index(tmp_path):
+    pytest.importorskip("chromadb")
+    return DocumentIndex(FakeEmbedClient(), path=str(tmp_path), embed_model="fake")
+
+
+def test_index_rejects_overlap_not_below_size(tmp_path):
+    with pytest.raises(ValueError, match="RAG_CHUNK_OVERLAP"):
+        DocumentIndex(FakeEmbedClient(), path=str(tmp_path), embed_model="fake", chunk_chars=100, chunk_overlap=100)
+
+
+def test_namespaces_only_see_their_own_files(index):
+    assert index.add_file("team", "a.txt", b"apple apple") == 1
+    assert index.add_file("private", "b.txt", b"boat boat") == 1
+    assert [p["source"] for p in index.search("team", "boat", k=4)] == ["a.txt"]
+    assert index.sources("private") == {"b.txt": 1}
+    assert index.search("empty", "apple") == []
+
+
+def test_unchanged_file_is_skipped_per_namespace(index):
+    assert index.add_file("team", "a.txt", b"apple") == 1
+    assert index.add_file("team", "a.txt", b"apple") is None
+    assert index.add_file("private", "a.txt", b"apple") == 1
+
+
+def test_changed_file_replaces_old_version(index):
+    index.add_file("team", "a.txt", b"apple")
+    added = index.add_file("team", "a.txt", b"apple\n\nboat")
+    assert index.sources("team") == {"a.txt": added}
+    assert [p["text"] for p in index.search("team", "boat", k=4)] == ["apple\n\nboat"]
+
+
+def test_index_persists_across_restarts(tmp_path):
+    pytest.importorskip("chromadb")
+    DocumentIndex(FakeEmbedClient(), path=str(tmp_path), embed_model="fake").add_file("team", "a.txt", b"apple")
+    reopened = DocumentIndex(FakeEmbedClient(), path=str(tmp_path), embed_model="fake")
+    assert reopened.sources("team") == {"a.txt": 1}
+    assert reopened.add_file("team", "a.txt", b"apple") is None
+
+
+def test_ingest_worker_tracks_status_per_namespace(index):
+    worker = IngestWorker(index)
+    worker.submit("team", "a.txt", b"apple")
+    worker.submit("private", "b.txt", b"boat")
+    worker.queue.join()
+    assert worker.status("team") == {"a.txt": "indexed (1 chunks)"}
+    assert worker.status("other") == {}
+    assert not worker.busy("team")
+    assert index.count("team") == 1 and index.count("private") == 1
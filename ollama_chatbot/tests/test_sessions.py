@@ -0,0 +1,150 @@
+import os
+
+import pytest
+
+pytest.importorskip("langchain_core")
+
+from langchain_core.messages import AIMessage, HumanMessage  # noqa: E402
+
+from sessions import Conversation, SessionRegistry  # noqa: E402
+
+
+def passage(source, text):
+    # Fresh strings every time, as DocumentIndex.search returns them
+    return {"source": "".join(source), "text": "".join(text), "distance": 0.1}
+
+
+@pytest.fixture
+def conversation(tmp_path):
+    return Conversation(str(tmp_path / "session.jsonl"), spill_after=4)
+
+
+def chat(conversation, turns, start=0):
+    for i in range(start, start + turns):
+        conversation.add_user(f"question {i}")
+        conversation.add_assistant(f"answer {i}")
+
+
+def test_messages_and_history(conversation):
+    conversation.add_user("hi")
+    conversation.add_assistant("hello", passages=[passage("a.txt", "text")])
+    assert conversation.messages() == [
+        {"role": "user", "content": "hi", "sources": []},
+        {"role": "assistant", "content": "hello", "sources": [{"source": "a.txt", "text": "text"}]},
+    ]
+    assert list(conversation.history) == [HumanMessage(content="hi"), AIMessage(content="hello")]
+    assert conversation.history[-1] == AIMessage(content="hello")
+    assert conversation.history[:1] == [HumanMessage(content="hi")]
+
+
+def test_shared_passages_are_stored_once(conversation):
+    conversation.add_user("q1")
+    conversation.add_assistant("a1", passages=[passage("a.txt", "same text")])
+    conversation.add_user("q2")
+    conversation.add_assistant("a2", passages=[passage("a.txt", "same text")])
+    assert len(conversation.passages) == 1
+    first, second = conversation.rows[1][2][0], conversation.rows[3][2][0]
+    assert first[1] is second[1]
+    conversation.pop()
+    conversation.pop()
+    assert len(conversation.passages) == 1
+    conversation.pop()
+    assert conversation.passages == {}
+
+
+def test_stop_before_output_keeps_the_turn_out_of_the_prompt(conversation):
+    chat(conversation, 1)
+    conversation.add_user("stopped question")
+    conversation.add_assistant("", stopped=True)
+    conversation.add_user("next")
+    conversation.add_assistant("partial", stopped=True)
+    assert [m["content"] for m in conversation.messages()][2:] == [
+        "stopped question", "*(stopped before any output)*", "next", "partial *(stopped)*",
+    ]
+    assert [m.content for m in conversation.history] == ["question 0", "answer 0", "next", "partial"]
+
+
+def test_compact_spills_only_settled_rows(conversation):
+    chat(conversation, 5)
+    # The model still sees the history from message 6 on, so rows 0-5 may go to disk
+    conversation.compact(settled=6)
+    assert conversation.base == 6
+    assert len(conversation.rows) == 4
+    assert len(conversation.messages()) == 10
+    assert conversation.messages(0, 2)[1]["content"] == "answer 0"
+    assert [m.content for m in conversation.history[4:6]] == ["question 2", "answer 2"]
+    # Nothing past the first settled message is spilled, however many rows are in memory
+    chat(conversation, 3, start=5)
+    conversation.compact(settled=6)
+    assert conversation.base == 6
+
+
+def test_unload_and_touch(conversation):
+    chat(conversation, 3)
+    conversation.add_assistant("cited", passages=[passage("b.txt", "x")])
+    conversation.unload()
+    assert conversation.unloaded
+    assert conversation.rows == [] and conversation.resident_bytes == 0 and conversation.passages == {}
+    conversation.touch()
+    assert not conversation.unloaded
+    # Only the most recent spill_after // 2 rows come back to memory
+    assert len(conversation.rows) == 2
+    assert conversation.messages()[-1]["sources"] == [{"source": "b.txt", "text": "x"}]
+    assert [m["content"] for m in conversation.messages()][:2] == ["question 0", "answer 0"]
+
+
+def test_pop_from_disk_truncates_the_spill_file(conversation):
+    chat(conversation, 2)
+    conversation.unload()
+    size = os.path.getsize(conversation.path)
+    conversation.pop()
+    assert len(conversation) == 3
+    assert os.path.getsize(conversation.path) < size
+    conversation.touch()
+    assert conversation.messages()[-1]["content"] == "question 1"
+
+
+def test_clear_removes_the_spill_file(conversation):
+    chat(conversation, 3)
+    conversation.unload()
+    conversation.clear()
+    assert len(conversation) == 0
+    assert not os.path.exists(conversation.path)
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return SessionRegistry(str(tmp_path), idle_timeout=10, expire_after=100, memory_budget=10**9, spill_after=4)
+
+
+def test_idle_sessions_unload_and_expire(registry):
+    sessions = {}
+    for session_id in ("a", "b", "c"):
+        sessions[session_id] = registry.open(session_id)
+        chat(sessions[session_id], 1)
+        registry.touch(session_id, sessions[session_id])
+    now = sessions["c"].last_active
+    sessions["a"].last_active = now - 200
+    sessions["b"].last_active = now - 20
+    registry.sweep(exclude="c", now=now)
+    assert set(registry.sessions) == {"b", "c"}
+    assert len(sessions["a"]) == 0
+    assert sessions["b"].unloaded and not sessions["c"].unloaded
+    assert (registry.unloads, registry.expired) == (1, 1)
+    # A returning session is registered again and loaded back
+    registry.touch("b", sessions["b"])
+    assert not sessions["b"].unloaded
+
+
+def test_memory_budget_unloads_least_recent_first(registry):
+    sessions = {session_id: registry.open(session_id) for session_id in ("a", "b", "c")}
+    for offset, (session_id, conversation) in enumerate(sessions.items()):
+        chat(conversation, 2)
+        registry.touch(session_id, conversation)
+        conversation.last_active += offset
+    registry.memory_budget = sessions["c"].resident_bytes + sessions["b"].resident_bytes
+    registry.sweep(exclude="c", now=sessions["c"].last_active)
+    assert [sessions[s].unloaded for s in "abc"] == [True, False, False]
+    report = registry.report()
+    assert report["sessions"] == 3 and report["unloads"] == 1
+    assert report["resident_bytes"] == sessions["b"].resident_bytes + sessions["c"].resident_bytes